@@ -0,0 +1,15 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.policy_engine import PolicyEngine
+
+__all__ = ["PolicyEngine"]
+
+
+def __getattr__(name: str):
+    # Imported on first access, so importing any other ``app`` module does not load the engine.
+    if name == "PolicyEngine":
+        from app.policy_engine import PolicyEngine
+
+        return PolicyEngine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
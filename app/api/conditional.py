@@ -0,0 +1,38 @@
+import hashlib
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+from app.api.deps import table_versions
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so a W/ prefix on either side is ignored.
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+def table_etag(
+    *tables: str, includes: Optional[Dict[str, Tuple[str, ...]]] = None
+) -> Callable[[Request, Response], str]:
+    """Dependency for list endpoints whose result depends only on ``tables`` and the query.
+
+    The tag is derived from the table versions before any query runs, so a write that lands
+    mid-request only makes the tag older, never newer than the data. A matching
+    ``If-None-Match`` is answered with 304 before the service (and the database) is touched.
+    ``includes`` maps each ``?include=`` relationship to the extra tables it reads.
+    """
+
+    def dependency(request: Request, response: Response) -> str:
+        query = hashlib.blake2b(str(request.query_params).encode(), digest_size=8).hexdigest()
+        versioned = list(tables)
+        for name in request.query_params.get("include", "").split(","):
+            versioned.extend((includes or {}).get(name.strip(), ()))
+        etag = f'"{table_versions.token(versioned)}-{query}"'
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return etag
+
+    return dependency
@@ -1,34 +1,187 @@
+import asyncio
+import inspect
+import weakref
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar, Union
+
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.core.database import get_db
+from app.core.changes import publish, subscribe
+from app.core.config import get_settings
+from app.core.database import SessionLocal, engine, get_async_db, get_db
+from app.core.versions import TableVersions
+from app.infrastructure.cache import MemoryCacheBackend, RedisCacheBackend
+from app.infrastructure.change_log import (
+    ChangeLogPoller,
+    current_sequence,
+    install_change_log,
+    retained_changes,
+)
+from app.infrastructure.index_file import index_directory
+from app.infrastructure.repositories.authorization_repository import SQLAlchemyAuthorizationRepository
 from app.infrastructure.repositories.permission_repository import SQLAlchemyPermissionRepository
 from app.infrastructure.repositories.role_permission_repository import SQLAlchemyRolePermissionRepository
 from app.infrastructure.repositories.role_repository import SQLAlchemyRoleRepository
+from app.infrastructure.repositories.snapshot_repository import SQLAlchemySnapshotRepository
 from app.infrastructure.repositories.user_repository import SQLAlchemyUserRepository
 from app.infrastructure.repositories.user_role_repository import SQLAlchemyUserRoleRepository
+from app.application.services.async_service import AsyncServiceAdapter
 from app.application.services.role_service import RoleService
 from app.application.services.permission_service import PermissionService
 from app.application.services.user_service import UserService
 from app.application.services.role_permission_service import RolePermissionService
 from app.application.services.user_role_service import UserRoleService
+from app.application.services.authorization_service import AuthorizationService
+from app.application.services.snapshot_service import SnapshotService
+from app.application.services.permission_index import PermissionIndex
+from app.application.services.shared_permission_index import SharedPermissionIndex
+from app.application.services.list_cache import ListCache
+
+ServiceT = TypeVar("ServiceT")
+
+permission_index = PermissionIndex()
+subscribe(permission_index.apply)
+shared_permission_index = None
+if get_settings().authorization_backend == "shared":
+    shared_permission_index = SharedPermissionIndex(
+        index_directory(get_settings().shared_index_dir, get_settings().database_url)
+    )
+    subscribe(shared_permission_index.apply)
+table_versions = TableVersions()
+subscribe(table_versions.apply)
+
+
+def build_list_cache() -> Optional[ListCache]:
+    settings = get_settings()
+    if settings.cache_backend == "none":
+        return None
+    if settings.cache_backend == "redis":
+        backend = RedisCacheBackend(settings.cache_redis_url)
+    else:
+        backend = MemoryCacheBackend(settings.cache_max_entries)
+    return ListCache(backend, table_versions, settings.cache_ttl_seconds)
+
+
+list_cache = build_list_cache()
+
+change_log_poller = None
+if get_settings().change_bus:
+    install_change_log()
+    change_log_poller = ChangeLogPoller(
+        SessionLocal,
+        interval=get_settings().change_poll_interval,
+        retention=get_settings().change_retention_seconds,
+        dispatch=partial(publish, database=engine.url),
+    )
 
 
-def get_role_service(db: Session = Depends(get_db)) -> RoleService:
-    return RoleService(SQLAlchemyRoleRepository(db))
+def start_change_bus() -> None:
+    if change_log_poller is None:
+        return
+    with SessionLocal() as db:
+        seq = current_sequence(db)
+        horizon, logged = retained_changes(db)
+    table_versions.use_sequence(horizon, logged)
+    if shared_permission_index is not None:
+        # A generation left by an earlier run is reused only if it is at least this recent.
+        shared_permission_index.require(seq)
+    change_log_poller.last_seq = seq
+    change_log_poller.start()
 
 
-def get_permission_service(db: Session = Depends(get_db)) -> PermissionService:
-    return PermissionService(SQLAlchemyPermissionRepository(db))
+def stop_change_bus() -> None:
+    if change_log_poller is not None:
+        change_log_poller.stop()
 
 
-def get_user_service(db: Session = Depends(get_db)) -> UserService:
+def build_role_service(db: Session) -> RoleService:
+    return RoleService(SQLAlchemyRoleRepository(db), list_cache)
+
+
+def build_permission_service(db: Session) -> PermissionService:
+    return PermissionService(SQLAlchemyPermissionRepository(db), list_cache)
+
+
+def build_user_service(db: Session) -> UserService:
     return UserService(SQLAlchemyUserRepository(db))
 
 
-def get_role_permission_service(db: Session = Depends(get_db)) -> RolePermissionService:
-    return RolePermissionService(SQLAlchemyRolePermissionRepository(db))
+def build_role_permission_service(db: Session) -> RolePermissionService:
+    return RolePermissionService(SQLAlchemyRolePermissionRepository(db), list_cache)
+
+
+def build_user_role_service(db: Session) -> UserRoleService:
+    return UserRoleService(SQLAlchemyUserRoleRepository(db), list_cache)
+
+
+def authorization_index() -> Optional[Union[PermissionIndex, SharedPermissionIndex]]:
+    return {"index": permission_index, "shared": shared_permission_index}.get(
+        get_settings().authorization_backend
+    )
+
+
+def build_authorization_service(db: Session, refresh_index: bool = True) -> AuthorizationService:
+    return AuthorizationService(SQLAlchemyAuthorizationRepository(db), authorization_index(), refresh_index)
+
+
+_index_refresh_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def provide_async_authorization_service(
+    db: AsyncSession = Depends(get_async_db),
+) -> AsyncServiceAdapter:
+    # run_sync executes the loader in a greenlet on the event loop thread. Holding the
+    # index's threading lock across its I/O would let a second request block the loop on
+    # that lock, so concurrent refreshes wait on an asyncio lock here instead.
+    index = authorization_index()
+    if index is not None and not index.loaded:
+        loop = asyncio.get_running_loop()
+        lock = _index_refresh_locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            if not index.loaded:
+                await db.run_sync(
+                    lambda session: index.refresh(SQLAlchemyAuthorizationRepository(session).load_graph)
+                )
+    return AsyncServiceAdapter(db, lambda session: build_authorization_service(session, refresh_index=False))
+
+
+def build_snapshot_service(db: Session) -> SnapshotService:
+    return SnapshotService(SQLAlchemySnapshotRepository(db))
+
+
+def service_dependency(build: Callable[[Session], ServiceT]) -> Callable[..., Any]:
+    if get_settings().async_database:
+
+        async def provide_async(db: AsyncSession = Depends(get_async_db)) -> AsyncServiceAdapter:
+            return AsyncServiceAdapter(db, build)
+
+        return provide_async
+
+    async def provide(db: Session = Depends(get_db)) -> ServiceT:
+        return build(db)
+
+    return provide
+
+
+async def call(method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    if inspect.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await run_in_threadpool(method, *args, **kwargs)
 
 
-def get_user_role_service(db: Session = Depends(get_db)) -> UserRoleService:
-    return UserRoleService(SQLAlchemyUserRoleRepository(db))
+get_role_service = service_dependency(build_role_service)
+get_permission_service = service_dependency(build_permission_service)
+get_user_service = service_dependency(build_user_service)
+get_role_permission_service = service_dependency(build_role_permission_service)
+get_user_role_service = service_dependency(build_user_role_service)
+get_authorization_service = (
+    provide_async_authorization_service
+    if get_settings().async_database
+    else service_dependency(build_authorization_service)
+)
+get_snapshot_service = service_dependency(build_snapshot_service)
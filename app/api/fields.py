@@ -0,0 +1,43 @@
+from typing import Annotated, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, Query, status
+
+FieldsParam = Annotated[
+    Optional[str],
+    Query(description="Comma-separated fields to return; key fields are always included"),
+]
+
+
+def parse_fields(raw: Optional[str], schema: type, key: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+    """Turns ``?fields=`` into a canonical tuple in schema order, or ``None`` for every field."""
+    if raw is None:
+        return None
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "Unknown fields", "fields": sorted(unknown)},
+        )
+    selected = requested | set(key)
+    if selected == set(schema.model_fields):
+        return None
+    return tuple(name for name in schema.model_fields if name in selected)
+
+
+IncludeParam = Annotated[
+    Optional[str], Query(description="Comma-separated relationships to embed in every item")
+]
+
+
+def parse_include(raw: Optional[str], relations: Iterable[str]) -> Tuple[str, ...]:
+    if raw is None:
+        return ()
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = requested - set(relations)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "Unknown relationships", "include": sorted(unknown)},
+        )
+    return tuple(sorted(requested))
@@ -0,0 +1,126 @@
+import logging
+import time
+from collections import defaultdict
+from typing import Dict
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    http_request_duration_seconds,
+    http_request_exceptions_total,
+    http_requests_in_progress,
+    http_requests_total,
+)
+from app.core.query_stats import track_queries
+
+logger = logging.getLogger("app.queries")
+
+
+class QueryStatsMiddleware:
+    """Counts and times the SQL issued by each request.
+
+    The totals go out as a ``Server-Timing: db`` header and a log line; statements repeated
+    at least ``n_plus_one_threshold`` times in one request are logged as likely N+1 loops.
+    """
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 5) -> None:
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    timing = f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries"'
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                logger.info(
+                    "%s %s: %d queries in %.2f ms",
+                    scope["method"],
+                    scope["path"],
+                    stats.count,
+                    stats.seconds * 1000,
+                )
+                for statement, count in stats.repeated(self.n_plus_one_threshold):
+                    logger.warning(
+                        "Possible N+1 in %s %s: statement executed %d times: %s",
+                        scope["method"],
+                        scope["path"],
+                        count,
+                        " ".join(statement.split())[:200],
+                    )
+
+
+def _first_segment(path: str) -> str:
+    return path.lstrip("/").split("/", 1)[0]
+
+
+def _routes_by_segment(app) -> Dict[str, list]:
+    # Routes indexed by their literal first path segment; routes starting with a path
+    # parameter are kept under "" and tried for every request.
+    index = getattr(app.state, "routes_by_segment", None)
+    if index is None:
+        index = defaultdict(list)
+        for route in app.router.routes:
+            segment = _first_segment(getattr(route, "path", ""))
+            index["" if "{" in segment else segment].append(route)
+        app.state.routes_by_segment = index
+    return index
+
+
+def route_template(scope: Scope) -> str:
+    # Label by route template, never by raw path, to keep label cardinality bounded.
+    index = _routes_by_segment(scope["app"])
+    partial = None
+    for route in (*index.get(_first_segment(scope["path"]), ()), *index.get("", ())):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Records request count, latency, in-flight requests and exceptions per route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        in_progress = http_requests_in_progress.labels(method, route)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception:
+            http_request_exceptions_total.labels(method, route).inc()
+            raise
+        finally:
+            http_request_duration_seconds.labels(method, route).observe(time.perf_counter() - started)
+            http_requests_total.labels(method, route, str(status)).inc()
+            in_progress.dec()
@@ -0,0 +1,44 @@
+import base64
+import binascii
+import json
+from typing import Annotated, Callable, List, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, Query, Response, status
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+T = TypeVar("T")
+Key = Tuple[int, ...]
+
+PageLimit = Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE, description="Maximum number of items per page")]
+PageCursor = Annotated[
+    Optional[str], Query(description=f"Opaque cursor taken from the {NEXT_CURSOR_HEADER} response header")
+]
+
+
+def encode_cursor(key: Key) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int = 1) -> Optional[Key]:
+    if cursor is None:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (binascii.Error, ValueError):
+        key = None
+    if not isinstance(key, list) or len(key) != size or not all(type(part) is int for part in key):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return tuple(key)
+
+
+def paginate(response: Response, items: List[T], limit: int, key: Callable[[T], Key]) -> List[T]:
+    # Callers fetch ``limit + 1`` rows; the extra row only signals that a next page exists.
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(items[-1]))
+    return items
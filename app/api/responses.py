@@ -0,0 +1,23 @@
+from typing import List
+
+from fastapi import Response
+
+from app.domain.schemas import list_adapter
+
+JSON_MEDIA_TYPE = "application/json"
+_PER_BODY_HEADERS = {b"content-length", b"content-type"}
+
+
+def list_response(response: Response, items: List, schema: type) -> Response:
+    """Serializes already-validated list items in one pydantic-core pass.
+
+    Returning a ``Response`` skips FastAPI's second validation against ``response_model``
+    and ``jsonable_encoder``; ``response_model`` stays on the route for the OpenAPI schema.
+    Headers set on the injected ``response`` (cursor, ETag) are carried over.
+    """
+    body = list_adapter(schema).dump_json(items)
+    serialized = Response(content=body, media_type=JSON_MEDIA_TYPE)
+    serialized.raw_headers.extend(
+        (name, value) for name, value in response.raw_headers if name not in _PER_BODY_HEADERS
+    )
+    return serialized
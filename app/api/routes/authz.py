@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+
+from app.api.deps import call, get_authorization_service
+from app.application.services.authorization_service import AuthorizationService
+from app.domain.schemas import (
+    PermissionCheckBatch,
+    PermissionCheckBatchRead,
+    PermissionHoldersQuery,
+    PermissionHoldersRead,
+)
+
+router = APIRouter(prefix="/authz", tags=["authz"])
+
+
+@router.post("/holders", response_model=PermissionHoldersRead)
+async def find_permission_holders(
+    payload: PermissionHoldersQuery,
+    service: AuthorizationService = Depends(get_authorization_service),
+) -> PermissionHoldersRead:
+    return await call(service.find_permission_holders, payload)
+
+
+@router.post("/check-batch", response_model=PermissionCheckBatchRead)
+async def check_permissions_batch(
+    payload: PermissionCheckBatch,
+    service: AuthorizationService = Depends(get_authorization_service),
+) -> PermissionCheckBatchRead:
+    return await call(service.check_permissions, payload)
@@ -0,0 +1,85 @@
+from typing import Annotated, Callable, Iterator, List, Optional, Set
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.deps import (
+    build_permission_service,
+    build_role_permission_service,
+    build_role_service,
+    build_user_role_service,
+    build_user_service,
+)
+from app.core.database import get_session_factory
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+BatchSize = Annotated[
+    int, Query(ge=1, le=50_000, description="Rows fetched per server-side cursor round trip")
+]
+
+
+def ndjson_response(
+    session_factory: sessionmaker,
+    export: Callable[[Session], Iterator[List[BaseModel]]],
+    exclude: Optional[Set[str]] = None,
+) -> StreamingResponse:
+    # Request-scoped sessions are closed before a streaming body is sent, so the
+    # stream owns its session for exactly as long as the rows are being written.
+    def lines() -> Iterator[bytes]:
+        with session_factory() as session:
+            for batch in export(session):
+                yield b"".join(item.model_dump_json(exclude=exclude).encode() + b"\n" for item in batch)
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get("/users", response_class=StreamingResponse)
+def export_users(
+    batch_size: BatchSize = 1000, session_factory: sessionmaker = Depends(get_session_factory)
+) -> StreamingResponse:
+    return ndjson_response(
+        session_factory,
+        lambda session: build_user_service(session).export_users(batch_size),
+        exclude={"password_hash"},
+    )
+
+
+@router.get("/roles", response_class=StreamingResponse)
+def export_roles(
+    batch_size: BatchSize = 1000, session_factory: sessionmaker = Depends(get_session_factory)
+) -> StreamingResponse:
+    return ndjson_response(
+        session_factory, lambda session: build_role_service(session).export_roles(batch_size)
+    )
+
+
+@router.get("/permissions", response_class=StreamingResponse)
+def export_permissions(
+    batch_size: BatchSize = 1000, session_factory: sessionmaker = Depends(get_session_factory)
+) -> StreamingResponse:
+    return ndjson_response(
+        session_factory, lambda session: build_permission_service(session).export_permissions(batch_size)
+    )
+
+
+@router.get("/role-permissions", response_class=StreamingResponse)
+def export_role_permissions(
+    batch_size: BatchSize = 1000, session_factory: sessionmaker = Depends(get_session_factory)
+) -> StreamingResponse:
+    return ndjson_response(
+        session_factory, lambda session: build_role_permission_service(session).export_links(batch_size)
+    )
+
+
+@router.get("/user-roles", response_class=StreamingResponse)
+def export_user_roles(
+    batch_size: BatchSize = 1000, session_factory: sessionmaker = Depends(get_session_factory)
+) -> StreamingResponse:
+    return ndjson_response(
+        session_factory, lambda session: build_user_role_service(session).export_links(batch_size)
+    )
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+
+from app.core.database import async_engine, engine
+from app.core.pool import pool_status
+from app.domain.schemas import PoolsRead
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+@router.get("/pool", response_model=PoolsRead, response_model_by_alias=True)
+async def read_pool_status() -> PoolsRead:
+    return PoolsRead(
+        sync=pool_status(engine.pool),
+        **{"async": pool_status(async_engine.pool) if async_engine is not None else None},
+    )
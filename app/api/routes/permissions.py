@@ -1,42 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated
 
-from app.api.deps import get_permission_service
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
+
+from app.api.conditional import table_etag
+from app.api.deps import call, get_permission_service, get_role_permission_service
+from app.api.fields import FieldsParam, parse_fields
+from app.api.pagination import DEFAULT_PAGE_SIZE, PageCursor, PageLimit, decode_cursor, paginate
+from app.api.responses import list_response
 from app.application.services.permission_service import PermissionService
-from app.domain.schemas import PermissionCreate, PermissionRead, PermissionUpdate
+from app.application.services.role_permission_service import RolePermissionService
+from app.domain.schemas import (
+    MAX_BULK_ITEMS,
+    PermissionBulkResult,
+    PermissionCreate,
+    PermissionRead,
+    PermissionUpdate,
+    RoleRead,
+    SearchMode,
+    partial_schema,
+)
+from app.infrastructure.repositories.bulk import BulkConflictError
 
 router = APIRouter(prefix="/permissions", tags=["permissions"])
 
 
 @router.post("/", response_model=PermissionRead, status_code=status.HTTP_201_CREATED)
-def create_permission(
+async def create_permission(
     payload: PermissionCreate, service: PermissionService = Depends(get_permission_service)
 ) -> PermissionRead:
-    return service.create_permission(payload)
+    return await call(service.create_permission, payload)
+
 
+@router.post("/bulk", response_model=PermissionBulkResult)
+async def create_permissions_bulk(
+    payload: Annotated[list[PermissionCreate], Body(min_length=1, max_length=MAX_BULK_ITEMS)],
+    service: PermissionService = Depends(get_permission_service),
+) -> PermissionBulkResult:
+    try:
+        return await call(service.create_permissions, payload)
+    except BulkConflictError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
 
-@router.get("/", response_model=list[PermissionRead])
-def list_permissions(
-    name: str | None = None, service: PermissionService = Depends(get_permission_service)
-) -> list[PermissionRead]:
-    return service.list_permissions(name=name)
+
+@router.get("/", response_model=list[PermissionRead], dependencies=[Depends(table_etag("permissions"))])
+async def list_permissions(
+    response: Response,
+    name: str | None = None,
+    match: SearchMode = SearchMode.substring,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    fields: FieldsParam = None,
+    service: PermissionService = Depends(get_permission_service),
+) -> Response:
+    selected = parse_fields(fields, PermissionRead, ("id",))
+    permissions = await call(
+        service.list_permissions,
+        name=name,
+        match=match,
+        limit=limit + 1,
+        after=decode_cursor(cursor),
+        fields=selected,
+    )
+    page = paginate(response, permissions, limit, lambda permission: (permission.id,))
+    return list_response(response, page, partial_schema(PermissionRead, selected))
+
+
+@router.get(
+    "/{permission_id}/roles",
+    response_model=list[RoleRead],
+    dependencies=[Depends(table_etag("permissions", "role_permissions", "roles"))],
+)
+async def list_roles_of_permission(
+    permission_id: int,
+    response: Response,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    service: RolePermissionService = Depends(get_role_permission_service),
+) -> Response:
+    roles = await call(
+        service.list_roles_for_permission, permission_id, limit=limit + 1, after=decode_cursor(cursor)
+    )
+    if roles is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Permission not found")
+    page = paginate(response, roles, limit, lambda role: (role.id,))
+    return list_response(response, page, RoleRead)
 
 
 @router.put("/{permission_id}", response_model=PermissionRead)
-def update_permission(
+async def update_permission(
     permission_id: int,
     payload: PermissionUpdate,
     service: PermissionService = Depends(get_permission_service),
 ) -> PermissionRead:
-    updated = service.update_permission(permission_id, payload)
+    updated = await call(service.update_permission, permission_id, payload)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Permission not found")
     return updated
 
 
 @router.delete("/{permission_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_permission(
+async def delete_permission(
     permission_id: int, service: PermissionService = Depends(get_permission_service)
 ) -> None:
-    deleted = service.delete_permission(permission_id)
+    deleted = await call(service.delete_permission, permission_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Permission not found")
@@ -1,48 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 
-from app.api.deps import get_role_permission_service
+from app.api.conditional import table_etag
+from app.api.deps import call, get_role_permission_service
+from app.api.fields import FieldsParam, parse_fields
+from app.api.pagination import DEFAULT_PAGE_SIZE, PageCursor, PageLimit, decode_cursor, paginate
+from app.api.responses import list_response
 from app.application.services.role_permission_service import RolePermissionService
-from app.domain.schemas import RolePermissionCreate, RolePermissionRead, RolePermissionUpdate
+from app.domain.schemas import (
+    RolePermissionCreate,
+    RolePermissionRead,
+    RolePermissionUpdate,
+    partial_schema,
+)
 
 router = APIRouter(prefix="/role-permissions", tags=["role-permissions"])
 
 
 @router.post("/", response_model=RolePermissionRead, status_code=status.HTTP_201_CREATED)
-def create_role_permission(
+async def create_role_permission(
     payload: RolePermissionCreate,
     service: RolePermissionService = Depends(get_role_permission_service),
 ) -> RolePermissionRead:
-    return service.create_link(payload)
+    return await call(service.create_link, payload)
 
 
-@router.get("/", response_model=list[RolePermissionRead])
-def list_role_permissions(
+@router.get(
+    "/",
+    response_model=list[RolePermissionRead],
+    dependencies=[Depends(table_etag("role_permissions"))],
+)
+async def list_role_permissions(
+    response: Response,
     role_id: int | None = None,
     permission_id: int | None = None,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    fields: FieldsParam = None,
     service: RolePermissionService = Depends(get_role_permission_service),
-) -> list[RolePermissionRead]:
-    return service.list_links(role_id=role_id, permission_id=permission_id)
+) -> Response:
+    selected = parse_fields(fields, RolePermissionRead, ("role_id", "permission_id"))
+    links = await call(
+        service.list_links,
+        role_id=role_id,
+        permission_id=permission_id,
+        limit=limit + 1,
+        after=decode_cursor(cursor, 2),
+        fields=selected,
+    )
+    page = paginate(response, links, limit, lambda link: (link.role_id, link.permission_id))
+    return list_response(response, page, partial_schema(RolePermissionRead, selected))
 
 
 @router.put("/{role_id}/{permission_id}", response_model=RolePermissionRead)
-def update_role_permission(
+async def update_role_permission(
     role_id: int,
     permission_id: int,
     payload: RolePermissionUpdate,
     service: RolePermissionService = Depends(get_role_permission_service),
 ) -> RolePermissionRead:
-    updated = service.update_link((role_id, permission_id), payload)
+    updated = await call(service.update_link, (role_id, permission_id), payload)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mapping not found")
     return updated
 
 
 @router.delete("/{role_id}/{permission_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_role_permission(
+async def delete_role_permission(
     role_id: int,
     permission_id: int,
     service: RolePermissionService = Depends(get_role_permission_service),
 ) -> None:
-    deleted = service.delete_link((role_id, permission_id))
+    deleted = await call(service.delete_link, (role_id, permission_id))
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mapping not found")
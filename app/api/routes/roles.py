@@ -1,34 +1,194 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated
 
-from app.api.deps import get_role_service
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
+
+from app.api.conditional import table_etag
+from app.api.deps import call, get_role_permission_service, get_role_service, get_user_role_service
+from app.api.fields import FieldsParam, IncludeParam, parse_fields, parse_include
+from app.api.pagination import DEFAULT_PAGE_SIZE, PageCursor, PageLimit, decode_cursor, paginate
+from app.api.responses import list_response
+from app.application.services.role_permission_service import RolePermissionService
 from app.application.services.role_service import RoleService
-from app.domain.schemas import RoleCreate, RoleRead, RoleUpdate
+from app.application.services.user_role_service import UserRoleService
+from app.domain.schemas import (
+    MAX_BULK_ITEMS,
+    ROLE_RELATIONS,
+    LinkSetDiff,
+    PermissionRead,
+    RoleBulkResult,
+    RoleCreate,
+    RoleParentDiff,
+    RoleParentSet,
+    RolePermissionSet,
+    RoleRead,
+    RoleUpdate,
+    SearchMode,
+    UserRead,
+    shaped_schema,
+)
+from app.infrastructure.repositories.bulk import BulkConflictError
 
 router = APIRouter(prefix="/roles", tags=["roles"])
 
 
 @router.post("/", response_model=RoleRead, status_code=status.HTTP_201_CREATED)
-def create_role(payload: RoleCreate, service: RoleService = Depends(get_role_service)) -> RoleRead:
-    return service.create_role(payload)
+async def create_role(payload: RoleCreate, service: RoleService = Depends(get_role_service)) -> RoleRead:
+    return await call(service.create_role, payload)
+
+
+@router.post("/bulk", response_model=RoleBulkResult)
+async def create_roles_bulk(
+    payload: Annotated[list[RoleCreate], Body(min_length=1, max_length=MAX_BULK_ITEMS)],
+    service: RoleService = Depends(get_role_service),
+) -> RoleBulkResult:
+    try:
+        return await call(service.create_roles, payload)
+    except BulkConflictError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
 
 
-@router.get("/", response_model=list[RoleRead])
-def list_roles(name: str | None = None, service: RoleService = Depends(get_role_service)) -> list[RoleRead]:
-    return service.list_roles(name=name)
+@router.get(
+    "/",
+    response_model=list[RoleRead],
+    dependencies=[
+        Depends(table_etag("roles", includes={"permissions": ("role_permissions", "permissions")}))
+    ],
+)
+async def list_roles(
+    response: Response,
+    name: str | None = None,
+    match: SearchMode = SearchMode.substring,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    fields: FieldsParam = None,
+    include: IncludeParam = None,
+    service: RoleService = Depends(get_role_service),
+) -> Response:
+    selected = parse_fields(fields, RoleRead, ("id",))
+    relations = parse_include(include, ROLE_RELATIONS)
+    roles = await call(
+        service.list_roles,
+        name=name,
+        match=match,
+        limit=limit + 1,
+        after=decode_cursor(cursor),
+        fields=selected,
+        include=relations,
+    )
+    page = paginate(response, roles, limit, lambda role: (role.id,))
+    return list_response(response, page, shaped_schema(RoleRead, selected, relations, ROLE_RELATIONS))
 
 
 @router.put("/{role_id}", response_model=RoleRead)
-def update_role(
+async def update_role(
     role_id: int, payload: RoleUpdate, service: RoleService = Depends(get_role_service)
 ) -> RoleRead:
-    updated = service.update_role(role_id, payload)
+    updated = await call(service.update_role, role_id, payload)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found")
     return updated
 
 
 @router.delete("/{role_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_role(role_id: int, service: RoleService = Depends(get_role_service)) -> None:
-    deleted = service.delete_role(role_id)
+async def delete_role(role_id: int, service: RoleService = Depends(get_role_service)) -> None:
+    deleted = await call(service.delete_role, role_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found")
+
+
+@router.get(
+    "/{role_id}/permissions",
+    response_model=list[PermissionRead],
+    dependencies=[Depends(table_etag("roles", "role_permissions", "permissions"))],
+)
+async def list_permissions_of_role(
+    role_id: int,
+    response: Response,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    service: RolePermissionService = Depends(get_role_permission_service),
+) -> Response:
+    permissions = await call(
+        service.list_permissions_for_role, role_id, limit=limit + 1, after=decode_cursor(cursor)
+    )
+    if permissions is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found")
+    page = paginate(response, permissions, limit, lambda permission: (permission.id,))
+    return list_response(response, page, PermissionRead)
+
+
+@router.get(
+    "/{role_id}/users",
+    response_model=list[UserRead],
+    dependencies=[Depends(table_etag("roles", "user_roles", "users"))],
+)
+async def list_users_of_role(
+    role_id: int,
+    response: Response,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    service: UserRoleService = Depends(get_user_role_service),
+) -> Response:
+    users = await call(service.list_users_for_role, role_id, limit=limit + 1, after=decode_cursor(cursor))
+    if users is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found")
+    page = paginate(response, users, limit, lambda user: (user.id,))
+    return list_response(response, page, UserRead)
+
+
+@router.put("/{role_id}/permissions", response_model=LinkSetDiff)
+async def replace_role_permissions(
+    role_id: int,
+    payload: RolePermissionSet,
+    service: RolePermissionService = Depends(get_role_permission_service),
+) -> LinkSetDiff:
+    diff = await call(service.replace_role_permissions, role_id, payload)
+    if diff is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found")
+    if diff.unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"message": "Unknown permission ids", "permission_ids": diff.unknown},
+        )
+    return diff
+
+
+@router.get(
+    "/{role_id}/parents",
+    response_model=list[RoleRead],
+    dependencies=[Depends(table_etag("roles", "role_parents"))],
+)
+async def list_parents_of_role(
+    role_id: int,
+    response: Response,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    service: RoleService = Depends(get_role_service),
+) -> Response:
+    parents = await call(service.list_parents, role_id, limit=limit + 1, after=decode_cursor(cursor))
+    if parents is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found")
+    page = paginate(response, parents, limit, lambda role: (role.id,))
+    return list_response(response, page, RoleRead)
+
+
+@router.put("/{role_id}/parents", response_model=RoleParentDiff)
+async def replace_role_parents(
+    role_id: int,
+    payload: RoleParentSet,
+    service: RoleService = Depends(get_role_service),
+) -> RoleParentDiff:
+    diff = await call(service.replace_parents, role_id, payload)
+    if diff is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Role not found")
+    if diff.unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"message": "Unknown role ids", "role_ids": diff.unknown},
+        )
+    if diff.cycles:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Parents would create an inheritance cycle", "parent_ids": diff.cycles},
+        )
+    return diff
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+
+from app.api.deps import call, get_snapshot_service
+from app.application.services.snapshot_service import SnapshotService
+from app.domain.schemas import SnapshotImportRead
+from app.infrastructure.snapshot import MEDIA_TYPE, SnapshotFormatError
+
+router = APIRouter(prefix="/snapshot", tags=["snapshot"])
+
+
+@router.get("", response_class=Response, responses={200: {"content": {MEDIA_TYPE: {}}}})
+async def export_snapshot(service: SnapshotService = Depends(get_snapshot_service)) -> Response:
+    return Response(await call(service.export_snapshot), media_type=MEDIA_TYPE)
+
+
+@router.post("", response_model=SnapshotImportRead)
+async def import_snapshot(
+    request: Request, service: SnapshotService = Depends(get_snapshot_service)
+) -> SnapshotImportRead:
+    data = await request.body()
+    try:
+        return await call(service.import_snapshot, data)
+    except SnapshotFormatError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
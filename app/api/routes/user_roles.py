@@ -1,45 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 
-from app.api.deps import get_user_role_service
+from app.api.conditional import table_etag
+from app.api.deps import call, get_user_role_service
+from app.api.fields import FieldsParam, parse_fields
+from app.api.pagination import DEFAULT_PAGE_SIZE, PageCursor, PageLimit, decode_cursor, paginate
+from app.api.responses import list_response
 from app.application.services.user_role_service import UserRoleService
-from app.domain.schemas import UserRoleCreate, UserRoleRead, UserRoleUpdate
+from app.domain.schemas import UserRoleCreate, UserRoleRead, UserRoleUpdate, partial_schema
 
 router = APIRouter(prefix="/user-roles", tags=["user-roles"])
 
 
 @router.post("/", response_model=UserRoleRead, status_code=status.HTTP_201_CREATED)
-def create_user_role(
+async def create_user_role(
     payload: UserRoleCreate, service: UserRoleService = Depends(get_user_role_service)
 ) -> UserRoleRead:
-    return service.create_link(payload)
+    return await call(service.create_link, payload)
 
 
-@router.get("/", response_model=list[UserRoleRead])
-def list_user_roles(
+@router.get("/", response_model=list[UserRoleRead], dependencies=[Depends(table_etag("user_roles"))])
+async def list_user_roles(
+    response: Response,
     user_id: int | None = None,
     role_id: int | None = None,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    fields: FieldsParam = None,
     service: UserRoleService = Depends(get_user_role_service),
-) -> list[UserRoleRead]:
-    return service.list_links(user_id=user_id, role_id=role_id)
+) -> Response:
+    selected = parse_fields(fields, UserRoleRead, ("user_id", "role_id"))
+    links = await call(
+        service.list_links,
+        user_id=user_id,
+        role_id=role_id,
+        limit=limit + 1,
+        after=decode_cursor(cursor, 2),
+        fields=selected,
+    )
+    page = paginate(response, links, limit, lambda link: (link.user_id, link.role_id))
+    return list_response(response, page, partial_schema(UserRoleRead, selected))
 
 
 @router.put("/{user_id}/{role_id}", response_model=UserRoleRead)
-def update_user_role(
+async def update_user_role(
     user_id: int,
     role_id: int,
     payload: UserRoleUpdate,
     service: UserRoleService = Depends(get_user_role_service),
 ) -> UserRoleRead:
-    updated = service.update_link((user_id, role_id), payload)
+    updated = await call(service.update_link, (user_id, role_id), payload)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mapping not found")
     return updated
 
 
 @router.delete("/{user_id}/{role_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user_role(
+async def delete_user_role(
     user_id: int, role_id: int, service: UserRoleService = Depends(get_user_role_service)
 ) -> None:
-    deleted = service.delete_link((user_id, role_id))
+    deleted = await call(service.delete_link, (user_id, role_id))
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mapping not found")
@@ -1,38 +1,147 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated
 
-from app.api.deps import get_user_service
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
+
+from app.api.conditional import table_etag
+from app.api.deps import call, get_authorization_service, get_user_role_service, get_user_service
+from app.api.fields import FieldsParam, IncludeParam, parse_fields, parse_include
+from app.api.pagination import DEFAULT_PAGE_SIZE, PageCursor, PageLimit, decode_cursor, paginate
+from app.api.responses import list_response
+from app.application.services.authorization_service import AuthorizationService
+from app.application.services.user_role_service import UserRoleService
 from app.application.services.user_service import UserService
-from app.domain.schemas import UserCreate, UserRead, UserUpdate
+from app.domain.schemas import (
+    MAX_BULK_ITEMS,
+    USER_RELATIONS,
+    LinkSetDiff,
+    PermissionCheckRead,
+    RoleRead,
+    SearchMode,
+    UserBulkResult,
+    UserCreate,
+    UserPermissionsRead,
+    UserRead,
+    UserRoleSet,
+    UserUpdate,
+    shaped_schema,
+)
+from app.infrastructure.repositories.bulk import BulkConflictError
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def create_user(payload: UserCreate, service: UserService = Depends(get_user_service)) -> UserRead:
-    return service.create_user(payload)
+async def create_user(payload: UserCreate, service: UserService = Depends(get_user_service)) -> UserRead:
+    return await call(service.create_user, payload)
+
+
+@router.post("/bulk", response_model=UserBulkResult)
+async def create_users_bulk(
+    payload: Annotated[list[UserCreate], Body(min_length=1, max_length=MAX_BULK_ITEMS)],
+    service: UserService = Depends(get_user_service),
+) -> UserBulkResult:
+    try:
+        return await call(service.create_users, payload)
+    except BulkConflictError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
 
 
-@router.get("/", response_model=list[UserRead])
-def list_users(
+@router.get(
+    "/",
+    response_model=list[UserRead],
+    dependencies=[Depends(table_etag("users", includes={"roles": ("user_roles", "roles")}))],
+)
+async def list_users(
+    response: Response,
     username: str | None = None,
     email: str | None = None,
+    match: SearchMode = SearchMode.substring,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    fields: FieldsParam = None,
+    include: IncludeParam = None,
     service: UserService = Depends(get_user_service),
-) -> list[UserRead]:
-    return service.list_users(username=username, email=email)
+) -> Response:
+    selected = parse_fields(fields, UserRead, ("id",))
+    relations = parse_include(include, USER_RELATIONS)
+    users = await call(
+        service.list_users,
+        username=username,
+        email=email,
+        match=match,
+        limit=limit + 1,
+        after=decode_cursor(cursor),
+        fields=selected,
+        include=relations,
+    )
+    page = paginate(response, users, limit, lambda user: (user.id,))
+    return list_response(response, page, shaped_schema(UserRead, selected, relations, USER_RELATIONS))
 
 
 @router.put("/{user_id}", response_model=UserRead)
-def update_user(
+async def update_user(
     user_id: int, payload: UserUpdate, service: UserService = Depends(get_user_service)
 ) -> UserRead:
-    updated = service.update_user(user_id, payload)
+    updated = await call(service.update_user, user_id, payload)
     if not updated:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return updated
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int, service: UserService = Depends(get_user_service)) -> None:
-    deleted = service.delete_user(user_id)
+async def delete_user(user_id: int, service: UserService = Depends(get_user_service)) -> None:
+    deleted = await call(service.delete_user, user_id)
     if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+
+@router.get("/{user_id}/can/{permission_name}", response_model=PermissionCheckRead)
+async def check_user_permission(
+    user_id: int,
+    permission_name: str,
+    service: AuthorizationService = Depends(get_authorization_service),
+) -> PermissionCheckRead:
+    return await call(service.check_permission, user_id, permission_name)
+
+
+@router.get("/{user_id}/permissions", response_model=UserPermissionsRead)
+async def list_user_permissions(
+    user_id: int, service: AuthorizationService = Depends(get_authorization_service)
+) -> UserPermissionsRead:
+    return await call(service.list_user_permissions, user_id)
+
+
+@router.get(
+    "/{user_id}/roles",
+    response_model=list[RoleRead],
+    dependencies=[Depends(table_etag("users", "user_roles", "roles"))],
+)
+async def list_roles_of_user(
+    user_id: int,
+    response: Response,
+    limit: PageLimit = DEFAULT_PAGE_SIZE,
+    cursor: PageCursor = None,
+    service: UserRoleService = Depends(get_user_role_service),
+) -> Response:
+    roles = await call(service.list_roles_for_user, user_id, limit=limit + 1, after=decode_cursor(cursor))
+    if roles is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    page = paginate(response, roles, limit, lambda role: (role.id,))
+    return list_response(response, page, RoleRead)
+
+
+@router.put("/{user_id}/roles", response_model=LinkSetDiff)
+async def replace_user_roles(
+    user_id: int,
+    payload: UserRoleSet,
+    service: UserRoleService = Depends(get_user_role_service),
+) -> LinkSetDiff:
+    diff = await call(service.replace_user_roles, user_id, payload)
+    if diff is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    if diff.unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"message": "Unknown role ids", "role_ids": diff.unknown},
+        )
+    return diff
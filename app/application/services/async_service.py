@@ -0,0 +1,28 @@
+from typing import Any, Callable, Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+ServiceT = TypeVar("ServiceT")
+
+
+class AsyncServiceAdapter(Generic[ServiceT]):
+    """Exposes a service's methods as coroutines running on an ``AsyncSession``.
+
+    Each call builds the synchronous service (and its repositories) on the session's
+    sync facade inside ``run_sync``, so statements go through the async driver without
+    occupying a threadpool worker, and the repository logic exists only once.
+    """
+
+    def __init__(self, session: AsyncSession, build: Callable[[Session], ServiceT]):
+        self.session = session
+        self.build = build
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self.session.run_sync(
+                lambda sync_session: getattr(self.build(sync_session), name)(*args, **kwargs)
+            )
+
+        call.__name__ = name
+        return call
@@ -0,0 +1,77 @@
+from typing import Optional, Union
+
+from app.application.services.permission_index import PermissionIndex
+from app.application.services.shared_permission_index import SharedPermissionIndex
+from app.core.metrics import timed_service
+from app.domain.repositories import AuthorizationRepository
+from app.domain.schemas import (
+    PermissionCheckBatch,
+    PermissionCheckBatchRead,
+    PermissionCheckRead,
+    PermissionHoldersQuery,
+    PermissionHoldersRead,
+    UserPermissionsRead,
+)
+
+
+@timed_service()
+class AuthorizationService:
+    def __init__(
+        self,
+        repository: AuthorizationRepository,
+        index: Optional[Union[PermissionIndex, SharedPermissionIndex]] = None,
+        refresh_index: bool = True,
+    ):
+        self.repository = repository
+        self.index = index
+        # Off on the async path, where the caller loads the index under an asyncio lock; a
+        # check that finds it unloaded is then answered from the repository instead.
+        self.refresh_index = refresh_index
+
+    def _ready_index(self) -> Optional[Union[PermissionIndex, SharedPermissionIndex]]:
+        if self.index is None:
+            return None
+        if not self.index.loaded:
+            if not self.refresh_index:
+                return None
+            self.index.refresh(self.repository.load_graph)
+        return self.index
+
+    def check_permission(self, user_id: int, permission_name: str) -> PermissionCheckRead:
+        index = self._ready_index()
+        if index is None:
+            allowed = self.repository.has_permission(user_id, permission_name)
+        else:
+            allowed = index.has_permission(user_id, permission_name)
+        return PermissionCheckRead(user_id=user_id, permission=permission_name, allowed=allowed)
+
+    def check_permissions(self, batch: PermissionCheckBatch) -> PermissionCheckBatchRead:
+        pairs = [(check.user_id, check.permission) for check in batch.checks]
+        index = self._ready_index()
+        if index is None:
+            granted = self.repository.granted_pairs(pairs)
+            allowed = [pair in granted for pair in pairs]
+        else:
+            allowed = index.check_many(pairs)
+        return PermissionCheckBatchRead(
+            results=[
+                PermissionCheckRead(user_id=user_id, permission=permission, allowed=result)
+                for (user_id, permission), result in zip(pairs, allowed)
+            ]
+        )
+
+    def list_user_permissions(self, user_id: int) -> UserPermissionsRead:
+        index = self._ready_index()
+        if index is None:
+            permissions = self.repository.list_permission_names(user_id)
+        else:
+            permissions = index.permissions_for(user_id)
+        return UserPermissionsRead(user_id=user_id, permissions=permissions)
+
+    def find_permission_holders(self, query: PermissionHoldersQuery) -> PermissionHoldersRead:
+        index = self._ready_index()
+        if index is None:
+            holders = self.repository.list_permission_holders(query.permission, query.user_ids)
+        else:
+            holders = index.users_with_permission(query.permission, query.user_ids)
+        return PermissionHoldersRead(permission=query.permission, user_ids=holders)
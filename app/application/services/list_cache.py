@@ -0,0 +1,73 @@
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.core.metrics import REGISTRY, Counter
+from app.core.versions import TableVersions
+from app.domain.schemas import list_adapter
+from app.infrastructure.cache import CacheBackend, CacheEntry
+
+T = TypeVar("T", bound=BaseModel)
+
+cache_requests_total = REGISTRY.register(
+    Counter("list_cache_requests_total", "List cache lookups by result.", ("table", "result"))
+)
+cache_evictions_total = REGISTRY.register(
+    Counter("list_cache_evictions_total", "List cache entries evicted.", ("table", "reason"))
+)
+
+
+class ListCache:
+    """Read-through cache for list pages, keyed by the version of the table they list.
+
+    Every committed write advances the table's ``TableVersions`` counter in each worker
+    through the change feed, so later reads look pages up under new keys and the old ones
+    are never read again; they age out by TTL or LRU instead of being found and deleted.
+    A page loaded while a write commits is stored under the version read before loading,
+    which that write leaves behind as well.
+    """
+
+    def __init__(self, backend: CacheBackend, versions: TableVersions, ttl: float = 30.0) -> None:
+        self.backend = backend
+        self.versions = versions
+        self.ttl = ttl
+        backend.on_evict = lambda table, reason: cache_evictions_total.labels(table, reason).inc()
+
+    def get_or_load(
+        self,
+        table: str,
+        filters: Dict[str, Any],
+        limit: Optional[int],
+        after: Optional[tuple],
+        load: Callable[[], List[T]],
+        schema: Type[T],
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> List[T]:
+        key = self._key(table, filters, limit, after, fields)
+        entry = self.backend.get(key)
+        if entry is not None:
+            cache_requests_total.labels(table, "hit").inc()
+            if self.backend.serializes:
+                return list_adapter(schema).validate_python(entry.items)
+            return list(entry.items)
+        cache_requests_total.labels(table, "miss").inc()
+        items = load()
+        self.backend.set(key, CacheEntry(table, items), self.ttl)
+        return items
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def _key(
+        self,
+        table: str,
+        filters: Dict[str, Any],
+        limit: Optional[int],
+        after: Optional[tuple],
+        fields: Optional[Tuple[str, ...]],
+    ) -> str:
+        raw = json.dumps([filters, limit, after, fields], sort_keys=True, default=str)
+        digest = hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+        return f"{table}:{self.versions.token([table])}:{digest}"
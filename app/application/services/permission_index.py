@@ -0,0 +1,276 @@
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.changes import Change
+from app.domain.permission_patterns import PatternTrie, is_pattern
+from app.domain.repositories import PermissionGraph
+
+
+class PermissionIndex:
+    """In-process user -> role -> permission index.
+
+    Every permission id is given a dense bit position and every role's grants are kept
+    as an integer bitmask, so a user's effective set is the OR of their role masks and a
+    check is a single AND. A role's mask also covers its ancestors in the role hierarchy;
+    these inherited masks are memoized and dropped whenever grants or edges change.
+    Wildcard permissions (``billing:*``) are compiled into a ``PatternTrie`` of their bits,
+    so a concrete name is turned into the mask of every grant covering it in one walk over
+    its segments and role grants stay plain bitmasks. The index is built lazily from a
+    ``PermissionGraph`` and then kept current by applying committed changes, so checks
+    never touch the database.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._pending: Optional[List[List[Change]]] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._user_roles: Dict[int, Set[int]] = defaultdict(set)
+        self._role_users: Dict[int, Set[int]] = defaultdict(set)
+        self._role_masks: Dict[int, int] = {}
+        self._role_parents: Dict[int, Set[int]] = defaultdict(set)
+        self._role_children: Dict[int, Set[int]] = defaultdict(set)
+        self._inherited_masks: Dict[int, int] = {}
+        self._bits: Dict[int, int] = {}
+        self._bit_owners: List[Optional[int]] = []
+        self._free_bits: List[int] = []
+        self._permission_names: Dict[int, str] = {}
+        self._permission_ids: Dict[str, int] = {}
+        self._patterns = PatternTrie()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded = False
+            self._reset()
+
+    def refresh(self, loader: Callable[[], PermissionGraph]) -> None:
+        with self._load_lock:
+            if self._loaded:
+                return
+            with self._lock:
+                self._pending = []
+            graph = loader()
+            with self._lock:
+                self._reset()
+                for permission_id, name in graph.permissions:
+                    self._set_permission_name(permission_id, name)
+                for user_id, role_id in graph.user_roles:
+                    self._link_user_role(user_id, role_id)
+                for role_id, permission_id in graph.role_permissions:
+                    self._link_role_permission(role_id, permission_id)
+                for role_id, parent_id in graph.role_parents:
+                    self._link_role_parent(role_id, parent_id)
+                self._loaded = True
+                # Changes committed while the graph was being read are replayed; every
+                # patch is idempotent so overlapping with the snapshot is harmless.
+                for changes in self._pending:
+                    self._apply(changes)
+                self._pending = None
+
+    def apply(self, changes: List[Change]) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(changes)
+            if self._loaded:
+                self._apply(changes)
+
+    def user_mask(self, user_id: int) -> int:
+        mask = 0
+        for role_id in self._user_roles.get(user_id, ()):
+            mask |= self._inherited_mask(role_id)
+        return mask
+
+    def has_permission(self, user_id: int, permission_name: str) -> bool:
+        with self._lock:
+            return bool(self.user_mask(user_id) & self._flags_for(permission_name))
+
+    def check_many(self, pairs: Iterable[Tuple[int, str]]) -> List[bool]:
+        with self._lock:
+            masks: Dict[int, int] = {}
+            flags: Dict[str, int] = {}
+            results = []
+            for user_id, permission_name in pairs:
+                flag = flags.get(permission_name)
+                if flag is None:
+                    flag = flags[permission_name] = self._flags_for(permission_name)
+                mask = masks.get(user_id)
+                if mask is None:
+                    mask = masks[user_id] = self.user_mask(user_id)
+                results.append(bool(mask & flag))
+            return results
+
+    def permissions_for(self, user_id: int) -> List[str]:
+        with self._lock:
+            mask = self.user_mask(user_id)
+            names = []
+            while mask:
+                lowest = mask & -mask
+                name = self._permission_names.get(self._bit_owners[lowest.bit_length() - 1])
+                if name is not None:
+                    names.append(name)
+                mask ^= lowest
+            return sorted(names)
+
+    def users_with_permission(
+        self, permission_name: str, user_ids: Optional[Iterable[int]] = None
+    ) -> List[int]:
+        with self._lock:
+            flag = self._flags_for(permission_name)
+            if not flag:
+                return []
+            holder_roles = {role_id for role_id in self._role_users if self._inherited_mask(role_id) & flag}
+            if user_ids is None:
+                holders: Set[int] = set()
+                for role_id in holder_roles:
+                    holders |= self._role_users.get(role_id, set())
+                return sorted(holders)
+            return [
+                user_id
+                for user_id in user_ids
+                if not holder_roles.isdisjoint(self._user_roles.get(user_id, ()))
+            ]
+
+    def _inherited_mask(self, role_id: int) -> int:
+        mask = self._inherited_masks.get(role_id)
+        if mask is None:
+            mask = 0
+            seen = {role_id}
+            frontier = [role_id]
+            while frontier:
+                current = frontier.pop()
+                mask |= self._role_masks.get(current, 0)
+                for parent_id in self._role_parents.get(current, ()):
+                    if parent_id not in seen:
+                        seen.add(parent_id)
+                        frontier.append(parent_id)
+            self._inherited_masks[role_id] = mask
+        return mask
+
+    def _flags_for(self, permission_name: str) -> int:
+        """Bits of the permission named exactly so and of every wildcard pattern covering it."""
+        flags = self._patterns.match(permission_name)
+        permission_id = self._permission_ids.get(permission_name)
+        bit = None if permission_id is None else self._bits.get(permission_id)
+        return flags if bit is None else flags | (1 << bit)
+
+    def _bit_for(self, permission_id: int) -> int:
+        bit = self._bits.get(permission_id)
+        if bit is None:
+            if self._free_bits:
+                bit = self._free_bits.pop()
+                self._bit_owners[bit] = permission_id
+            else:
+                bit = len(self._bit_owners)
+                self._bit_owners.append(permission_id)
+            self._bits[permission_id] = bit
+        return bit
+
+    def _apply(self, changes: List[Change]) -> None:
+        for change in changes:
+            row = change.row
+            if change.op == "reload":
+                # Bulk replacements are not itemized; the next check reloads the whole graph.
+                self._loaded = False
+                self._reset()
+                return
+            if change.table == "user_roles":
+                if change.op == "insert":
+                    self._link_user_role(row["user_id"], row["role_id"])
+                elif change.op == "delete":
+                    self._unlink_user_role(row["user_id"], row["role_id"])
+            elif change.table == "role_permissions":
+                if change.op == "insert":
+                    self._link_role_permission(row["role_id"], row["permission_id"])
+                elif change.op == "delete":
+                    self._unlink_role_permission(row["role_id"], row["permission_id"])
+            elif change.table == "role_parents":
+                if change.op == "insert":
+                    self._link_role_parent(row["role_id"], row["parent_id"])
+                elif change.op == "delete":
+                    self._unlink_role_parent(row["role_id"], row["parent_id"])
+            elif change.table == "permissions":
+                if change.op == "delete":
+                    self._drop_permission(row["id"])
+                else:
+                    self._set_permission_name(row["id"], row["name"])
+            elif change.table == "roles" and change.op == "delete":
+                self._drop_role(row["id"])
+            elif change.table == "users" and change.op == "delete":
+                self._drop_user(row["id"])
+
+    def _link_user_role(self, user_id: int, role_id: int) -> None:
+        self._user_roles[user_id].add(role_id)
+        self._role_users[role_id].add(user_id)
+
+    def _unlink_user_role(self, user_id: int, role_id: int) -> None:
+        self._user_roles.get(user_id, set()).discard(role_id)
+        self._role_users.get(role_id, set()).discard(user_id)
+
+    def _link_role_permission(self, role_id: int, permission_id: int) -> None:
+        self._role_masks[role_id] = self._role_masks.get(role_id, 0) | (1 << self._bit_for(permission_id))
+        self._inherited_masks.clear()
+
+    def _unlink_role_permission(self, role_id: int, permission_id: int) -> None:
+        bit = self._bits.get(permission_id)
+        if bit is not None and role_id in self._role_masks:
+            self._role_masks[role_id] &= ~(1 << bit)
+            self._inherited_masks.clear()
+
+    def _link_role_parent(self, role_id: int, parent_id: int) -> None:
+        self._role_parents[role_id].add(parent_id)
+        self._role_children[parent_id].add(role_id)
+        self._inherited_masks.clear()
+
+    def _unlink_role_parent(self, role_id: int, parent_id: int) -> None:
+        self._role_parents.get(role_id, set()).discard(parent_id)
+        self._role_children.get(parent_id, set()).discard(role_id)
+        self._inherited_masks.clear()
+
+    def _set_permission_name(self, permission_id: int, name: str) -> None:
+        previous = self._permission_names.get(permission_id)
+        if previous is not None and self._permission_ids.get(previous) == permission_id:
+            del self._permission_ids[previous]
+        bit = self._bit_for(permission_id)
+        if previous is not None and is_pattern(previous):
+            self._patterns.discard(previous, bit)
+        if is_pattern(name):
+            self._patterns.add(name, bit)
+        self._permission_names[permission_id] = name
+        self._permission_ids[name] = permission_id
+
+    def _drop_permission(self, permission_id: int) -> None:
+        bit = self._bits.pop(permission_id, None)
+        name = self._permission_names.pop(permission_id, None)
+        if bit is not None and name is not None and is_pattern(name):
+            self._patterns.discard(name, bit)
+        if bit is not None:
+            cleared = ~(1 << bit)
+            for role_id, mask in self._role_masks.items():
+                self._role_masks[role_id] = mask & cleared
+            self._inherited_masks.clear()
+            self._bit_owners[bit] = None
+            self._free_bits.append(bit)
+        if name is not None and self._permission_ids.get(name) == permission_id:
+            del self._permission_ids[name]
+
+    def _drop_role(self, role_id: int) -> None:
+        for user_id in self._role_users.pop(role_id, set()):
+            self._user_roles.get(user_id, set()).discard(role_id)
+        self._role_masks.pop(role_id, None)
+        for parent_id in self._role_parents.pop(role_id, set()):
+            self._role_children.get(parent_id, set()).discard(role_id)
+        for child_id in self._role_children.pop(role_id, set()):
+            self._role_parents.get(child_id, set()).discard(role_id)
+        self._inherited_masks.clear()
+
+    def _drop_user(self, user_id: int) -> None:
+        for role_id in self._user_roles.pop(user_id, set()):
+            self._role_users.get(role_id, set()).discard(user_id)
@@ -1,19 +1,54 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
-from app.domain.schemas import PermissionCreate, PermissionRead, PermissionUpdate
+from app.application.services.list_cache import ListCache
+from app.core.metrics import timed_service
+from app.domain.schemas import (
+    PermissionBulkResult,
+    PermissionCreate,
+    PermissionRead,
+    PermissionUpdate,
+    SearchMode,
+    list_adapter,
+    partial_schema,
+)
 from app.domain.repositories import PermissionRepository
 
 
+@timed_service()
 class PermissionService:
-    def __init__(self, repository: PermissionRepository):
+    def __init__(self, repository: PermissionRepository, cache: Optional[ListCache] = None):
         self.repository = repository
+        self.cache = cache
 
     def create_permission(self, data: PermissionCreate) -> PermissionRead:
         return PermissionRead.model_validate(self.repository.create(data))
 
-    def list_permissions(self, name: Optional[str] = None) -> List[PermissionRead]:
-        permissions = self.repository.get_all(name=name)
-        return [PermissionRead.model_validate(permission) for permission in permissions]
+    def create_permissions(self, items: List[PermissionCreate]) -> PermissionBulkResult:
+        created, errors = self.repository.create_many(items)
+        return PermissionBulkResult(
+            created=[PermissionRead.model_validate(item) for item in created], errors=errors
+        )
+
+    def list_permissions(
+        self,
+        name: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+        match: SearchMode = SearchMode.substring,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> List[PermissionRead]:
+        schema = partial_schema(PermissionRead, fields)
+
+        def load() -> List[PermissionRead]:
+            permissions = self.repository.get_all(
+                name=name, limit=limit, after=after, match=match, fields=fields
+            )
+            return list_adapter(schema).validate_python(permissions, from_attributes=True)
+
+        if self.cache is None:
+            return load()
+        filters = {"name": name, "match": match.value}
+        return self.cache.get_or_load("permissions", filters, limit, after, load, schema, fields)
 
     def update_permission(self, permission_id: int, data: PermissionUpdate) -> Optional[PermissionRead]:
         updated = self.repository.update(permission_id, data)
@@ -21,3 +56,7 @@ class PermissionService:
 
     def delete_permission(self, permission_id: int) -> bool:
         return self.repository.delete(permission_id)
+
+    def export_permissions(self, batch_size: int = 1000) -> Iterator[List[PermissionRead]]:
+        for batch in self.repository.stream(batch_size):
+            yield list_adapter(PermissionRead).validate_python(batch, from_attributes=True)
@@ -1,22 +1,67 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
-from app.domain.schemas import RolePermissionCreate, RolePermissionRead, RolePermissionUpdate
+from app.application.services.list_cache import ListCache
+from app.core.metrics import timed_service
+from app.domain.schemas import (
+    LinkSetDiff,
+    PermissionRead,
+    RolePermissionCreate,
+    RolePermissionRead,
+    RolePermissionSet,
+    RolePermissionUpdate,
+    RoleRead,
+    list_adapter,
+    partial_schema,
+)
 from app.domain.repositories import RolePermissionRepository
 
 
+@timed_service()
 class RolePermissionService:
-    def __init__(self, repository: RolePermissionRepository):
+    def __init__(self, repository: RolePermissionRepository, cache: Optional[ListCache] = None):
         self.repository = repository
+        self.cache = cache
 
     def create_link(self, data: RolePermissionCreate) -> RolePermissionRead:
         created = self.repository.create(data)
         return RolePermissionRead(**created)
 
     def list_links(
-        self, role_id: Optional[int] = None, permission_id: Optional[int] = None
+        self,
+        role_id: Optional[int] = None,
+        permission_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+        fields: Optional[Tuple[str, ...]] = None,
     ) -> List[RolePermissionRead]:
-        rows = self.repository.get_all(role_id=role_id, permission_id=permission_id)
-        return [RolePermissionRead(**row) for row in rows]
+        schema = partial_schema(RolePermissionRead, fields)
+
+        def load() -> List[RolePermissionRead]:
+            rows = self.repository.get_all(
+                role_id=role_id, permission_id=permission_id, limit=limit, after=after, fields=fields
+            )
+            return list_adapter(schema).validate_python(rows)
+
+        if self.cache is None:
+            return load()
+        filters = {"role_id": role_id, "permission_id": permission_id}
+        return self.cache.get_or_load("role_permissions", filters, limit, after, load, schema, fields)
+
+    def list_permissions_for_role(
+        self, role_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[PermissionRead]]:
+        permissions = self.repository.list_permissions_for_role(role_id, limit=limit, after=after)
+        if permissions is None:
+            return None
+        return list_adapter(PermissionRead).validate_python(permissions, from_attributes=True)
+
+    def list_roles_for_permission(
+        self, permission_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[RoleRead]]:
+        roles = self.repository.list_roles_for_permission(permission_id, limit=limit, after=after)
+        if roles is None:
+            return None
+        return list_adapter(RoleRead).validate_python(roles, from_attributes=True)
 
     def update_link(
         self, identifier: tuple, data: RolePermissionUpdate
@@ -24,5 +69,12 @@ class RolePermissionService:
         updated = self.repository.update(identifier, data)
         return RolePermissionRead(**updated) if updated else None
 
+    def replace_role_permissions(self, role_id: int, data: RolePermissionSet) -> Optional[LinkSetDiff]:
+        return self.repository.replace_for_role(role_id, data.permission_ids)
+
     def delete_link(self, identifier: tuple) -> bool:
         return self.repository.delete(identifier)
+
+    def export_links(self, batch_size: int = 1000) -> Iterator[List[RolePermissionRead]]:
+        for batch in self.repository.stream(batch_size):
+            yield list_adapter(RolePermissionRead).validate_python(batch)
@@ -1,19 +1,59 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
-from app.domain.schemas import RoleCreate, RoleRead, RoleUpdate
+from app.application.services.list_cache import ListCache
+from app.core.metrics import timed_service
+from app.domain.schemas import (
+    ROLE_RELATIONS,
+    RoleBulkResult,
+    RoleCreate,
+    RoleParentDiff,
+    RoleParentSet,
+    RoleRead,
+    RoleUpdate,
+    SearchMode,
+    list_adapter,
+    shaped_schema,
+)
 from app.domain.repositories import RoleRepository
 
 
+@timed_service()
 class RoleService:
-    def __init__(self, repository: RoleRepository):
+    def __init__(self, repository: RoleRepository, cache: Optional[ListCache] = None):
         self.repository = repository
+        self.cache = cache
 
     def create_role(self, data: RoleCreate) -> RoleRead:
         return RoleRead.model_validate(self.repository.create(data))
 
-    def list_roles(self, name: Optional[str] = None) -> List[RoleRead]:
-        roles = self.repository.get_all(name=name)
-        return [RoleRead.model_validate(role) for role in roles]
+    def create_roles(self, items: List[RoleCreate]) -> RoleBulkResult:
+        created, errors = self.repository.create_many(items)
+        return RoleBulkResult(
+            created=[RoleRead.model_validate(item) for item in created], errors=errors
+        )
+
+    def list_roles(
+        self,
+        name: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+        match: SearchMode = SearchMode.substring,
+        fields: Optional[Tuple[str, ...]] = None,
+        include: Tuple[str, ...] = (),
+    ) -> List[RoleRead]:
+        schema = shaped_schema(RoleRead, fields, include, ROLE_RELATIONS)
+
+        def load() -> List[RoleRead]:
+            roles = self.repository.get_all(
+                name=name, limit=limit, after=after, match=match, fields=fields, include=include
+            )
+            return list_adapter(schema).validate_python(roles, from_attributes=True)
+
+        # Cached pages are invalidated by writes to ``roles`` only, so embedded links bypass it.
+        if self.cache is None or include:
+            return load()
+        filters = {"name": name, "match": match.value}
+        return self.cache.get_or_load("roles", filters, limit, after, load, schema, fields)
 
     def update_role(self, role_id: int, data: RoleUpdate) -> Optional[RoleRead]:
         updated = self.repository.update(role_id, data)
@@ -21,3 +61,18 @@ class RoleService:
 
     def delete_role(self, role_id: int) -> bool:
         return self.repository.delete(role_id)
+
+    def replace_parents(self, role_id: int, data: RoleParentSet) -> Optional[RoleParentDiff]:
+        return self.repository.replace_parents(role_id, data.parent_ids)
+
+    def list_parents(
+        self, role_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[RoleRead]]:
+        parents = self.repository.list_parents(role_id, limit=limit, after=after)
+        if parents is None:
+            return None
+        return list_adapter(RoleRead).validate_python(parents, from_attributes=True)
+
+    def export_roles(self, batch_size: int = 1000) -> Iterator[List[RoleRead]]:
+        for batch in self.repository.stream(batch_size):
+            yield list_adapter(RoleRead).validate_python(batch, from_attributes=True)
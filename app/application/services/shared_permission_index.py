@@ -0,0 +1,154 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.changes import Change
+from app.domain.permission_patterns import candidate_patterns
+from app.domain.repositories import PermissionGraph
+from app.infrastructure.change_log import MAX_TRACKED_GAP
+from app.infrastructure.index_file import IndexFile, build_lock, open_current, publish_index
+
+# Tables whose changes can alter an answer of the index.
+GRAPH_TABLES = {"users", "roles", "permissions", "user_roles", "role_permissions", "role_parents"}
+
+
+class SharedPermissionIndex:
+    """Permission index compiled once per node into a memory-mapped file.
+
+    Same interface as ``PermissionIndex``, but the compiled graph lives in an
+    ``IndexFile`` under ``directory`` that every worker maps read-only, so the pages are
+    shared instead of each worker holding its own copy. Each generation is stamped with the
+    change-log sequence it was read at and the lower sequences still uncommitted then. A
+    worker that sees a relevant change the generation lacks (a newer one, or a late commit
+    under one of those holes) marks itself stale; on the next check it maps the current
+    generation if that covers every change seen, and otherwise one worker rebuilds it under
+    a file lock while the others wait and then map it.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._load_lock = threading.Lock()
+        self._file: Optional[IndexFile] = None
+        self._required_seq = 0
+        # Sequences of applied changes, checked against a generation's holes; only the last
+        # ``MAX_TRACKED_GAP`` below ``_required_seq`` can fall into one.
+        self._applied_seqs: Set[int] = set()
+        self._applied_lock = threading.Lock()
+        # Set by a change committed under a hole of the mapped generation.
+        self._missing = False
+        # Set by a change that has no change-log sequence, which only a rebuild can reflect.
+        self._stale = False
+
+    @property
+    def loaded(self) -> bool:
+        current = self._file
+        return (
+            current is not None
+            and not self._stale
+            and not self._missing
+            and current.seq >= self._required_seq
+        )
+
+    @property
+    def generation(self) -> Optional[int]:
+        current = self._file
+        return None if current is None else current.generation
+
+    def invalidate(self) -> None:
+        self._file = None
+        self._stale = True
+
+    def require(self, seq: int) -> None:
+        self._required_seq = max(self._required_seq, seq)
+
+    def refresh(self, loader: Callable[[], PermissionGraph]) -> None:
+        with self._load_lock:
+            if self.loaded:
+                return
+            stale, self._stale = self._stale, False
+            self._missing = False
+            current = None if stale else open_current(self.directory)
+            if not self._covers(current):
+                with build_lock(self.directory):
+                    # Another worker may have published while this one waited for the lock.
+                    current = None if stale else open_current(self.directory)
+                    if not self._covers(current):
+                        current = publish_index(self.directory, loader())
+            self._file = current
+            # A change applied while the graph was read may sit under one of its holes.
+            self._missing = not self._covers(current)
+
+    def apply(self, changes: List[Change]) -> None:
+        for change in changes:
+            if change.table not in GRAPH_TABLES:
+                continue
+            if change.seq is None:
+                self._stale = True
+                continue
+            self.require(change.seq)
+            with self._applied_lock:
+                self._applied_seqs.add(change.seq)
+                if len(self._applied_seqs) > 2 * MAX_TRACKED_GAP:
+                    floor = self._required_seq - MAX_TRACKED_GAP
+                    self._applied_seqs = {seq for seq in self._applied_seqs if seq > floor}
+            current = self._file
+            if current is not None and change.seq in current.unseen_seqs:
+                self._missing = True
+
+    def _covers(self, current: Optional[IndexFile]) -> bool:
+        if current is None or current.seq < self._required_seq:
+            return False
+        with self._applied_lock:
+            return self._applied_seqs.isdisjoint(current.unseen_seqs)
+
+    def has_permission(self, user_id: int, permission_name: str) -> bool:
+        current = self._file
+        permission_ids = self._ids_for(current, permission_name)
+        return bool(permission_ids) and any(
+            current.role_has_any(role_id, permission_ids) for role_id in current.roles_of(user_id)
+        )
+
+    def check_many(self, pairs: Iterable[Tuple[int, str]]) -> List[bool]:
+        current = self._file
+        ids: Dict[str, List[int]] = {}
+        roles: Dict[int, memoryview] = {}
+        results = []
+        for user_id, permission_name in pairs:
+            permission_ids = ids.get(permission_name)
+            if permission_ids is None:
+                permission_ids = ids[permission_name] = self._ids_for(current, permission_name)
+            user_roles = roles.get(user_id)
+            if user_roles is None:
+                user_roles = roles[user_id] = current.roles_of(user_id)
+            results.append(
+                bool(permission_ids)
+                and any(current.role_has_any(role_id, permission_ids) for role_id in user_roles)
+            )
+        return results
+
+    def permissions_for(self, user_id: int) -> List[str]:
+        current = self._file
+        permission_ids: Set[int] = set()
+        for role_id in current.roles_of(user_id):
+            permission_ids.update(current.role_grants(role_id))
+        names = [current.permission_name(permission_id) for permission_id in permission_ids]
+        return sorted(name for name in names if name is not None)
+
+    def users_with_permission(
+        self, permission_name: str, user_ids: Optional[Iterable[int]] = None
+    ) -> List[int]:
+        current = self._file
+        permission_ids = self._ids_for(current, permission_name)
+        if not permission_ids:
+            return []
+        holder_roles = {
+            role_id for role_id in current.role_ids if current.role_has_any(role_id, permission_ids)
+        }
+        if user_ids is None:
+            user_ids = current.user_ids
+        return [user_id for user_id in user_ids if not holder_roles.isdisjoint(current.roles_of(user_id))]
+
+    @staticmethod
+    def _ids_for(current: IndexFile, permission_name: str) -> List[int]:
+        """Ids of the permission named exactly so and of every wildcard pattern covering it."""
+        ids = (current.permission_id(candidate) for candidate in candidate_patterns(permission_name))
+        return sorted(permission_id for permission_id in ids if permission_id is not None)
@@ -0,0 +1,15 @@
+from app.core.metrics import timed_service
+from app.domain.repositories import SnapshotRepository
+from app.domain.schemas import SnapshotImportRead
+
+
+@timed_service()
+class SnapshotService:
+    def __init__(self, repository: SnapshotRepository):
+        self.repository = repository
+
+    def export_snapshot(self) -> bytes:
+        return self.repository.export()
+
+    def import_snapshot(self, data: bytes) -> SnapshotImportRead:
+        return SnapshotImportRead(tables=self.repository.restore(data))
@@ -1,24 +1,78 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
-from app.domain.schemas import UserRoleCreate, UserRoleRead, UserRoleUpdate
+from app.application.services.list_cache import ListCache
+from app.core.metrics import timed_service
+from app.domain.schemas import (
+    LinkSetDiff,
+    RoleRead,
+    UserRead,
+    UserRoleCreate,
+    UserRoleRead,
+    UserRoleSet,
+    UserRoleUpdate,
+    list_adapter,
+    partial_schema,
+)
 from app.domain.repositories import UserRoleRepository
 
 
+@timed_service()
 class UserRoleService:
-    def __init__(self, repository: UserRoleRepository):
+    def __init__(self, repository: UserRoleRepository, cache: Optional[ListCache] = None):
         self.repository = repository
+        self.cache = cache
 
     def create_link(self, data: UserRoleCreate) -> UserRoleRead:
         created = self.repository.create(data)
         return UserRoleRead(**created)
 
-    def list_links(self, user_id: Optional[int] = None, role_id: Optional[int] = None) -> List[UserRoleRead]:
-        rows = self.repository.get_all(user_id=user_id, role_id=role_id)
-        return [UserRoleRead(**row) for row in rows]
+    def list_links(
+        self,
+        user_id: Optional[int] = None,
+        role_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> List[UserRoleRead]:
+        schema = partial_schema(UserRoleRead, fields)
+
+        def load() -> List[UserRoleRead]:
+            rows = self.repository.get_all(
+                user_id=user_id, role_id=role_id, limit=limit, after=after, fields=fields
+            )
+            return list_adapter(schema).validate_python(rows)
+
+        if self.cache is None:
+            return load()
+        filters = {"user_id": user_id, "role_id": role_id}
+        return self.cache.get_or_load("user_roles", filters, limit, after, load, schema, fields)
+
+    def list_roles_for_user(
+        self, user_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[RoleRead]]:
+        roles = self.repository.list_roles_for_user(user_id, limit=limit, after=after)
+        if roles is None:
+            return None
+        return list_adapter(RoleRead).validate_python(roles, from_attributes=True)
+
+    def list_users_for_role(
+        self, role_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[UserRead]]:
+        users = self.repository.list_users_for_role(role_id, limit=limit, after=after)
+        if users is None:
+            return None
+        return list_adapter(UserRead).validate_python(users, from_attributes=True)
 
     def update_link(self, identifier: tuple, data: UserRoleUpdate) -> Optional[UserRoleRead]:
         updated = self.repository.update(identifier, data)
         return UserRoleRead(**updated) if updated else None
 
+    def replace_user_roles(self, user_id: int, data: UserRoleSet) -> Optional[LinkSetDiff]:
+        return self.repository.replace_for_user(user_id, data.role_ids)
+
     def delete_link(self, identifier: tuple) -> bool:
         return self.repository.delete(identifier)
+
+    def export_links(self, batch_size: int = 1000) -> Iterator[List[UserRoleRead]]:
+        for batch in self.repository.stream(batch_size):
+            yield list_adapter(UserRoleRead).validate_python(batch)
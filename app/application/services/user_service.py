@@ -1,9 +1,20 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
-from app.domain.schemas import UserCreate, UserRead, UserUpdate
+from app.core.metrics import timed_service
+from app.domain.schemas import (
+    USER_RELATIONS,
+    SearchMode,
+    UserBulkResult,
+    UserCreate,
+    UserRead,
+    UserUpdate,
+    list_adapter,
+    shaped_schema,
+)
 from app.domain.repositories import UserRepository
 
 
+@timed_service()
 class UserService:
     def __init__(self, repository: UserRepository):
         self.repository = repository
@@ -11,9 +22,33 @@ class UserService:
     def create_user(self, data: UserCreate) -> UserRead:
         return UserRead.model_validate(self.repository.create(data))
 
-    def list_users(self, username: Optional[str] = None, email: Optional[str] = None) -> List[UserRead]:
-        users = self.repository.get_all(username=username, email=email)
-        return [UserRead.model_validate(user) for user in users]
+    def create_users(self, items: List[UserCreate]) -> UserBulkResult:
+        created, errors = self.repository.create_many(items)
+        return UserBulkResult(
+            created=[UserRead.model_validate(item) for item in created], errors=errors
+        )
+
+    def list_users(
+        self,
+        username: Optional[str] = None,
+        email: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[tuple] = None,
+        match: SearchMode = SearchMode.substring,
+        fields: Optional[Tuple[str, ...]] = None,
+        include: Tuple[str, ...] = (),
+    ) -> List[UserRead]:
+        schema = shaped_schema(UserRead, fields, include, USER_RELATIONS)
+        users = self.repository.get_all(
+            username=username,
+            email=email,
+            limit=limit,
+            after=after,
+            match=match,
+            fields=fields,
+            include=include,
+        )
+        return list_adapter(schema).validate_python(users, from_attributes=True)
 
     def update_user(self, user_id: int, data: UserUpdate) -> Optional[UserRead]:
         updated = self.repository.update(user_id, data)
@@ -21,3 +56,7 @@ class UserService:
 
     def delete_user(self, user_id: int) -> bool:
         return self.repository.delete(user_id)
+
+    def export_users(self, batch_size: int = 1000) -> Iterator[List[UserRead]]:
+        for batch in self.repository.stream(batch_size):
+            yield list_adapter(UserRead).validate_python(batch, from_attributes=True)
@@ -0,0 +1,121 @@
+import argparse
+import sys
+from typing import List, Optional
+
+from app.core.database import SessionLocal
+from app.infrastructure.repositories.effective_permission_repository import (
+    SQLAlchemyEffectivePermissionRepository,
+)
+from app.infrastructure.repositories.role_hierarchy_repository import SQLAlchemyRoleHierarchyRepository
+from app.infrastructure.repositories.snapshot_repository import SQLAlchemySnapshotRepository
+from app.infrastructure.search import rebuild_search_tables
+from app.infrastructure.snapshot import SnapshotFormatError
+
+
+def rebuild_role_closure(args: argparse.Namespace) -> int:
+    with SessionLocal() as session:
+        count = SQLAlchemyRoleHierarchyRepository(session).rebuild()
+    print(f"Rebuilt role_closure with {count} rows")
+    return 0
+
+
+def rebuild_effective_permissions(args: argparse.Namespace) -> int:
+    with SessionLocal() as session:
+        # Grants are joined through role_closure, so it is rebuilt first.
+        SQLAlchemyRoleHierarchyRepository(session).rebuild()
+        count = SQLAlchemyEffectivePermissionRepository(session).rebuild()
+    print(f"Rebuilt user_effective_permissions with {count} rows")
+    return 0
+
+
+def check_effective_permissions(args: argparse.Namespace) -> int:
+    with SessionLocal() as session:
+        drift = SQLAlchemyEffectivePermissionRepository(session).find_drift()
+    for row in drift[: args.limit]:
+        print(
+            f"user={row.user_id} permission={row.permission_id} "
+            f"expected={row.expected} actual={row.actual}"
+        )
+    if drift:
+        print(f"{len(drift)} inconsistent rows in user_effective_permissions")
+        return 1
+    print("user_effective_permissions is consistent")
+    return 0
+
+
+def export_snapshot(args: argparse.Namespace) -> int:
+    with SessionLocal() as session:
+        data = SQLAlchemySnapshotRepository(session).export()
+    with open(args.path, "wb") as handle:
+        handle.write(data)
+    print(f"Wrote {len(data)} bytes to {args.path}")
+    return 0
+
+
+def import_snapshot(args: argparse.Namespace) -> int:
+    with open(args.path, "rb") as handle:
+        data = handle.read()
+    with SessionLocal() as session:
+        try:
+            counts = SQLAlchemySnapshotRepository(session).restore(data)
+        except SnapshotFormatError as exc:
+            print(f"Invalid snapshot: {exc}")
+            return 1
+    print("Restored " + ", ".join(f"{table}={rows}" for table, rows in counts.items()))
+    return 0
+
+
+def rebuild_search_index(args: argparse.Namespace) -> int:
+    with SessionLocal() as session:
+        rebuilt = rebuild_search_tables(session)
+    if rebuilt:
+        print(f"Rebuilt search tables: {', '.join(rebuilt)}")
+    else:
+        print("Search indexes are maintained by the database (pg_trgm); nothing to rebuild")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="RBAC maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser(
+        "rebuild-effective-permissions", help="Recompute user_effective_permissions from the link tables"
+    )
+    rebuild.set_defaults(handler=rebuild_effective_permissions)
+
+    closure = commands.add_parser(
+        "rebuild-role-closure", help="Recompute role_closure from the role_parents edges"
+    )
+    closure.set_defaults(handler=rebuild_role_closure)
+
+    check = commands.add_parser(
+        "check-effective-permissions", help="Report rows that disagree with the link tables"
+    )
+    check.add_argument("--limit", type=int, default=50, help="Maximum number of rows to print")
+    check.set_defaults(handler=check_effective_permissions)
+
+    dump = commands.add_parser("export-snapshot", help="Write the RBAC graph to a binary snapshot file")
+    dump.add_argument("path")
+    dump.set_defaults(handler=export_snapshot)
+
+    restore = commands.add_parser(
+        "import-snapshot", help="Replace every RBAC table with the contents of a snapshot file"
+    )
+    restore.add_argument("path")
+    restore.set_defaults(handler=import_snapshot)
+
+    search = commands.add_parser(
+        "rebuild-search-index", help="Create and repopulate the SQLite FTS5 search tables"
+    )
+    search.set_defaults(handler=rebuild_search_index)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import UnboundExecutionError
+from sqlalchemy.orm import Session
+
+_PENDING_KEY = "rbac_pending_changes"
+
+
+@dataclass(frozen=True)
+class Change:
+    table: str
+    op: str
+    row: dict = field(default_factory=dict)
+    # Position in the shared change log, when one is installed.
+    seq: Optional[int] = None
+
+
+ChangeListener = Callable[[List[Change]], None]
+
+_listeners: List[Tuple[ChangeListener, Optional[URL]]] = []
+
+
+def subscribe(listener: ChangeListener, database: Optional[URL] = None) -> None:
+    """``database`` limits the listener to changes committed to that database."""
+    _listeners.append((listener, database))
+
+
+def unsubscribe(listener: ChangeListener) -> None:
+    _listeners[:] = [entry for entry in _listeners if entry[0] != listener]
+
+
+def record_change(session: Session, table: str, op: str, **row) -> None:
+    session.info.setdefault(_PENDING_KEY, []).append(Change(table, op, row))
+
+
+def pending_changes(session: Session) -> List[Change]:
+    return session.info.get(_PENDING_KEY, [])
+
+
+def publish(changes: List[Change], database: Optional[URL] = None) -> None:
+    for listener, wanted in list(_listeners):
+        if wanted is None or database is None or wanted == database:
+            listener(changes)
+
+
+def _database_of(session: Session) -> Optional[URL]:
+    try:
+        return session.get_bind().engine.url
+    except UnboundExecutionError:
+        return None
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_committed_changes(session: Session) -> None:
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        publish(changes, _database_of(session))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
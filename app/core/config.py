@@ -1,6 +1,7 @@
 from functools import lru_cache
+from typing import Optional
 
-from pydantic import Field
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings
 
 
@@ -11,10 +12,68 @@ class Settings(BaseSettings):
         description="SQLAlchemy-compatible database URL",
     )
     debug: bool = Field(default=True)
+    pool_size: int = Field(default=5, description="Connections kept open in the pool")
+    max_overflow: int = Field(default=10, description="Extra connections allowed above pool_size")
+    pool_timeout: float = Field(default=30.0, description="Seconds to wait for a free connection")
+    pool_recycle: int = Field(default=1800, description="Reconnect connections older than this; -1 disables")
+    pool_pre_ping: bool = Field(default=True, description="Test connections on checkout")
+    statement_timeout_ms: Optional[int] = Field(
+        default=None, description="Server-side statement timeout in milliseconds (PostgreSQL)"
+    )
+    n_plus_one_threshold: int = Field(
+        default=5, description="Log a statement repeated this many times in one request as a likely N+1"
+    )
+    cache_backend: str = Field(
+        default="memory", description="List cache backend: 'memory' (LRU+TTL), 'redis' or 'none'"
+    )
+    cache_ttl_seconds: float = Field(default=30.0, description="Lifetime of a cached list page")
+    cache_max_entries: int = Field(default=10_000, description="Capacity of the in-process list cache")
+    cache_redis_url: str = Field(default="redis://localhost:6379/0", description="Redis-compatible cache URL")
+    change_bus: bool = Field(
+        default=True, description="Log committed changes to rbac_changes and poll them from every worker"
+    )
+    change_poll_interval: float = Field(default=1.0, description="Seconds between rbac_changes polls")
+    change_retention_seconds: float = Field(default=3600.0, description="How long rbac_changes rows are kept")
+    async_database: bool = Field(
+        default=False, description="Serve requests through AsyncSession instead of the threadpool"
+    )
+    async_database_url: Optional[str] = Field(
+        default=None, description="Async driver URL; derived from database_url when unset"
+    )
+    authorization_backend: str = Field(
+        default="index",
+        description=(
+            "'index' uses the in-process permission index, 'shared' maps one index file per node, "
+            "'table' probes user_effective_permissions"
+        ),
+    )
+    shared_index_dir: Optional[str] = Field(
+        default=None,
+        description=(
+            "Parent of the per-database directories holding the memory-mapped index generations of "
+            "the 'shared' backend; the system temp directory when unset"
+        ),
+    )
 
     class Config:
         env_file = ".env"
 
+    @model_validator(mode="after")
+    def _shared_index_needs_change_bus(self) -> "Settings":
+        # Without rbac_changes only the writing worker learns of a change; every other worker
+        # would keep answering from its mapped generation indefinitely.
+        if self.authorization_backend == "shared" and not self.change_bus:
+            raise ValueError("AUTHORIZATION_BACKEND=shared requires CHANGE_BUS to be enabled")
+        return self
+
+    @model_validator(mode="after")
+    def _redis_cache_needs_change_bus(self) -> "Settings":
+        # Cached pages are keyed by table versions, which only the change log keeps equal
+        # across workers; without it no worker would see another's writes until TTL.
+        if self.cache_backend == "redis" and not self.change_bus:
+            raise ValueError("CACHE_BACKEND=redis requires CHANGE_BUS to be enabled")
+        return self
+
 
 @lru_cache
 def get_settings() -> Settings:
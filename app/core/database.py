@@ -1,23 +1,78 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+from app.core.metrics import REGISTRY
+from app.core.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_pool, pool_samples
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+psycopg",
+}
+
+
+def to_async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(
+        hide_password=False
+    )
+
+
+def engine_options(database_url: str, settings: Settings, is_async: bool = False) -> dict:
+    url = make_url(database_url)
+    options: dict = {"echo": settings.debug}
+    connect_args: dict = {}
+    if url.get_backend_name() == "sqlite" and not is_async:
+        connect_args["check_same_thread"] = False
+    if settings.statement_timeout_ms is not None and url.get_backend_name() == "postgresql":
+        if url.get_driver_name() == "asyncpg":
+            connect_args["server_settings"] = {"statement_timeout": str(settings.statement_timeout_ms)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={settings.statement_timeout_ms}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        options["poolclass"] = StaticPool
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+    )
+    return options
+
 
 settings = get_settings()
-connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
-pool_class = StaticPool if settings.database_url.endswith(":memory:") else None
-engine = create_engine(
-    settings.database_url,
-    echo=settings.debug,
-    future=True,
-    connect_args=connect_args,
-    poolclass=pool_class,
-)
+engine = create_engine(settings.database_url, future=True, **engine_options(settings.database_url, settings))
+if not hasattr(engine.pool, "metrics"):
+    instrument_pool(engine.pool)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+async_database_url = settings.async_database_url or to_async_url(settings.database_url)
+async_engine = (
+    create_async_engine(async_database_url, **engine_options(async_database_url, settings, is_async=True))
+    if settings.async_database
+    else None
+)
+if async_engine is not None and not hasattr(async_engine.pool, "metrics"):
+    instrument_pool(async_engine.pool)
+REGISTRY.register_collector(
+    lambda: pool_samples({"sync": engine.pool, **({"async": async_engine.pool} if async_engine else {})})
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+def get_session_factory() -> sessionmaker:
+    return SessionLocal
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -25,3 +80,8 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,226 @@
+import inspect
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self) -> object: ...
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def samples(self) -> Iterable[str]:
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{format_labels(self.labelnames, values)} {format_value(child.value)}"
+
+    def expose(self) -> List[str]:
+        header = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return header + list(self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def samples(self) -> Iterable[str]:
+        names = (*self.labelnames, "le")
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+                cumulative += count
+                yield f"{self.name}_bucket{format_labels(names, (*values, bound))} {cumulative}"
+            labels = format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Holds metrics and render-time collectors and renders the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.expose())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_requests_total = REGISTRY.register(
+    Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+)
+http_request_duration_seconds = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+)
+http_requests_in_progress = REGISTRY.register(
+    Gauge("http_requests_in_progress", "HTTP requests currently being served.", ("method", "route"))
+)
+http_request_exceptions_total = REGISTRY.register(
+    Counter("http_request_exceptions_total", "Requests that raised an exception.", ("method", "route"))
+)
+service_call_duration_seconds = REGISTRY.register(
+    Histogram("service_call_duration_seconds", "Application service call latency.", ("service", "method"))
+)
+service_call_errors_total = REGISTRY.register(
+    Counter("service_call_errors_total", "Application service calls that raised.", ("service", "method"))
+)
+
+
+def _timed(function: Callable, service: str) -> Callable:
+    duration = service_call_duration_seconds.labels(service, function.__name__)
+    errors = service_call_errors_total.labels(service, function.__name__)
+
+    if inspect.isgeneratorfunction(function):
+        # Calling a generator function only creates the generator; time the iteration.
+        @wraps(function)
+        def stream(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                yield from function(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - started)
+
+        return stream
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def timed_service(service: Optional[str] = None) -> Callable[[type], type]:
+    """Class decorator recording the latency of every public method of a service."""
+
+    def decorate(cls: type) -> type:
+        name = service or cls.__name__
+        for attribute, value in list(vars(cls).items()):
+            if callable(value) and not attribute.startswith("_"):
+                setattr(cls, attribute, _timed(value, name))
+        return cls
+
+    return decorate
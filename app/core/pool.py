@@ -0,0 +1,173 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.metrics import format_labels, format_value
+
+# Upper bounds (seconds) of the checkout wait-time histogram buckets.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """Counters and a checkout wait-time histogram for one connection pool."""
+
+    def __init__(self, buckets: tuple = WAIT_BUCKETS) -> None:
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self._bucket_counts = [0] * (len(buckets) + 1)
+        self.wait_seconds_sum = 0.0
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.checkout_timeouts = 0
+        self.checkout_failures = 0
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._bucket_counts[bisect_left(self.buckets, seconds)] += 1
+            self.wait_seconds_sum += seconds
+
+    def record_failure(self, timed_out: bool) -> None:
+        with self._lock:
+            self.checkout_failures += 1
+            if timed_out:
+                self.checkout_timeouts += 1
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def wait_histogram(self) -> Dict[str, int]:
+        with self._lock:
+            counts = list(self._bucket_counts)
+        histogram: Dict[str, int] = {}
+        total = 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            total += count
+            histogram[bound] = total
+        return histogram
+
+    def snapshot(self) -> dict:
+        histogram = self.wait_histogram()
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "checkout_timeouts": self.checkout_timeouts,
+                "checkout_failures": self.checkout_failures,
+                "wait_seconds_sum": self.wait_seconds_sum,
+                "wait_seconds_bucket": histogram,
+            }
+
+
+def instrument_pool(pool: Pool, metrics: Optional[PoolMetrics] = None) -> PoolMetrics:
+    metrics = metrics or PoolMetrics()
+    event.listen(pool, "checkout", lambda *_: metrics.increment("checkouts"))
+    event.listen(pool, "checkin", lambda *_: metrics.increment("checkins"))
+    event.listen(pool, "connect", lambda *_: metrics.increment("connects"))
+    event.listen(pool, "invalidate", lambda *_: metrics.increment("invalidations"))
+    pool.metrics = metrics
+    return metrics
+
+
+class InstrumentedPoolMixin:
+    """Times every checkout of a queue pool, including time spent queued for a slot."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        # A recreated pool inherits the listeners (and so the counters) of its parent.
+        inherited = kwargs.get("_dispatch") is not None
+        super().__init__(*args, **kwargs)
+        if not inherited:
+            instrument_pool(self)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.metrics.record_failure(timed_out=True)
+            raise
+        except Exception:
+            self.metrics.record_failure(timed_out=False)
+            raise
+        self.metrics.observe_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool: Pool) -> dict:
+    status = {
+        "pool_class": type(pool).__name__,
+        "size": None,
+        "checked_out": None,
+        "checked_in": None,
+        "overflow": None,
+        "max_overflow": None,
+        "timeout": None,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    metrics: Optional[PoolMetrics] = getattr(pool, "metrics", None)
+    status["metrics"] = metrics.snapshot() if metrics is not None else None
+    return status
+
+
+def pool_samples(pools: Dict[str, Pool]) -> List[str]:
+    """Prometheus text lines for the given pools, keyed by an ``engine`` label."""
+    gauges = ("size", "checked_out", "checked_in", "overflow")
+    counters = (
+        "checkouts", "checkins", "connects", "invalidations", "checkout_timeouts", "checkout_failures"
+    )
+    statuses = {name: pool_status(pool) for name, pool in pools.items()}
+    lines: List[str] = []
+    for gauge in gauges:
+        lines += [f"# HELP db_pool_{gauge} Connection pool {gauge}.", f"# TYPE db_pool_{gauge} gauge"]
+        for name, status in statuses.items():
+            if status[gauge] is not None:
+                lines.append(f"db_pool_{gauge}{format_labels(('engine',), (name,))} {status[gauge]}")
+    for counter in counters:
+        metric = f"db_pool_{counter}_total"
+        lines += [f"# HELP {metric} Connection pool {counter}.", f"# TYPE {metric} counter"]
+        for name, status in statuses.items():
+            if status["metrics"] is not None:
+                labels = format_labels(("engine",), (name,))
+                lines.append(f"{metric}{labels} {status['metrics'][counter]}")
+    metric = "db_pool_checkout_wait_seconds"
+    lines += [f"# HELP {metric} Time spent waiting for a pooled connection.", f"# TYPE {metric} histogram"]
+    for name, status in statuses.items():
+        metrics = status["metrics"]
+        if metrics is None or not isinstance(pools[name], InstrumentedPoolMixin):
+            continue
+        for bound, count in metrics["wait_seconds_bucket"].items():
+            lines.append(f"{metric}_bucket{format_labels(('engine', 'le'), (name, bound))} {count}")
+        labels = format_labels(("engine",), (name,))
+        lines.append(f"{metric}_sum{labels} {format_value(metrics['wait_seconds_sum'])}")
+        lines.append(f"{metric}_count{labels} {metrics['wait_seconds_bucket']['+Inf']}")
+    return lines
@@ -0,0 +1,87 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return [
+            (statement, count) for statement, count in self.statements.most_common() if count >= threshold
+        ]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collects every statement executed in the current context (request, task or thread
+    spawned from it) into a fresh ``QueryStats``."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append((context, time.perf_counter()))
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started and started[-1][0] is context:
+        stats.record(statement, time.perf_counter() - started.pop()[1])
+
+
+@event.listens_for(Engine, "handle_error")
+def _drop_timer(exception_context) -> None:
+    # A failed statement never reaches after_cursor_execute; drop its start so later
+    # timings stay paired with their own statements.
+    connection = exception_context.connection
+    started = None if connection is None else connection.info.get("query_started")
+    if started and started[-1][0] is exception_context.execution_context:
+        started.pop()
+
+
+class QueryCounter:
+    """Counts the statements one engine executes inside a ``with`` block, from any thread."""
+
+    def __init__(self, engine: Engine) -> None:
+        self.engine = engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "after_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, "after_cursor_execute", self._record)
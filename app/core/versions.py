@@ -0,0 +1,58 @@
+import secrets
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.changes import Change
+
+# Deleting an entity row also removes its link rows without recording them one by one:
+# for each link table, the positions of its key that hold the deleted entity's id.
+DELETE_CASCADES: Dict[str, Dict[str, Tuple[int, ...]]] = {
+    "roles": {"role_permissions": (0,), "user_roles": (1,), "role_parents": (0, 1)},
+    "permissions": {"role_permissions": (1,)},
+    "users": {"user_roles": (0,)},
+}
+
+
+class TableVersions:
+    """Monotonic per-table write counters, advanced by the committed-change feed.
+
+    Without a shared change log, versions are process-local counters scoped to a random
+    boot nonce, so tags issued before a restart never match counters restarted from zero.
+    Once ``use_sequence`` is called, a table's version is the change-log sequence of its
+    last change, seeded from the changes still in the log; every worker then derives the
+    same tag for the same data. A table whose last change has been pruned falls back to
+    the sequence just below the oldest retained change, which is never lower than that
+    change, so such a tag cannot match a tag issued before it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._base = 0
+        self._sequenced = False
+        self.nonce = secrets.token_hex(4)
+
+    def use_sequence(self, horizon: int, logged: Iterable[Change] = ()) -> None:
+        with self._lock:
+            self._base = horizon
+            self._sequenced = True
+            self._versions.clear()
+            self.nonce = "seq"
+        self.apply(list(logged))
+
+    def get(self, table: str) -> int:
+        return self._versions.get(table, self._base)
+
+    def apply(self, changes: List[Change]) -> None:
+        touched: Dict[str, Optional[int]] = {}
+        for change in changes:
+            cascades = DELETE_CASCADES.get(change.table, {}) if change.op == "delete" else {}
+            for table in (change.table, *cascades):
+                touched[table] = change.seq
+        with self._lock:
+            for table, seq in touched.items():
+                current = self.get(table)
+                self._versions[table] = max(current, seq) if self._sequenced and seq else current + 1
+
+    def token(self, tables: Iterable[str]) -> str:
+        return self.nonce + "-" + ".".join(str(self.get(table)) for table in tables)
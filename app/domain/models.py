@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Table
+from sqlalchemy import DDL, Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Table, Text, event
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -47,7 +47,7 @@ role_permissions_table = Table(
     "role_permissions",
     Base.metadata,
     Column("role_id", ForeignKey("roles.id"), primary_key=True),
-    Column("permission_id", ForeignKey("permissions.id"), primary_key=True),
+    Column("permission_id", ForeignKey("permissions.id"), primary_key=True, index=True),
     Column("granted_at", DateTime, default=datetime.utcnow),
 )
 
@@ -74,6 +74,100 @@ user_roles_table = Table(
     "user_roles",
     Base.metadata,
     Column("user_id", ForeignKey("users.id"), primary_key=True),
-    Column("role_id", ForeignKey("roles.id"), primary_key=True),
+    Column("role_id", ForeignKey("roles.id"), primary_key=True, index=True),
     Column("assigned_at", DateTime, default=datetime.utcnow),
 )
+
+
+# Role inheritance: a role holds every permission of its parents, transitively.
+role_parents_table = Table(
+    "role_parents",
+    Base.metadata,
+    Column("role_id", ForeignKey("roles.id"), primary_key=True),
+    Column("parent_id", ForeignKey("roles.id"), primary_key=True, index=True),
+)
+
+# Transitive closure of role_parents plus one depth-0 row per role, so a role's inherited
+# grants are a single join: descendant -> every ancestor (itself included).
+role_closure_table = Table(
+    "role_closure",
+    Base.metadata,
+    Column("ancestor_id", ForeignKey("roles.id"), primary_key=True),
+    Column("descendant_id", ForeignKey("roles.id"), primary_key=True, index=True),
+    Column("depth", Integer, nullable=False),
+)
+
+
+user_effective_permissions_table = Table(
+    "user_effective_permissions",
+    Base.metadata,
+    Column("user_id", ForeignKey("users.id"), primary_key=True),
+    Column("permission_id", ForeignKey("permissions.id"), primary_key=True, index=True),
+    Column("via_role_count", Integer, nullable=False, default=1),
+)
+
+
+# Committed changes in commit order, polled by every worker to keep in-process caches coherent.
+change_log_table = Table(
+    "rbac_changes",
+    Base.metadata,
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("origin", String(32), nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("created_at", DateTime, default=datetime.utcnow, nullable=False, index=True),
+)
+
+
+# Columns served by the search subsystem: pg_trgm GIN indexes on PostgreSQL and an
+# FTS5 trigram shadow table (kept in sync by triggers) on SQLite.
+SEARCHABLE_COLUMNS = {
+    "roles": ("name",),
+    "permissions": ("name",),
+    "users": ("username", "email"),
+}
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+def search_table_name(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+def search_table_ddl(table_name: str, columns: tuple) -> list:
+    fts = search_table_name(table_name)
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table_name}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table_name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+for _table_name, _columns in SEARCHABLE_COLUMNS.items():
+    _table = Base.metadata.tables[_table_name]
+    for _column in _columns:
+        Index(
+            f"ix_{_table_name}_{_column}_trgm",
+            _table.c[_column],
+            postgresql_using="gin",
+            postgresql_ops={_column: "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql")
+    for _statement in search_table_ddl(_table_name, _columns):
+        event.listen(_table, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+    event.listen(
+        _table,
+        "before_drop",
+        DDL(f"DROP TABLE IF EXISTS {search_table_name(_table_name)}").execute_if(dialect="sqlite"),
+    )
@@ -0,0 +1,68 @@
+from typing import Dict, List
+
+SEPARATOR = ":"
+WILDCARD = "*"
+# ``*`` is only meaningful as a whole trailing segment: ``billing:*`` or ``*``.
+PERMISSION_NAME_PATTERN = r"^(\*|[^*]*:\*|[^*]*)$"
+
+
+class _Node:
+    __slots__ = ("children", "wildcard")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.wildcard = 0
+
+
+class PatternTrie:
+    """Wildcard grants keyed by segment path, each carrying the bit of its permission.
+
+    ``billing:invoice:*`` marks the ``billing`` -> ``invoice`` node, so matching a concrete
+    name walks at most one node per segment, however many patterns are granted.
+    """
+
+    def __init__(self) -> None:
+        self._root = _Node()
+
+    def add(self, pattern: str, bit: int) -> None:
+        node = self._root
+        for segment in pattern_prefix(pattern):
+            node = node.children.setdefault(segment, _Node())
+        node.wildcard |= 1 << bit
+
+    def discard(self, pattern: str, bit: int) -> None:
+        node = self._root
+        for segment in pattern_prefix(pattern):
+            node = node.children.get(segment)
+            if node is None:
+                return
+        node.wildcard &= ~(1 << bit)
+
+    def match(self, name: str) -> int:
+        """OR of the bits of every pattern covering ``name``."""
+        node = self._root
+        mask = node.wildcard
+        # A trailing ``*`` stands for one or more segments, so the last one is never a prefix.
+        for segment in name.split(SEPARATOR)[:-1]:
+            node = node.children.get(segment)
+            if node is None:
+                break
+            mask |= node.wildcard
+        return mask
+
+
+def is_pattern(name: str) -> bool:
+    return name == WILDCARD or name.endswith(SEPARATOR + WILDCARD)
+
+
+def pattern_prefix(pattern: str) -> List[str]:
+    return pattern.split(SEPARATOR)[:-1]
+
+
+def candidate_patterns(name: str) -> List[str]:
+    """``name`` and every pattern that would cover it: ``a:b:c`` -> ``*``, ``a:*``, ``a:b:*``, ``a:b:c``."""
+    segments = name.split(SEPARATOR)
+    candidates = [SEPARATOR.join(segments[:depth] + [WILDCARD]) for depth in range(len(segments))]
+    if name not in candidates:
+        candidates.append(name)
+    return candidates
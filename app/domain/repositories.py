@@ -1,11 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import Generic, List, Optional, TypeVar
+from typing import Dict, Generic, Iterator, List, NamedTuple, Optional, Set, Tuple, TypeVar
 
 from app.domain.models import Permission, Role, User
 from app.domain.schemas import (
+    BulkItemError,
+    LinkSetDiff,
     PermissionCreate,
     PermissionUpdate,
     RoleCreate,
+    RoleParentDiff,
     RolePermissionCreate,
     RolePermissionUpdate,
     RoleUpdate,
@@ -27,6 +30,9 @@ class RepositoryProtocol(ABC, Generic[ModelType, CreateSchema, UpdateSchema]):
     @abstractmethod
     def get_all(self, **filters) -> List[ModelType]: ...
 
+    @abstractmethod
+    def stream(self, batch_size: int) -> Iterator[List[ModelType]]: ...
+
     @abstractmethod
     def update(self, identifier, data: UpdateSchema) -> Optional[ModelType]: ...
 
@@ -34,21 +40,112 @@ class RepositoryProtocol(ABC, Generic[ModelType, CreateSchema, UpdateSchema]):
     def delete(self, identifier) -> bool: ...
 
 
-class RoleRepository(RepositoryProtocol[Role, RoleCreate, RoleUpdate], ABC):
-    pass
+class BulkCreateProtocol(RepositoryProtocol[ModelType, CreateSchema, UpdateSchema], ABC):
+    @abstractmethod
+    def create_many(self, items: List[CreateSchema]) -> Tuple[List[ModelType], List[BulkItemError]]: ...
 
 
-class PermissionRepository(RepositoryProtocol[Permission, PermissionCreate, PermissionUpdate], ABC):
+class RoleRepository(BulkCreateProtocol[Role, RoleCreate, RoleUpdate], ABC):
+    @abstractmethod
+    def replace_parents(self, role_id: int, parent_ids: List[int]) -> Optional[RoleParentDiff]: ...
+
+    @abstractmethod
+    def list_parents(
+        self, role_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[Role]]: ...
+
+
+class PermissionRepository(BulkCreateProtocol[Permission, PermissionCreate, PermissionUpdate], ABC):
     pass
 
 
 class RolePermissionRepository(RepositoryProtocol, ABC):
-    pass
+    @abstractmethod
+    def replace_for_role(self, role_id: int, permission_ids: List[int]) -> Optional[LinkSetDiff]: ...
 
+    @abstractmethod
+    def list_permissions_for_role(
+        self, role_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[Permission]]: ...
 
-class UserRepository(RepositoryProtocol[User, UserCreate, UserUpdate], ABC):
+    @abstractmethod
+    def list_roles_for_permission(
+        self, permission_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[Role]]: ...
+
+
+class UserRepository(BulkCreateProtocol[User, UserCreate, UserUpdate], ABC):
     pass
 
 
 class UserRoleRepository(RepositoryProtocol, ABC):
-    pass
+    @abstractmethod
+    def replace_for_user(self, user_id: int, role_ids: List[int]) -> Optional[LinkSetDiff]: ...
+
+    @abstractmethod
+    def list_roles_for_user(
+        self, user_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[Role]]: ...
+
+    @abstractmethod
+    def list_users_for_role(
+        self, role_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[User]]: ...
+
+
+class PermissionGraph(NamedTuple):
+    user_roles: List[Tuple[int, int]]
+    role_permissions: List[Tuple[int, int]]
+    permissions: List[Tuple[int, str]]
+    role_parents: List[Tuple[int, int]] = []
+    # Change-log position the graph was read at, and the sequence numbers below it that were
+    # still uncommitted then, so a change committed late under one of them is known to be missing.
+    seq: int = 0
+    unseen_seqs: Tuple[int, ...] = ()
+
+
+class EffectivePermissionDrift(NamedTuple):
+    user_id: int
+    permission_id: int
+    expected: int
+    actual: int
+
+
+class AuthorizationRepository(ABC):
+    @abstractmethod
+    def load_graph(self) -> PermissionGraph: ...
+
+    @abstractmethod
+    def has_permission(self, user_id: int, permission_name: str) -> bool: ...
+
+    @abstractmethod
+    def granted_pairs(self, pairs: List[Tuple[int, str]]) -> Set[Tuple[int, str]]: ...
+
+    @abstractmethod
+    def list_permission_names(self, user_id: int) -> List[str]: ...
+
+    @abstractmethod
+    def list_permission_holders(
+        self, permission_name: str, user_ids: Optional[List[int]] = None
+    ) -> List[int]: ...
+
+
+class RoleHierarchyRepository(ABC):
+    @abstractmethod
+    def rebuild(self, commit: bool = True) -> int: ...
+
+
+class EffectivePermissionRepository(ABC):
+    @abstractmethod
+    def rebuild(self, commit: bool = True) -> int: ...
+
+    @abstractmethod
+    def find_drift(self) -> List[EffectivePermissionDrift]: ...
+
+
+class SnapshotRepository(ABC):
+    @abstractmethod
+    def export(self) -> bytes: ...
+
+    @abstractmethod
+    def restore(self, data: bytes) -> Dict[str, int]: ...
@@ -1,7 +1,17 @@
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, create_model
+
+from app.domain.permission_patterns import PERMISSION_NAME_PATTERN
+
+
+class SearchMode(str, Enum):
+    exact = "exact"
+    prefix = "prefix"
+    substring = "substring"
 
 
 class RoleBase(BaseModel):
@@ -28,7 +38,7 @@ class RoleRead(RoleBase):
 
 
 class PermissionBase(BaseModel):
-    name: str = Field(..., max_length=100)
+    name: str = Field(..., max_length=100, pattern=PERMISSION_NAME_PATTERN)
     description: Optional[str] = None
 
 
@@ -37,7 +47,7 @@ class PermissionCreate(PermissionBase):
 
 
 class PermissionUpdate(BaseModel):
-    name: Optional[str] = Field(default=None, max_length=100)
+    name: Optional[str] = Field(default=None, max_length=100, pattern=PERMISSION_NAME_PATTERN)
     description: Optional[str] = None
 
 
@@ -68,6 +78,9 @@ class UserUpdate(BaseModel):
 
 
 class UserRead(UserBase):
+    # Stored emails were validated on write; re-running the email validator on every read row
+    # dominated list serialization, so the read schema only documents the format.
+    email: str = Field(..., json_schema_extra={"format": "email"})
     id: int
     created_at: datetime
     updated_at: datetime
@@ -117,3 +130,153 @@ class UserRoleRead(UserRoleBase):
 
     class Config:
         from_attributes = True
+
+
+MAX_BULK_ITEMS = 10_000
+
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class RoleBulkResult(BaseModel):
+    created: List[RoleRead]
+    errors: List[BulkItemError]
+
+
+class PermissionBulkResult(BaseModel):
+    created: List[PermissionRead]
+    errors: List[BulkItemError]
+
+
+class UserBulkResult(BaseModel):
+    created: List[UserRead]
+    errors: List[BulkItemError]
+
+
+class RolePermissionSet(BaseModel):
+    permission_ids: List[int] = Field(..., max_length=MAX_BULK_ITEMS)
+
+
+class UserRoleSet(BaseModel):
+    role_ids: List[int] = Field(..., max_length=MAX_BULK_ITEMS)
+
+
+class LinkSetDiff(BaseModel):
+    added: List[int] = []
+    removed: List[int] = []
+    unknown: List[int] = []
+
+
+class RoleParentSet(BaseModel):
+    parent_ids: List[int] = Field(..., max_length=MAX_BULK_ITEMS)
+
+
+class RoleParentDiff(LinkSetDiff):
+    # Requested parents that already inherit from the role; the set is left unchanged.
+    cycles: List[int] = []
+
+
+class PermissionCheckRead(BaseModel):
+    user_id: int
+    permission: str
+    allowed: bool
+
+
+class PermissionCheckPair(BaseModel):
+    user_id: int
+    permission: str
+
+
+class PermissionCheckBatch(BaseModel):
+    checks: List[PermissionCheckPair] = Field(..., max_length=MAX_BULK_ITEMS)
+
+
+class PermissionCheckBatchRead(BaseModel):
+    results: List[PermissionCheckRead]
+
+
+class UserPermissionsRead(BaseModel):
+    user_id: int
+    permissions: List[str]
+
+
+class PermissionHoldersQuery(BaseModel):
+    permission: str
+    user_ids: Optional[List[int]] = Field(default=None, max_length=100_000)
+
+
+class PermissionHoldersRead(BaseModel):
+    permission: str
+    user_ids: List[int]
+
+
+class SnapshotImportRead(BaseModel):
+    tables: Dict[str, int]
+
+
+class PoolMetricsRead(BaseModel):
+    checkouts: int
+    checkins: int
+    connects: int
+    invalidations: int
+    checkout_timeouts: int
+    checkout_failures: int
+    wait_seconds_sum: float
+    wait_seconds_bucket: Dict[str, int]
+
+
+class PoolStatusRead(BaseModel):
+    pool_class: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+    timeout: Optional[float] = None
+    metrics: Optional[PoolMetricsRead] = None
+
+
+class PoolsRead(BaseModel):
+    sync: PoolStatusRead
+    async_: Optional[PoolStatusRead] = Field(default=None, alias="async")
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: type) -> TypeAdapter:
+    # Validating or dumping a whole list through one cached adapter runs the loop inside
+    # pydantic-core instead of building a validator call per row in Python.
+    return TypeAdapter(List[schema])
+
+
+@lru_cache(maxsize=None)
+def partial_schema(schema: type, fields: Optional[Tuple[str, ...]]) -> type:
+    """Read schema restricted to ``fields`` (a sparse fieldset); ``None`` means every field."""
+    if fields is None:
+        return schema
+    definitions = {
+        name: (info.annotation, info) for name, info in schema.model_fields.items() if name in fields
+    }
+    return create_model(f"{schema.__name__}Fields", __config__=schema.model_config, **definitions)
+
+
+# Relationships a list endpoint can embed with ``?include=``, keyed by ORM attribute name.
+ROLE_RELATIONS: Dict[str, type] = {"permissions": PermissionRead}
+USER_RELATIONS: Dict[str, type] = {"roles": RoleRead}
+
+
+@lru_cache(maxsize=None)
+def expanded_schema(schema: type, relations: Tuple[Tuple[str, type], ...]) -> type:
+    """``schema`` plus one list field per included relationship."""
+    if not relations:
+        return schema
+    definitions = {name: (List[related], ...) for name, related in relations}
+    return create_model(f"{schema.__name__}Expanded", __base__=schema, **definitions)
+
+
+def shaped_schema(
+    schema: type, fields: Optional[Tuple[str, ...]], include: Tuple[str, ...], relations: Dict[str, type]
+) -> type:
+    """Read schema for one list request: its sparse fieldset plus its embedded relationships."""
+    return expanded_schema(partial_schema(schema, fields), tuple((name, relations[name]) for name in include))
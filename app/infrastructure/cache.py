@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+
+@dataclass
+class CacheEntry:
+    """One cached list page and the table it lists."""
+
+    table: str
+    items: List[Any] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        items = [item.model_dump(mode="json") for item in self.items]
+        return json.dumps({"table": self.table, "items": items})
+
+    @classmethod
+    def from_json(cls, raw: str) -> "CacheEntry":
+        data = json.loads(raw)
+        return cls(table=data["table"], items=data["items"])
+
+
+class CacheBackend(ABC):
+    # Backends that serialize return ``items`` as plain dicts for the caller to re-validate.
+    serializes = False
+
+    def __init__(self) -> None:
+        self.on_evict: Callable[[str, str], None] = lambda table, reason: None
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CacheEntry]: ...
+
+    @abstractmethod
+    def set(self, key: str, entry: CacheEntry, ttl: float) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Process-local LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, CacheEntry]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            found = self._entries.get(key)
+            if found is None:
+                return None
+            expires_at, entry = found
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                expired = entry.table
+            else:
+                self._entries.move_to_end(key)
+                return entry
+        self.on_evict(expired, "expired")
+        return None
+
+    def set(self, key: str, entry: CacheEntry, ttl: float) -> None:
+        evicted: List[str] = []
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                _, (_, old_entry) = self._entries.popitem(last=False)
+                evicted.append(old_entry.table)
+        for table in evicted:
+            self.on_evict(table, "capacity")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared cache on a Redis-compatible server, so every worker sees the same entries.
+
+    Pages live under ``<prefix>:<key>`` with the TTL. Keys carry the table version, which
+    the change log makes the same in every worker, so a write needs no Redis call at all.
+    """
+
+    serializes = True
+
+    def __init__(self, url: str, prefix: str = "rbac:list") -> None:
+        super().__init__()
+        try:
+            import redis
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from exc
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raw = self.client.get(f"{self.prefix}:{key}")
+        return CacheEntry.from_json(raw) if raw is not None else None
+
+    def set(self, key: str, entry: CacheEntry, ttl: float) -> None:
+        self.client.set(f"{self.prefix}:{key}", entry.to_json(), px=max(int(ttl * 1000), 1))
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(f"{self.prefix}:*"))
+        if keys:
+            self.client.delete(*keys)
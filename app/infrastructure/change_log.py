@@ -0,0 +1,170 @@
+import json
+import logging
+import secrets
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.changes import Change, pending_changes, publish
+from app.domain.models import change_log_table
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in the change log so its poller skips its own writes, which
+# were already published locally by the after_commit hook.
+WORKER_ID = secrets.token_hex(8)
+
+MAX_TRACKED_GAP = 1000
+
+_installed = False
+
+
+def _encode(changes: List[Change]) -> str:
+    return json.dumps([[change.table, change.op, change.row] for change in changes], default=str)
+
+
+def _decode(payload: str, seq: int) -> List[Change]:
+    return [Change(table, op, row, seq) for table, op, row in json.loads(payload)]
+
+
+def _log_pending_changes(session: Session) -> None:
+    changes = pending_changes(session)
+    if not changes:
+        return
+    entry = {"origin": WORKER_ID, "payload": _encode(changes), "created_at": datetime.utcnow()}
+    result = session.execute(insert(change_log_table).values(**entry))
+    seq = result.inserted_primary_key[0]
+    changes[:] = [replace(change, seq=seq) for change in changes]
+
+
+def install_change_log() -> None:
+    """Writes every session's recorded changes to ``rbac_changes`` in the committing transaction."""
+    global _installed
+    if not _installed:
+        event.listen(Session, "before_commit", _log_pending_changes)
+        _installed = True
+
+
+def current_sequence(session: Session) -> int:
+    return session.execute(select(func.coalesce(func.max(change_log_table.c.seq), 0))).scalar_one()
+
+
+def log_position(session: Session) -> Tuple[int, Tuple[int, ...]]:
+    """The newest ``seq`` and the holes below it that a late commit may still fill.
+
+    Both come from one statement, so they describe the same snapshot. Holes further back
+    than ``MAX_TRACKED_GAP`` are not reported, as ``ChangeLogPoller`` stops waiting for them.
+    """
+    newest = select(func.max(change_log_table.c.seq)).scalar_subquery()
+    present = set(
+        session.execute(
+            select(change_log_table.c.seq).where(change_log_table.c.seq > newest - MAX_TRACKED_GAP)
+        ).scalars()
+    )
+    if not present:
+        return 0, ()
+    seq = max(present)
+    window = range(max(seq - MAX_TRACKED_GAP, 0) + 1, seq)
+    return seq, tuple(missing for missing in window if missing not in present)
+
+
+def retained_changes(session: Session) -> Tuple[int, List[Change]]:
+    """Every change still in ``rbac_changes``, and the sequence just below the oldest one."""
+    rows = session.execute(
+        select(change_log_table.c.seq, change_log_table.c.payload).order_by(change_log_table.c.seq)
+    ).all()
+    if not rows:
+        return 0, []
+    return rows[0].seq - 1, [change for seq, payload in rows for change in _decode(payload, seq)]
+
+
+class ChangeLogPoller:
+    """Replays changes committed by other workers to this worker's local subscribers.
+
+    Sequence numbers are allocated before commit, so a concurrent transaction can make a
+    lower ``seq`` visible after a higher one. Holes below the high-water mark are therefore
+    re-polled until they show up or ``gap_timeout`` passes (a rolled-back insert leaves a
+    permanent hole).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: float = 1.0,
+        retention: float = 3600.0,
+        gap_timeout: float = 30.0,
+        dispatch: Callable[[List[Change]], None] = publish,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self.retention = retention
+        self.gap_timeout = gap_timeout
+        self.dispatch = dispatch
+        self.last_seq: Optional[int] = None
+        self._gaps: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rbac-change-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Polling rbac_changes failed")
+
+    def poll_once(self) -> int:
+        with self.session_factory() as session:
+            if self.last_seq is None:
+                self.last_seq = current_sequence(session)
+                return 0
+            now = time.monotonic()
+            self._gaps = {seq: seen for seq, seen in self._gaps.items() if now - seen < self.gap_timeout}
+            condition = change_log_table.c.seq > self.last_seq
+            if self._gaps:
+                condition = or_(condition, change_log_table.c.seq.in_(list(self._gaps)))
+            rows = session.execute(
+                select(change_log_table.c.seq, change_log_table.c.origin, change_log_table.c.payload)
+                .where(condition)
+                .order_by(change_log_table.c.seq)
+            ).all()
+            if now - self._last_prune > self.retention / 10:
+                cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+                # The newest row is kept so the sequence never appears to move backwards.
+                newest = select(func.max(change_log_table.c.seq)).scalar_subquery()
+                session.execute(
+                    delete(change_log_table).where(
+                        change_log_table.c.created_at < cutoff, change_log_table.c.seq < newest
+                    )
+                )
+                session.commit()
+                self._last_prune = now
+        applied = 0
+        for seq, origin, payload in rows:
+            self._gaps.pop(seq, None)
+            if seq > self.last_seq:
+                if seq - self.last_seq <= MAX_TRACKED_GAP:
+                    for missing in range(self.last_seq + 1, seq):
+                        self._gaps.setdefault(missing, now)
+                self.last_seq = seq
+            if origin != WORKER_ID:
+                self.dispatch(_decode(payload, seq))
+                applied += 1
+        return applied
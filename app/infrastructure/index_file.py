@@ -0,0 +1,270 @@
+import hashlib
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from app.domain.repositories import PermissionGraph
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX: concurrent builders just race to os.replace
+    fcntl = None
+
+# Files are only shared between processes on one node, so arrays are written in native
+# byte order and mapped back without conversion.
+MAGIC = b"RBACIDX2"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "build.lock"
+KEEP_GENERATIONS = 2
+_HEADER = struct.Struct("=8sQQ8I")
+
+
+def _ints(values: Iterable[int]) -> bytes:
+    return array("i", values).tobytes()
+
+
+def compile_index(graph: PermissionGraph, generation: int) -> bytes:
+    """Sorted CSR arrays: user -> roles, role -> inherited permission ids, and a name table."""
+    user_roles: Dict[int, Set[int]] = defaultdict(set)
+    for user_id, role_id in graph.user_roles:
+        user_roles[user_id].add(role_id)
+    grants: Dict[int, Set[int]] = defaultdict(set)
+    for role_id, permission_id in graph.role_permissions:
+        grants[role_id].add(permission_id)
+    parents: Dict[int, Set[int]] = defaultdict(set)
+    for role_id, parent_id in graph.role_parents:
+        parents[role_id].add(parent_id)
+
+    role_permissions: Dict[int, List[int]] = {}
+    for role_id in sorted({role_id for roles in user_roles.values() for role_id in roles}):
+        seen, frontier, permissions = {role_id}, [role_id], set()
+        while frontier:
+            current = frontier.pop()
+            permissions |= grants.get(current, set())
+            for parent_id in parents.get(current, ()):
+                if parent_id not in seen:
+                    seen.add(parent_id)
+                    frontier.append(parent_id)
+        if permissions:
+            role_permissions[role_id] = sorted(permissions)
+
+    users = sorted(user_roles)
+    user_offsets, flat_roles = [0], []
+    for user_id in users:
+        flat_roles += sorted(user_roles[user_id])
+        user_offsets.append(len(flat_roles))
+    roles = sorted(role_permissions)
+    role_offsets, flat_permissions = [0], []
+    for role_id in roles:
+        flat_permissions += role_permissions[role_id]
+        role_offsets.append(len(flat_permissions))
+
+    by_name = sorted((name.encode(), permission_id) for permission_id, name in graph.permissions)
+    name_offsets, blob = [0], bytearray()
+    for encoded, _ in by_name:
+        blob += encoded
+        name_offsets.append(len(blob))
+    by_id = sorted(range(len(by_name)), key=lambda position: by_name[position][1])
+    # Open-addressing table of name positions + 1 keyed by CRC-32, so a name lookup is one
+    # hash and usually one comparison instead of a binary search over strings.
+    slots = [0] * _slot_count(len(by_name))
+    for position, (encoded, _) in enumerate(by_name):
+        slot = zlib.crc32(encoded) & (len(slots) - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (len(slots) - 1)
+        slots[slot] = position + 1
+
+    header = _HEADER.pack(
+        MAGIC,
+        generation,
+        graph.seq,
+        len(graph.unseen_seqs),
+        *(len(part) for part in (users, flat_roles, roles, flat_permissions, by_name, slots, blob)),
+    )
+    return b"".join(
+        [
+            header,
+            array("q", graph.unseen_seqs).tobytes(),
+            _ints(users),
+            _ints(user_offsets),
+            _ints(flat_roles),
+            _ints(roles),
+            _ints(role_offsets),
+            _ints(flat_permissions),
+            _ints(permission_id for _, permission_id in by_name),
+            _ints(name_offsets),
+            _ints(by_name[position][1] for position in by_id),
+            _ints(by_id),
+            _ints(slots),
+            bytes(blob),
+        ]
+    )
+
+
+def _slot_count(names: int) -> int:
+    count = 1
+    while count < names * 2:
+        count *= 2
+    return count
+
+
+class IndexFile:
+    """Read-only view over one mapped index generation; every lookup is a binary search."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        view = memoryview(mapped)
+        magic, self.generation, self.seq, unseen, users, user_roles, roles, grants, names, slots, blob = (
+            _HEADER.unpack(view[: _HEADER.size])
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a permission index file")
+        offset = _HEADER.size + unseen * 8
+        # Sequence numbers below ``seq`` that were uncommitted when the graph was read.
+        self.unseen_seqs = frozenset(view[_HEADER.size : offset].cast("q"))
+
+        def take(count: int) -> memoryview:
+            nonlocal offset
+            chunk = view[offset : offset + count * 4].cast("i")
+            offset += count * 4
+            return chunk
+
+        self.user_ids = take(users)
+        self.user_offsets = take(users + 1)
+        self.user_roles = take(user_roles)
+        self.role_ids = take(roles)
+        self.role_offsets = take(roles + 1)
+        self.role_permissions = take(grants)
+        self.name_ids = take(names)
+        self.name_offsets = take(names + 1)
+        self.sorted_ids = take(names)
+        self.id_positions = take(names)
+        self.name_slots = take(slots)
+        self.names = view[offset : offset + blob]
+
+    def roles_of(self, user_id: int) -> memoryview:
+        position = bisect_left(self.user_ids, user_id)
+        if position == len(self.user_ids) or self.user_ids[position] != user_id:
+            return self.user_roles[0:0]
+        return self.user_roles[self.user_offsets[position] : self.user_offsets[position + 1]]
+
+    def role_grants(self, role_id: int) -> memoryview:
+        position = bisect_left(self.role_ids, role_id)
+        if position == len(self.role_ids) or self.role_ids[position] != role_id:
+            return self.role_permissions[0:0]
+        return self.role_permissions[self.role_offsets[position] : self.role_offsets[position + 1]]
+
+    def permission_id(self, name: str) -> Optional[int]:
+        target = name.encode()
+        mask = len(self.name_slots) - 1
+        slot = zlib.crc32(target) & mask
+        while self.name_slots[slot]:
+            position = self.name_slots[slot] - 1
+            if self._name_at(position) == target:
+                return self.name_ids[position]
+            slot = (slot + 1) & mask
+        return None
+
+    def permission_name(self, permission_id: int) -> Optional[str]:
+        position = bisect_left(self.sorted_ids, permission_id)
+        if position == len(self.sorted_ids) or self.sorted_ids[position] != permission_id:
+            return None
+        return self._name_at(self.id_positions[position]).decode()
+
+    def role_has_any(self, role_id: int, permission_ids: List[int]) -> bool:
+        grants = self.role_grants(role_id)
+        for permission_id in permission_ids:
+            position = bisect_left(grants, permission_id)
+            if position < len(grants) and grants[position] == permission_id:
+                return True
+        return False
+
+    def _name_at(self, position: int) -> bytes:
+        return bytes(self.names[self.name_offsets[position] : self.name_offsets[position + 1]])
+
+
+def index_directory(base: Optional[str], database_url: str) -> str:
+    """Private directory for the generations of one database, created under ``base`` if missing.
+
+    Another local user able to write there could swap in a forged index, so a directory
+    that is not this user's own, mode 0700, is refused rather than used.
+    """
+    digest = hashlib.sha256(database_url.encode()).hexdigest()[:16]
+    if base is None:
+        path = os.path.join(tempfile.gettempdir(), f"rbac-permission-index-{digest}")
+    else:
+        path = os.path.join(base, digest)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+        raise PermissionError(f"{path} must be owned by uid {os.getuid()} and not accessible to others")
+    return path
+
+
+def open_current(directory: str) -> Optional[IndexFile]:
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as handle:
+            name = handle.read().strip()
+        return IndexFile(os.path.join(directory, name))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+@contextmanager
+def build_lock(directory: str) -> Iterator[None]:
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def publish_index(directory: str, graph: PermissionGraph) -> IndexFile:
+    """Writes the next generation and swaps ``CURRENT`` to it; call under ``build_lock``."""
+    previous = open_current(directory)
+    generation = previous.generation + 1 if previous is not None else 1
+    name = f"index.{generation}.bin"
+    _write_atomic(directory, name, compile_index(graph, generation))
+    _write_atomic(directory, CURRENT_FILE, name.encode())
+    # Workers still mapping an unlinked generation keep reading it until they swap.
+    for stale in sorted(_generations(directory))[:-KEEP_GENERATIONS]:
+        os.remove(os.path.join(directory, f"index.{stale}.bin"))
+    return IndexFile(os.path.join(directory, name))
+
+
+def _generations(directory: str) -> List[int]:
+    numbers = []
+    for entry in os.listdir(directory):
+        prefix, _, rest = entry.partition(".")
+        number, _, suffix = rest.partition(".")
+        if prefix == "index" and suffix == "bin" and number.isdigit():
+            numbers.append(int(number))
+    return numbers
+
+
+def _write_atomic(directory: str, name: str, data: bytes) -> None:
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=f".{name}.")
+    try:
+        with os.fdopen(descriptor, "wb") as handle:
+            handle.write(data)
+        os.replace(temporary, os.path.join(directory, name))
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
@@ -0,0 +1,121 @@
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.domain.models import (
+    Permission,
+    role_parents_table,
+    role_permissions_table,
+    user_effective_permissions_table,
+    user_roles_table,
+)
+from app.domain.permission_patterns import candidate_patterns
+from app.domain.repositories import AuthorizationRepository, PermissionGraph
+from app.infrastructure.change_log import log_position
+
+# Bound parameters per IN list; SQLite and the PostgreSQL drivers cap a statement at 32766/32767.
+IN_CHUNK_SIZE = 10_000
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class SQLAlchemyAuthorizationRepository(AuthorizationRepository):
+    def __init__(self, session: Session):
+        self.session = session
+
+    def load_graph(self) -> PermissionGraph:
+        # Read first: a change visible in the log is then visible to the graph queries too,
+        # even where each statement takes its own snapshot.
+        seq, unseen_seqs = log_position(self.session)
+        user_roles = self.session.execute(
+            select(user_roles_table.c.user_id, user_roles_table.c.role_id)
+        ).all()
+        role_permissions = self.session.execute(
+            select(role_permissions_table.c.role_id, role_permissions_table.c.permission_id)
+        ).all()
+        role_parents = self.session.execute(
+            select(role_parents_table.c.role_id, role_parents_table.c.parent_id)
+        ).all()
+        permissions = self.session.execute(select(Permission.id, Permission.name)).all()
+        return PermissionGraph(
+            user_roles=[tuple(row) for row in user_roles],
+            role_permissions=[tuple(row) for row in role_permissions],
+            permissions=[tuple(row) for row in permissions],
+            role_parents=[tuple(row) for row in role_parents],
+            seq=seq,
+            unseen_seqs=unseen_seqs,
+        )
+
+    def has_permission(self, user_id: int, permission_name: str) -> bool:
+        query = (
+            select(user_effective_permissions_table.c.user_id)
+            .join(Permission, Permission.id == user_effective_permissions_table.c.permission_id)
+            .where(
+                user_effective_permissions_table.c.user_id == user_id,
+                Permission.name.in_(candidate_patterns(permission_name)),
+            )
+        )
+        return self.session.execute(query).first() is not None
+
+    def granted_pairs(self, pairs: List[Tuple[int, str]]) -> Set[Tuple[int, str]]:
+        if not pairs:
+            return set()
+        # Each pair is probed under its own name and every wildcard pattern that covers it.
+        covers: Dict[Tuple[int, str], Set[Tuple[int, str]]] = defaultdict(set)
+        for user_id, name in set(pairs):
+            for pattern in candidate_patterns(name):
+                covers[(user_id, pattern)].add((user_id, name))
+        user_id = user_effective_permissions_table.c.user_id
+        granted: Set[Tuple[int, str]] = set()
+        # Each row value binds two parameters, plus one per distinct user of the chunk.
+        for chunk in _chunks(covers, IN_CHUNK_SIZE // 3):
+            # SQLite only probes the primary key for a plain ``IN`` list, so the row-value match
+            # is narrowed by user first; PostgreSQL plans either form as index lookups.
+            query = (
+                select(user_id, Permission.name)
+                .join(Permission, Permission.id == user_effective_permissions_table.c.permission_id)
+                .where(
+                    user_id.in_({pair[0] for pair in chunk}),
+                    tuple_(user_id, Permission.name).in_(chunk),
+                )
+            )
+            for row in self.session.execute(query):
+                granted |= covers[tuple(row)]
+        return granted
+
+    def list_permission_names(self, user_id: int) -> List[str]:
+        query = (
+            select(Permission.name)
+            .join(
+                user_effective_permissions_table,
+                user_effective_permissions_table.c.permission_id == Permission.id,
+            )
+            .where(user_effective_permissions_table.c.user_id == user_id)
+            .order_by(Permission.name)
+        )
+        return list(self.session.scalars(query).all())
+
+    def list_permission_holders(
+        self, permission_name: str, user_ids: Optional[List[int]] = None
+    ) -> List[int]:
+        query = (
+            select(user_effective_permissions_table.c.user_id)
+            .join(Permission, Permission.id == user_effective_permissions_table.c.permission_id)
+            .where(Permission.name.in_(candidate_patterns(permission_name)))
+            .order_by(user_effective_permissions_table.c.user_id)
+            .distinct()
+        )
+        if user_ids is None:
+            return list(self.session.scalars(query).all())
+        held: Set[int] = set()
+        user_id = user_effective_permissions_table.c.user_id
+        for chunk in _chunks(set(user_ids), IN_CHUNK_SIZE):
+            held.update(self.session.scalars(query.where(user_id.in_(chunk))))
+        return [candidate for candidate in user_ids if candidate in held]
@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Set, Tuple, Type
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.domain.schemas import BulkItemError
+
+LOOKUP_CHUNK_SIZE = 1000
+
+
+class BulkConflictError(ValueError):
+    """A concurrent write collided with the batch where no single row could be blamed."""
+
+
+@contextmanager
+def bulk_transaction(session: Session) -> Iterator[None]:
+    """Rolls back and raises ``BulkConflictError`` for an ``IntegrityError`` that escapes the
+    per-row handling of ``insert_many``, e.g. one raised at commit."""
+    try:
+        yield
+    except IntegrityError as exc:
+        session.rollback()
+        raise BulkConflictError(f"Conflicts with a concurrent write: {exc.orig}") from exc
+
+
+def find_existing(session: Session, column, values: Iterable[Any]) -> Set[Any]:
+    values = list(set(values))
+    found: Set[Any] = set()
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start : start + LOOKUP_CHUNK_SIZE]
+        found.update(session.scalars(select(column).where(column.in_(chunk))))
+    return found
+
+
+def split_conflicts(
+    session: Session, model: Type, rows: Sequence[Dict[str, Any]], unique_fields: Sequence[str]
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[BulkItemError]]:
+    existing = {
+        field: find_existing(session, getattr(model, field), (row[field] for row in rows))
+        for field in unique_fields
+    }
+    seen: Dict[str, Set[Any]] = {field: set() for field in unique_fields}
+    accepted: List[Tuple[int, Dict[str, Any]]] = []
+    errors: List[BulkItemError] = []
+    for index, row in enumerate(rows):
+        detail = None
+        for field in unique_fields:
+            if row[field] in existing[field]:
+                detail = f"{field} '{row[field]}' already exists"
+            elif row[field] in seen[field]:
+                detail = f"{field} '{row[field]}' is duplicated in the request"
+            if detail:
+                break
+        if detail:
+            errors.append(BulkItemError(index=index, detail=detail))
+            continue
+        for field in unique_fields:
+            seen[field].add(row[field])
+        accepted.append((index, row))
+    return accepted, errors
+
+
+def insert_many(
+    session: Session, model: Type, rows: Sequence[Dict[str, Any]], unique_fields: Sequence[str]
+) -> Tuple[List[Any], List[BulkItemError]]:
+    accepted, errors = split_conflicts(session, model, rows, unique_fields)
+    if not accepted:
+        return [], errors
+    try:
+        with session.begin_nested():
+            # Without sort_by_parameter_order the dialect can batch every row into a few
+            # multi-row INSERT ... RETURNING statements; order is restored by unique key.
+            created = list(session.scalars(insert(model).returning(model), [row for _, row in accepted]))
+    except IntegrityError:
+        # A concurrent write took some key after the lookup; retry row by row so only the
+        # rows that actually conflict are reported.
+        created = []
+        for index, row in accepted:
+            try:
+                with session.begin_nested():
+                    created.append(session.scalars(insert(model).values(**row).returning(model)).one())
+            except IntegrityError:
+                errors.append(BulkItemError(index=index, detail="Conflicts with a concurrent write"))
+        errors.sort(key=lambda error: error.index)
+    key = unique_fields[0]
+    position = {row[key]: order for order, (_, row) in enumerate(accepted)}
+    created.sort(key=lambda item: position[getattr(item, key)])
+    return created, errors
@@ -0,0 +1,170 @@
+from typing import Iterable, List, Optional, Union
+
+from sqlalchemy import Select, and_, delete, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.domain.models import (
+    User,
+    role_closure_table,
+    role_permissions_table,
+    user_effective_permissions_table,
+    user_roles_table,
+)
+from app.domain.repositories import EffectivePermissionDrift, EffectivePermissionRepository
+
+IdSet = Union[Iterable[int], Select]
+
+uep = user_effective_permissions_table
+
+
+def _grants_query() -> Select:
+    # A user's role reaches the grants of itself and every ancestor through role_closure.
+    return (
+        select(
+            user_roles_table.c.user_id,
+            role_permissions_table.c.permission_id,
+            func.count().label("via_role_count"),
+        )
+        .select_from(
+            user_roles_table.join(
+                role_closure_table, role_closure_table.c.descendant_id == user_roles_table.c.role_id
+            ).join(
+                role_permissions_table,
+                role_permissions_table.c.role_id == role_closure_table.c.ancestor_id,
+            )
+        )
+        .group_by(user_roles_table.c.user_id, role_permissions_table.c.permission_id)
+    )
+
+
+def _id_list(ids: IdSet) -> IdSet:
+    return ids if isinstance(ids, Select) else list(ids)
+
+
+class SQLAlchemyEffectivePermissionRepository(EffectivePermissionRepository):
+    """Keeps ``user_effective_permissions`` in step with the link tables.
+
+    Every maintenance call recomputes only the (user, permission) region touched by a
+    write and runs inside the caller's transaction, so the table commits or rolls back
+    together with the link rows.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def users_with_role(self, role_id: int) -> Select:
+        """Users holding ``role_id`` directly or through a role that inherits from it."""
+        inheriting = select(role_closure_table.c.descendant_id).where(
+            role_closure_table.c.ancestor_id == role_id
+        )
+        return select(user_roles_table.c.user_id).where(user_roles_table.c.role_id.in_(inheriting))
+
+    def permissions_of_roles(self, role_ids: IdSet) -> Select:
+        """Permissions granted to ``role_ids`` directly or inherited from their ancestors."""
+        inherited = select(role_closure_table.c.ancestor_id).where(
+            role_closure_table.c.descendant_id.in_(_id_list(role_ids))
+        )
+        return select(role_permissions_table.c.permission_id).where(
+            role_permissions_table.c.role_id.in_(inherited)
+        )
+
+    def refresh(self, user_ids: IdSet, permission_ids: IdSet, exclude_role_id: Optional[int] = None) -> None:
+        user_ids = _id_list(user_ids)
+        permission_ids = _id_list(permission_ids)
+        self._lock_users(user_ids)
+        self.session.execute(
+            delete(uep).where(uep.c.user_id.in_(user_ids), uep.c.permission_id.in_(permission_ids))
+        )
+        grants = _grants_query().where(
+            user_roles_table.c.user_id.in_(user_ids),
+            role_permissions_table.c.permission_id.in_(permission_ids),
+        )
+        if exclude_role_id is not None:
+            grants = grants.where(
+                user_roles_table.c.role_id != exclude_role_id,
+                role_permissions_table.c.role_id != exclude_role_id,
+            )
+        self.session.execute(
+            insert(uep).from_select(["user_id", "permission_id", "via_role_count"], grants)
+        )
+
+    def _lock_users(self, user_ids: IdSet) -> None:
+        """Serializes maintenance of the same users until commit.
+
+        Two writers reaching one (user, permission) pair, e.g. two roles sharing a permission
+        assigned to a user at once, would otherwise both delete nothing and then insert the
+        same primary key. The second now waits and recomputes from the first one's links.
+        """
+        if self.session.get_bind().dialect.name != "postgresql":
+            # SQLite already runs one writing transaction at a time.
+            return
+        # FOR NO KEY UPDATE: the foreign-key checks of link inserts take KEY SHARE on the user,
+        # which FOR UPDATE would wait on while its holder waits here in turn.
+        self.session.execute(
+            select(User.id)
+            .where(User.id.in_(user_ids))
+            .order_by(User.id)
+            .with_for_update(key_share=True)
+        )
+
+    def refresh_user_roles(self, user_id: int, role_ids: IdSet) -> None:
+        self.refresh([user_id], self.permissions_of_roles(role_ids))
+
+    def refresh_role_permissions(self, role_id: int, permission_ids: IdSet) -> None:
+        self.refresh(self.users_with_role(role_id), permission_ids)
+
+    def remove_role(self, role_id: int) -> None:
+        self.refresh(
+            self.users_with_role(role_id), self.permissions_of_roles([role_id]), exclude_role_id=role_id
+        )
+
+    def remove_user(self, user_id: int) -> None:
+        self.session.execute(delete(uep).where(uep.c.user_id == user_id))
+
+    def remove_permission(self, permission_id: int) -> None:
+        self.session.execute(delete(uep).where(uep.c.permission_id == permission_id))
+
+    def rebuild(self, commit: bool = True) -> int:
+        self.session.execute(delete(uep))
+        result = self.session.execute(
+            insert(uep).from_select(["user_id", "permission_id", "via_role_count"], _grants_query())
+        )
+        if commit:
+            self.session.commit()
+        return result.rowcount
+
+    def find_drift(self) -> List[EffectivePermissionDrift]:
+        expected = _grants_query().subquery("expected")
+        missing_or_wrong = (
+            select(
+                expected.c.user_id,
+                expected.c.permission_id,
+                expected.c.via_role_count,
+                func.coalesce(uep.c.via_role_count, 0),
+            )
+            .select_from(
+                expected.outerjoin(
+                    uep,
+                    and_(
+                        uep.c.user_id == expected.c.user_id,
+                        uep.c.permission_id == expected.c.permission_id,
+                    ),
+                )
+            )
+            .where(or_(uep.c.via_role_count.is_(None), uep.c.via_role_count != expected.c.via_role_count))
+        )
+        stale = (
+            select(uep.c.user_id, uep.c.permission_id, literal(0), uep.c.via_role_count)
+            .select_from(
+                uep.outerjoin(
+                    expected,
+                    and_(
+                        expected.c.user_id == uep.c.user_id,
+                        expected.c.permission_id == uep.c.permission_id,
+                    ),
+                )
+            )
+            .where(expected.c.user_id.is_(None))
+        )
+        rows = self.session.execute(missing_or_wrong).all() + self.session.execute(stale).all()
+        return sorted(EffectivePermissionDrift(*row) for row in rows)
@@ -0,0 +1,17 @@
+from typing import Any, Optional, Type
+
+from sqlalchemy import false, update
+from sqlalchemy.orm import Session
+
+
+def get_for_update(session: Session, model: Type, identifier: Any) -> Optional[Any]:
+    """Loads a row by primary key and keeps writers of the same row waiting until commit.
+
+    PostgreSQL takes ``FOR NO KEY UPDATE``, which still lets link inserts check their foreign
+    key against the row. SQLite has no row locks; an empty UPDATE takes its database write
+    lock instead, so a concurrent writer waits here rather than failing at its first insert.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        table = model.__table__
+        session.execute(update(table).where(false()).values(id=table.c.id))
+    return session.get(model, identifier, with_for_update={"key_share": True})
@@ -1,46 +1,77 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.changes import record_change
 from app.domain.models import Permission
-from app.domain.schemas import PermissionCreate, PermissionUpdate
+from app.domain.schemas import BulkItemError, PermissionCreate, PermissionUpdate, SearchMode
 from app.domain.repositories import PermissionRepository
+from app.infrastructure.repositories.bulk import bulk_transaction, insert_many
+from app.infrastructure.repositories.effective_permission_repository import (
+    SQLAlchemyEffectivePermissionRepository,
+)
+from app.infrastructure.repositories.projection import load_fields
+from app.infrastructure.repositories.returning import commit_detached, insert_returning, update_returning
+from app.infrastructure.search import text_filter
 
 
 class SQLAlchemyPermissionRepository(PermissionRepository):
     def __init__(self, session: Session):
         self.session = session
+        self.effective_permissions = SQLAlchemyEffectivePermissionRepository(session)
 
     def create(self, data: PermissionCreate) -> Permission:
-        permission = Permission(name=data.name, description=data.description)
-        self.session.add(permission)
-        self.session.commit()
-        self.session.refresh(permission)
-        return permission
+        permission = insert_returning(
+            self.session, Permission, {"name": data.name, "description": data.description}
+        )
+        record_change(self.session, "permissions", "insert", id=permission.id, name=permission.name)
+        return commit_detached(self.session, permission)
+
+    def create_many(self, items: List[PermissionCreate]) -> Tuple[List[Permission], List[BulkItemError]]:
+        rows = [{"name": item.name, "description": item.description} for item in items]
+        with bulk_transaction(self.session):
+            created, errors = insert_many(self.session, Permission, rows, ("name",))
+            for permission in created:
+                record_change(self.session, "permissions", "insert", id=permission.id, name=permission.name)
+            # Detached rows keep their RETURNING values instead of being expired by commit().
+            for item in created:
+                self.session.expunge(item)
+            self.session.commit()
+        return created, errors
 
     def get_all(self, **filters) -> List[Permission]:
-        query = select(Permission)
+        match = filters.get("match") or SearchMode.substring
+        query = load_fields(select(Permission), Permission, filters.get("fields"))
         if name := filters.get("name"):
-            query = query.where(Permission.name.ilike(f"%{name}%"))
+            query = query.where(text_filter(self.session, Permission, "name", name, match))
+        if after := filters.get("after"):
+            query = query.where(Permission.id > after[0])
+        query = query.order_by(Permission.id)
+        if limit := filters.get("limit"):
+            query = query.limit(limit)
         return list(self.session.scalars(query).all())
 
+    def stream(self, batch_size: int = 1000) -> Iterator[List[Permission]]:
+        query = select(Permission).order_by(Permission.id).execution_options(yield_per=batch_size)
+        for partition in self.session.scalars(query).partitions():
+            yield list(partition)
+
     def update(self, identifier: int, data: PermissionUpdate) -> Optional[Permission]:
-        permission = self.session.get(Permission, identifier)
+        permission = update_returning(
+            self.session, Permission, identifier, data.model_dump(exclude_none=True)
+        )
         if not permission:
             return None
-        if data.name is not None:
-            permission.name = data.name
-        if data.description is not None:
-            permission.description = data.description
-        self.session.commit()
-        self.session.refresh(permission)
-        return permission
+        record_change(self.session, "permissions", "update", id=permission.id, name=permission.name)
+        return commit_detached(self.session, permission)
 
     def delete(self, identifier: int) -> bool:
         permission = self.session.get(Permission, identifier)
         if not permission:
             return False
+        self.effective_permissions.remove_permission(permission.id)
+        record_change(self.session, "permissions", "delete", id=permission.id, name=permission.name)
         self.session.delete(permission)
         self.session.commit()
         return True
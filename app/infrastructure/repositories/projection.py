@@ -0,0 +1,17 @@
+from typing import Optional, Sequence
+
+from sqlalchemy import Select, Table, select
+from sqlalchemy.orm import load_only
+
+
+def load_fields(query: Select, model: type, fields: Optional[Sequence[str]]) -> Select:
+    """Defers every mapped column outside ``fields``; the primary key is always loaded."""
+    if not fields:
+        return query
+    return query.options(load_only(*(getattr(model, name) for name in fields)))
+
+
+def select_columns(table: Table, fields: Optional[Sequence[str]]) -> Select:
+    if not fields:
+        return select(table)
+    return select(*(table.c[name] for name in fields))
@@ -0,0 +1,35 @@
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import Column, Select, Table, select
+from sqlalchemy.orm import Session, selectinload
+
+
+def load_relations(query: Select, model: type, names: Sequence[str]) -> Select:
+    # selectinload fetches each relationship for the whole page in one IN query, not one per row.
+    return query.options(*(selectinload(getattr(model, name)) for name in names))
+
+
+def related_page(
+    session: Session,
+    target: type,
+    link: Table,
+    target_column: Column,
+    owner_column: Column,
+    owner: type,
+    owner_id: int,
+    limit: Optional[int] = None,
+    after: Optional[tuple] = None,
+) -> Optional[List[Any]]:
+    """One keyset page of ``target`` rows linked to ``owner_id`` through ``link``, ordered by id;
+    ``None`` when the owner does not exist."""
+    query = select(target).join(link, target_column == target.id).where(owner_column == owner_id)
+    if after:
+        query = query.where(target.id > after[0])
+    query = query.order_by(target.id)
+    if limit:
+        query = query.limit(limit)
+    rows = list(session.scalars(query))
+    # Only an empty page is ambiguous, so the owner lookup stays off the common path.
+    if not rows and session.get(owner, owner_id) is None:
+        return None
+    return rows
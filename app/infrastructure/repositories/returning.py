@@ -0,0 +1,27 @@
+from typing import Any, Dict, Optional, Type
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+
+def insert_returning(session: Session, model: Type, values: Dict[str, Any]) -> Any:
+    """INSERT ... RETURNING the whole row, so server and client defaults come back in the same
+    statement instead of a ``refresh()`` after commit."""
+    return session.scalar(insert(model).values(**values).returning(model))
+
+
+def update_returning(
+    session: Session, model: Type, identifier: Any, values: Dict[str, Any]
+) -> Optional[Any]:
+    """UPDATE ... RETURNING the row by primary key; ``None`` when it does not exist."""
+    if not values:
+        return session.get(model, identifier)
+    statement = update(model).where(model.id == identifier).values(**values).returning(model)
+    return session.scalar(statement, execution_options={"synchronize_session": False})
+
+
+def commit_detached(session: Session, entity: Any) -> Any:
+    # Detached rows keep their RETURNING values instead of being expired by commit().
+    session.expunge(entity)
+    session.commit()
+    return entity
@@ -0,0 +1,126 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import delete, false, func, insert, or_, select, text, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.domain.models import Role, role_closure_table, role_parents_table
+from app.domain.repositories import RoleHierarchyRepository
+
+closure = role_closure_table
+
+
+class SQLAlchemyRoleHierarchyRepository(RoleHierarchyRepository):
+    """Keeps ``role_closure`` in step with ``role_parents``.
+
+    An edge change only rewrites the ancestor rows of the roles below it, diffed against what
+    is stored, inside the caller's transaction. Hierarchies are small (tens to hundreds of
+    edges), so the paths are recomputed in Python from the edge list.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def lock(self) -> None:
+        """Serializes hierarchy writes until commit, so a cycle check sees every committed edge."""
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            # Conflicts with itself and with row writes to role_parents; plain reads go on.
+            self.session.execute(text("LOCK TABLE role_parents IN SHARE ROW EXCLUSIVE MODE"))
+        elif dialect == "sqlite":
+            # Any write statement takes SQLite's single database write lock for the transaction.
+            self.session.execute(
+                update(role_parents_table).where(false()).values(role_id=role_parents_table.c.role_id)
+            )
+
+    def add_roles(self, role_ids: Iterable[int]) -> None:
+        rows = [{"ancestor_id": role_id, "descendant_id": role_id, "depth": 0} for role_id in role_ids]
+        if rows:
+            self.session.execute(insert(closure), rows)
+
+    def descendants(self, role_id: int) -> List[int]:
+        """``role_id`` and every role inheriting from it."""
+        query = select(closure.c.descendant_id).where(closure.c.ancestor_id == role_id)
+        return list(self.session.scalars(query))
+
+    def cycles(self, role_id: int, parent_ids: List[int]) -> List[int]:
+        """Parents that already inherit from ``role_id`` (or are the role itself)."""
+        if not parent_ids:
+            return []
+        query = select(closure.c.descendant_id).where(
+            closure.c.ancestor_id == role_id, closure.c.descendant_id.in_(parent_ids)
+        )
+        return sorted(self.session.scalars(query))
+
+    def relink(self, role_ids: Iterable[int]) -> None:
+        role_ids = list(role_ids)
+        if not role_ids:
+            return
+        parents: Dict[int, Set[int]] = defaultdict(set)
+        for role_id, parent_id in self.session.execute(
+            select(role_parents_table.c.role_id, role_parents_table.c.parent_id)
+        ):
+            parents[role_id].add(parent_id)
+        wanted = {
+            (ancestor_id, role_id): depth
+            for role_id in role_ids
+            for ancestor_id, depth in _ancestor_depths(role_id, parents).items()
+        }
+        stored = {
+            (ancestor_id, descendant_id): depth
+            for ancestor_id, descendant_id, depth in self.session.execute(
+                select(closure.c.ancestor_id, closure.c.descendant_id, closure.c.depth).where(
+                    closure.c.descendant_id.in_(role_ids)
+                )
+            )
+        }
+        stale = [pair for pair, depth in stored.items() if wanted.get(pair) != depth]
+        if stale:
+            self.session.execute(
+                delete(closure).where(tuple_(closure.c.ancestor_id, closure.c.descendant_id).in_(stale))
+            )
+        missing = [
+            {"ancestor_id": ancestor_id, "descendant_id": descendant_id, "depth": depth}
+            for (ancestor_id, descendant_id), depth in wanted.items()
+            if stored.get((ancestor_id, descendant_id)) != depth
+        ]
+        if missing:
+            self.session.execute(insert(closure), missing)
+
+    def remove_role(self, role_id: int, descendants: List[int]) -> None:
+        """Drops the role's edges and closure rows, then relinks the roles that inherited
+        through it (``descendants`` must be read before the call)."""
+        self.session.execute(
+            delete(role_parents_table).where(
+                or_(role_parents_table.c.role_id == role_id, role_parents_table.c.parent_id == role_id)
+            )
+        )
+        self.session.execute(
+            delete(closure).where(or_(closure.c.ancestor_id == role_id, closure.c.descendant_id == role_id))
+        )
+        self.relink(descendant for descendant in descendants if descendant != role_id)
+
+    def rebuild(self, commit: bool = True) -> int:
+        self.session.execute(delete(closure))
+        role_ids = list(self.session.scalars(select(Role.id)))
+        self.add_roles(role_ids)
+        self.relink(role_ids)
+        count = self.session.scalar(select(func.count()).select_from(closure))
+        if commit:
+            self.session.commit()
+        return count
+
+
+def _ancestor_depths(role_id: int, parents: Dict[int, Set[int]]) -> Dict[int, int]:
+    """Shortest inheritance distance from ``role_id`` to each of its ancestors, itself at 0."""
+    depths = {role_id: 0}
+    frontier: List[Tuple[int, int]] = [(role_id, 0)]
+    while frontier:
+        next_frontier = []
+        for current, depth in frontier:
+            for parent_id in parents.get(current, ()):
+                if parent_id not in depths:
+                    depths[parent_id] = depth + 1
+                    next_frontier.append((parent_id, depth + 1))
+        frontier = next_frontier
+    return depths
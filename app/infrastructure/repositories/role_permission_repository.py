@@ -1,55 +1,74 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, delete, insert, select, tuple_
 from sqlalchemy.orm import Session
 
+from app.core.changes import record_change
 from app.domain.models import Permission, Role, role_permissions_table
-from app.domain.schemas import RolePermissionCreate, RolePermissionUpdate
+from app.domain.schemas import LinkSetDiff, RolePermissionCreate, RolePermissionUpdate
 from app.domain.repositories import RolePermissionRepository
+from app.infrastructure.repositories.bulk import find_existing
+from app.infrastructure.repositories.effective_permission_repository import (
+    SQLAlchemyEffectivePermissionRepository,
+)
+from app.infrastructure.repositories.locking import get_for_update
+from app.infrastructure.repositories.projection import select_columns
+from app.infrastructure.repositories.relations import related_page
 
 
 class SQLAlchemyRolePermissionRepository(RolePermissionRepository):
     def __init__(self, session: Session):
         self.session = session
+        self.effective_permissions = SQLAlchemyEffectivePermissionRepository(session)
 
     def create(self, data: RolePermissionCreate) -> dict:
-        granted_at = datetime.utcnow()
-        stmt = role_permissions_table.insert().values(
-            role_id=data.role_id, permission_id=data.permission_id, granted_at=granted_at
+        stmt = (
+            role_permissions_table.insert()
+            .values(role_id=data.role_id, permission_id=data.permission_id)
+            .returning(role_permissions_table)
+        )
+        created = dict(self.session.execute(stmt).one()._mapping)
+        self.effective_permissions.refresh_role_permissions(data.role_id, [data.permission_id])
+        record_change(
+            self.session,
+            "role_permissions",
+            "insert",
+            role_id=data.role_id,
+            permission_id=data.permission_id,
         )
-        self.session.execute(stmt)
         self.session.commit()
-        return {
-            "role_id": data.role_id,
-            "permission_id": data.permission_id,
-            "granted_at": granted_at,
-        }
+        return created
 
     def get_all(self, **filters) -> List[dict]:
-        query = select(role_permissions_table)
+        query = select_columns(role_permissions_table, filters.get("fields"))
         if role_id := filters.get("role_id"):
             query = query.where(role_permissions_table.c.role_id == role_id)
         if permission_id := filters.get("permission_id"):
             query = query.where(role_permissions_table.c.permission_id == permission_id)
+        key = (role_permissions_table.c.role_id, role_permissions_table.c.permission_id)
+        if after := filters.get("after"):
+            query = query.where(tuple_(*key) > tuple_(*after))
+        query = query.order_by(*key)
+        if limit := filters.get("limit"):
+            query = query.limit(limit)
         result = self.session.execute(query)
         return [dict(row._mapping) for row in result.fetchall()]
 
+    def stream(self, batch_size: int = 1000) -> Iterator[List[dict]]:
+        query = (
+            select(role_permissions_table)
+            .order_by(role_permissions_table.c.role_id, role_permissions_table.c.permission_id)
+            .execution_options(yield_per=batch_size)
+        )
+        for partition in self.session.execute(query).partitions():
+            yield [dict(row._mapping) for row in partition]
+
     def update(self, identifier: tuple, data: RolePermissionUpdate) -> Optional[dict]:
         role_id, permission_id = identifier
-        query = select(role_permissions_table).where(
-            and_(
-                role_permissions_table.c.role_id == role_id,
-                role_permissions_table.c.permission_id == permission_id,
-            )
-        )
-        current = self.session.execute(query).first()
-        if not current:
-            return None
-        granted_at = current._mapping.get("granted_at")
         new_role_id = data.role_id or role_id
         new_permission_id = data.permission_id or permission_id
-        self.session.execute(
+        updated = self.session.execute(
             role_permissions_table.update()
             .where(
                 and_(
@@ -58,13 +77,24 @@ class SQLAlchemyRolePermissionRepository(RolePermissionRepository):
                 )
             )
             .values(role_id=new_role_id, permission_id=new_permission_id)
+            .returning(role_permissions_table)
+        ).first()
+        if not updated:
+            return None
+        self.effective_permissions.refresh_role_permissions(role_id, [permission_id])
+        self.effective_permissions.refresh_role_permissions(new_role_id, [new_permission_id])
+        record_change(
+            self.session, "role_permissions", "delete", role_id=role_id, permission_id=permission_id
+        )
+        record_change(
+            self.session,
+            "role_permissions",
+            "insert",
+            role_id=new_role_id,
+            permission_id=new_permission_id,
         )
         self.session.commit()
-        return {
-            "role_id": new_role_id,
-            "permission_id": new_permission_id,
-            "granted_at": granted_at,
-        }
+        return dict(updated._mapping)
 
     def delete(self, identifier: tuple) -> bool:
         role_id, permission_id = identifier
@@ -76,13 +106,85 @@ class SQLAlchemyRolePermissionRepository(RolePermissionRepository):
                 )
             )
         )
+        if result.rowcount:
+            self.effective_permissions.refresh_role_permissions(role_id, [permission_id])
+            record_change(
+                self.session, "role_permissions", "delete", role_id=role_id, permission_id=permission_id
+            )
         self.session.commit()
         return result.rowcount > 0
 
-    def list_permissions_for_role(self, role_id: int) -> List[Permission]:
-        role = self.session.get(Role, role_id)
-        return role.permissions if role else []
+    def replace_for_role(self, role_id: int, permission_ids: List[int]) -> Optional[LinkSetDiff]:
+        # Concurrent replacements of one set would both insert the same missing links.
+        if get_for_update(self.session, Role, role_id) is None:
+            return None
+        desired = set(permission_ids)
+        unknown = desired - find_existing(self.session, Permission.id, desired)
+        if unknown:
+            return LinkSetDiff(unknown=sorted(unknown))
+        current = set(
+            self.session.scalars(
+                select(role_permissions_table.c.permission_id).where(
+                    role_permissions_table.c.role_id == role_id
+                )
+            )
+        )
+        added, removed = sorted(desired - current), sorted(current - desired)
+        if removed:
+            self.session.execute(
+                delete(role_permissions_table).where(
+                    role_permissions_table.c.role_id == role_id,
+                    role_permissions_table.c.permission_id.in_(removed),
+                )
+            )
+        if added:
+            granted_at = datetime.utcnow()
+            self.session.execute(
+                insert(role_permissions_table),
+                [
+                    {"role_id": role_id, "permission_id": permission_id, "granted_at": granted_at}
+                    for permission_id in added
+                ],
+            )
+        if added or removed:
+            self.effective_permissions.refresh_role_permissions(role_id, added + removed)
+        for permission_id in removed:
+            record_change(
+                self.session, "role_permissions", "delete", role_id=role_id, permission_id=permission_id
+            )
+        for permission_id in added:
+            record_change(
+                self.session, "role_permissions", "insert", role_id=role_id, permission_id=permission_id
+            )
+        self.session.commit()
+        return LinkSetDiff(added=added, removed=removed)
 
-    def list_roles_for_permission(self, permission_id: int) -> List[Role]:
-        permission = self.session.get(Permission, permission_id)
-        return permission.roles if permission else []
+    def list_permissions_for_role(
+        self, role_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[Permission]]:
+        return related_page(
+            self.session,
+            Permission,
+            role_permissions_table,
+            role_permissions_table.c.permission_id,
+            role_permissions_table.c.role_id,
+            Role,
+            role_id,
+            limit,
+            after,
+        )
+
+    def list_roles_for_permission(
+        self, permission_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[Role]]:
+        return related_page(
+            self.session,
+            Role,
+            role_permissions_table,
+            role_permissions_table.c.role_id,
+            role_permissions_table.c.permission_id,
+            Permission,
+            permission_id,
+            limit,
+            after,
+        )
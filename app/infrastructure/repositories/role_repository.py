@@ -1,47 +1,91 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.domain.models import Permission, Role, role_permissions_table
-from app.domain.schemas import RoleCreate, RoleUpdate
+from app.core.changes import record_change
+from app.domain.models import Permission, Role, role_parents_table, role_permissions_table
+from app.domain.schemas import BulkItemError, RoleCreate, RoleParentDiff, RoleUpdate, SearchMode
 from app.domain.repositories import RoleRepository
+from app.infrastructure.repositories.bulk import bulk_transaction, find_existing, insert_many
+from app.infrastructure.repositories.effective_permission_repository import (
+    SQLAlchemyEffectivePermissionRepository,
+)
+from app.infrastructure.repositories.projection import load_fields
+from app.infrastructure.repositories.relations import load_relations, related_page
+from app.infrastructure.repositories.returning import commit_detached, insert_returning, update_returning
+from app.infrastructure.repositories.role_hierarchy_repository import SQLAlchemyRoleHierarchyRepository
+from app.infrastructure.search import text_filter
 
 
 class SQLAlchemyRoleRepository(RoleRepository):
     def __init__(self, session: Session):
         self.session = session
+        self.effective_permissions = SQLAlchemyEffectivePermissionRepository(session)
+        self.hierarchy = SQLAlchemyRoleHierarchyRepository(session)
 
     def create(self, data: RoleCreate) -> Role:
-        role = Role(name=data.name, description=data.description)
-        self.session.add(role)
-        self.session.commit()
-        self.session.refresh(role)
-        return role
+        role = insert_returning(self.session, Role, {"name": data.name, "description": data.description})
+        self.hierarchy.add_roles([role.id])
+        record_change(self.session, "roles", "insert", id=role.id, name=role.name)
+        return commit_detached(self.session, role)
+
+    def create_many(self, items: List[RoleCreate]) -> Tuple[List[Role], List[BulkItemError]]:
+        rows = [{"name": item.name, "description": item.description} for item in items]
+        with bulk_transaction(self.session):
+            created, errors = insert_many(self.session, Role, rows, ("name",))
+            self.hierarchy.add_roles(role.id for role in created)
+            for role in created:
+                record_change(self.session, "roles", "insert", id=role.id, name=role.name)
+            # Detached rows keep their RETURNING values instead of being expired by commit().
+            for item in created:
+                self.session.expunge(item)
+            self.session.commit()
+        return created, errors
 
     def get_all(self, **filters) -> List[Role]:
-        query = select(Role)
+        match = filters.get("match") or SearchMode.substring
+        query = load_fields(select(Role), Role, filters.get("fields"))
+        query = load_relations(query, Role, filters.get("include") or ())
         if name := filters.get("name"):
-            query = query.where(Role.name.ilike(f"%{name}%"))
+            query = query.where(text_filter(self.session, Role, "name", name, match))
+        if after := filters.get("after"):
+            query = query.where(Role.id > after[0])
+        query = query.order_by(Role.id)
+        if limit := filters.get("limit"):
+            query = query.limit(limit)
         return list(self.session.scalars(query).all())
 
+    def stream(self, batch_size: int = 1000) -> Iterator[List[Role]]:
+        query = select(Role).order_by(Role.id).execution_options(yield_per=batch_size)
+        for partition in self.session.scalars(query).partitions():
+            yield list(partition)
+
     def update(self, identifier: int, data: RoleUpdate) -> Optional[Role]:
-        role = self.session.get(Role, identifier)
+        role = update_returning(self.session, Role, identifier, data.model_dump(exclude_none=True))
         if not role:
             return None
-        if data.name is not None:
-            role.name = data.name
-        if data.description is not None:
-            role.description = data.description
-        self.session.commit()
-        self.session.refresh(role)
-        return role
+        record_change(self.session, "roles", "update", id=role.id, name=role.name)
+        return commit_detached(self.session, role)
 
     def delete(self, identifier: int) -> bool:
         role = self.session.get(Role, identifier)
         if not role:
             return False
+        descendants = self.hierarchy.descendants(role.id)
+        if len(descendants) > 1:
+            # Roles below inherit through this one, so the affected users and permissions are
+            # read before the closure changes and refreshed against the new closure.
+            effective = self.effective_permissions
+            users = list(self.session.scalars(effective.users_with_role(role.id)))
+            permissions = list(self.session.scalars(effective.permissions_of_roles([role.id])))
+            self.hierarchy.remove_role(role.id, descendants)
+            self.effective_permissions.refresh(users, permissions, exclude_role_id=role.id)
+        else:
+            self.effective_permissions.remove_role(role.id)
+            self.hierarchy.remove_role(role.id, descendants)
+        record_change(self.session, "roles", "delete", id=role.id, name=role.name)
         self.session.delete(role)
         self.session.commit()
         return True
@@ -50,10 +94,73 @@ class SQLAlchemyRoleRepository(RoleRepository):
         stmt = role_permissions_table.insert().values(role_id=role_id, permission_id=permission_id)
         try:
             self.session.execute(stmt)
+            self.effective_permissions.refresh_role_permissions(role_id, [permission_id])
+            record_change(
+                self.session, "role_permissions", "insert", role_id=role_id, permission_id=permission_id
+            )
             self.session.commit()
         except IntegrityError:
             self.session.rollback()
 
+    def replace_parents(self, role_id: int, parent_ids: List[int]) -> Optional[RoleParentDiff]:
+        if self.session.get(Role, role_id) is None:
+            return None
+        desired = set(parent_ids)
+        unknown = desired - find_existing(self.session, Role.id, desired)
+        if unknown:
+            return RoleParentDiff(unknown=sorted(unknown))
+        # Without this, concurrent A -> B and B -> A both pass the cycle check below.
+        self.hierarchy.lock()
+        current = set(
+            self.session.scalars(
+                select(role_parents_table.c.parent_id).where(role_parents_table.c.role_id == role_id)
+            )
+        )
+        added, removed = sorted(desired - current), sorted(current - desired)
+        cycles = self.hierarchy.cycles(role_id, added)
+        if cycles:
+            return RoleParentDiff(cycles=cycles)
+        if removed:
+            self.session.execute(
+                delete(role_parents_table).where(
+                    role_parents_table.c.role_id == role_id, role_parents_table.c.parent_id.in_(removed)
+                )
+            )
+        if added:
+            self.session.execute(
+                insert(role_parents_table),
+                [{"role_id": role_id, "parent_id": parent_id} for parent_id in added],
+            )
+        if added or removed:
+            self.hierarchy.relink(self.hierarchy.descendants(role_id))
+            # Roles inheriting from ``role_id`` keep their place below it; only what flows down
+            # from the added and removed parents changes for their users.
+            self.effective_permissions.refresh(
+                self.effective_permissions.users_with_role(role_id),
+                self.effective_permissions.permissions_of_roles(added + removed),
+            )
+        for parent_id in removed:
+            record_change(self.session, "role_parents", "delete", role_id=role_id, parent_id=parent_id)
+        for parent_id in added:
+            record_change(self.session, "role_parents", "insert", role_id=role_id, parent_id=parent_id)
+        self.session.commit()
+        return RoleParentDiff(added=added, removed=removed)
+
+    def list_parents(
+        self, role_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[Role]]:
+        return related_page(
+            self.session,
+            Role,
+            role_parents_table,
+            role_parents_table.c.parent_id,
+            role_parents_table.c.role_id,
+            Role,
+            role_id,
+            limit,
+            after,
+        )
+
     def list_permissions(self, role_id: int) -> List[Permission]:
         role = self.session.get(Role, role_id)
         return role.permissions if role else []
@@ -0,0 +1,166 @@
+from itertools import islice
+from typing import Dict, List
+
+from sqlalchemy import Table, delete, insert, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.changes import record_change
+from app.domain.models import (
+    Permission,
+    Role,
+    User,
+    role_closure_table,
+    role_parents_table,
+    role_permissions_table,
+    user_effective_permissions_table,
+    user_roles_table,
+)
+from app.domain.repositories import SnapshotRepository
+from app.infrastructure.repositories.effective_permission_repository import (
+    SQLAlchemyEffectivePermissionRepository,
+)
+from app.infrastructure.repositories.role_hierarchy_repository import SQLAlchemyRoleHierarchyRepository
+from app.infrastructure.snapshot import (
+    BOOL,
+    INT,
+    TEXT,
+    TIME,
+    SnapshotColumn,
+    SnapshotFormatError,
+    SnapshotTable,
+    decode_snapshot,
+    encode_snapshot,
+)
+
+BATCH_SIZE = 50_000
+# Snapshots never carry password hashes; restored users that did not exist before cannot
+# log in until a password is set.
+LOCKED_PASSWORD_HASH = "!"
+
+# Tables in foreign-key order, with the columns a snapshot carries and their kinds.
+SNAPSHOT_TABLES: Dict[Table, tuple] = {
+    Role.__table__: (
+        ("id", INT),
+        ("name", TEXT),
+        ("description", TEXT),
+        ("created_at", TIME),
+        ("updated_at", TIME),
+    ),
+    Permission.__table__: (
+        ("id", INT),
+        ("name", TEXT),
+        ("description", TEXT),
+        ("created_at", TIME),
+        ("updated_at", TIME),
+    ),
+    User.__table__: (
+        ("id", INT),
+        ("username", TEXT),
+        ("email", TEXT),
+        ("is_active", BOOL),
+        ("created_at", TIME),
+        ("updated_at", TIME),
+    ),
+    role_permissions_table: (("role_id", INT), ("permission_id", INT), ("granted_at", TIME)),
+    user_roles_table: (("user_id", INT), ("role_id", INT), ("assigned_at", TIME)),
+    role_parents_table: (("role_id", INT), ("parent_id", INT)),
+}
+
+
+class SQLAlchemySnapshotRepository(SnapshotRepository):
+    """Dumps and restores the whole RBAC graph as one columnar binary snapshot.
+
+    A restore replaces every table in a single transaction, recomputes ``role_closure``
+    and ``user_effective_permissions`` from the loaded links and records one ``reload``
+    change per table, so in-process caches drop their state instead of replaying rows.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def export(self) -> bytes:
+        self._begin_snapshot()
+        try:
+            return encode_snapshot([self._dump(table, columns) for table, columns in SNAPSHOT_TABLES.items()])
+        finally:
+            self.session.rollback()
+
+    def _begin_snapshot(self) -> None:
+        """Reads every table from one snapshot, so no link outlives a row dumped before it."""
+        dialect = self.session.get_bind().dialect.name
+        if dialect == "postgresql":
+            # DEFERRABLE waits for a snapshot no serializable writer can invalidate, as pg_dump does.
+            self.session.connection(execution_options={"isolation_level": "SERIALIZABLE"})
+            self.session.execute(text("SET TRANSACTION READ ONLY DEFERRABLE"))
+        elif dialect == "sqlite":
+            # pysqlite starts no transaction for reads; the shared lock of an explicit one
+            # keeps writers from committing until the export ends.
+            self.session.execute(text("BEGIN"))
+
+    def restore(self, data: bytes) -> Dict[str, int]:
+        loaded = {table.name: table for table in decode_snapshot(data)}
+        for table, columns in SNAPSHOT_TABLES.items():
+            snapshot = loaded.get(table.name)
+            if snapshot is None:
+                raise SnapshotFormatError(f"Snapshot has no {table.name} table")
+            present = {column.name: column.kind for column in snapshot.columns}
+            missing = [name for name, kind in columns if present.get(name) != kind]
+            if missing:
+                raise SnapshotFormatError(f"Snapshot {table.name} lacks columns: {', '.join(missing)}")
+
+        users = User.__table__
+        hashes = dict(self.session.execute(select(users.c.id, users.c.password_hash)).all())
+        for table in (user_effective_permissions_table, role_closure_table, *reversed(SNAPSHOT_TABLES)):
+            self.session.execute(delete(table))
+        try:
+            counts = self._load(loaded, hashes)
+        except IntegrityError as exc:
+            self.session.rollback()
+            raise SnapshotFormatError(f"Snapshot rows violate a constraint: {exc.orig}") from exc
+        self._reset_sequences()
+        SQLAlchemyRoleHierarchyRepository(self.session).rebuild(commit=False)
+        SQLAlchemyEffectivePermissionRepository(self.session).rebuild(commit=False)
+        self.session.commit()
+        return counts
+
+    def _load(self, loaded: Dict[str, SnapshotTable], hashes: Dict[int, str]) -> Dict[str, int]:
+        counts = {}
+        for table, columns in SNAPSHOT_TABLES.items():
+            snapshot = loaded[table.name]
+            values = {column.name: column.values for column in snapshot.columns}
+            names = [name for name, _ in columns]
+            rows = zip(*(values[name] for name in names))
+            while batch := list(islice(rows, BATCH_SIZE)):
+                records = [dict(zip(names, row)) for row in batch]
+                if table is User.__table__:
+                    for record in records:
+                        record["password_hash"] = hashes.get(record["id"], LOCKED_PASSWORD_HASH)
+                self.session.execute(insert(table), records)
+            counts[table.name] = snapshot.rows
+            record_change(self.session, table.name, "reload")
+        return counts
+
+    def _dump(self, table: Table, columns: tuple) -> SnapshotTable:
+        query = select(*(table.c[name] for name, _ in columns)).order_by(*table.primary_key.columns)
+        values: List[list] = [[] for _ in columns]
+        for partition in self.session.execute(query.execution_options(yield_per=BATCH_SIZE)).partitions():
+            for target, column in zip(values, zip(*partition)):
+                target.extend(column)
+        return SnapshotTable(
+            table.name,
+            len(values[0]),
+            [SnapshotColumn(name, kind, column) for (name, kind), column in zip(columns, values)],
+        )
+
+    def _reset_sequences(self) -> None:
+        # Rows were written with explicit ids; PostgreSQL serial sequences must move past them.
+        if self.session.get_bind().dialect.name != "postgresql":
+            return
+        for table in (Role.__table__, Permission.__table__, User.__table__):
+            self.session.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+                )
+            )
@@ -1,57 +1,102 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.changes import record_change
 from app.domain.models import User
-from app.domain.schemas import UserCreate, UserUpdate
+from app.domain.schemas import BulkItemError, SearchMode, UserCreate, UserUpdate
 from app.domain.repositories import UserRepository
+from app.infrastructure.repositories.bulk import bulk_transaction, insert_many
+from app.infrastructure.repositories.effective_permission_repository import (
+    SQLAlchemyEffectivePermissionRepository,
+)
+from app.infrastructure.repositories.projection import load_fields
+from app.infrastructure.repositories.relations import load_relations
+from app.infrastructure.repositories.returning import commit_detached, insert_returning, update_returning
+from app.infrastructure.search import text_filter
 
 
 class SQLAlchemyUserRepository(UserRepository):
     def __init__(self, session: Session):
         self.session = session
+        self.effective_permissions = SQLAlchemyEffectivePermissionRepository(session)
 
     def create(self, data: UserCreate) -> User:
-        user = User(
-            username=data.username,
-            email=data.email,
-            password_hash=data.password_hash,
-            is_active=data.is_active,
+        user = insert_returning(
+            self.session,
+            User,
+            {
+                "username": data.username,
+                "email": data.email,
+                "password_hash": data.password_hash,
+                "is_active": data.is_active,
+            },
         )
-        self.session.add(user)
-        self.session.commit()
-        self.session.refresh(user)
-        return user
+        record_change(
+            self.session, "users", "insert", id=user.id, username=user.username, email=user.email
+        )
+        return commit_detached(self.session, user)
+
+    def create_many(self, items: List[UserCreate]) -> Tuple[List[User], List[BulkItemError]]:
+        rows = [
+            {
+                "username": item.username,
+                "email": item.email,
+                "password_hash": item.password_hash,
+                "is_active": item.is_active,
+            }
+            for item in items
+        ]
+        with bulk_transaction(self.session):
+            created, errors = insert_many(self.session, User, rows, ("username", "email"))
+            for user in created:
+                record_change(
+                    self.session, "users", "insert", id=user.id, username=user.username, email=user.email
+                )
+            # Detached rows keep their RETURNING values instead of being expired by commit().
+            for item in created:
+                self.session.expunge(item)
+            self.session.commit()
+        return created, errors
 
     def get_all(self, **filters) -> List[User]:
-        query = select(User)
+        match = filters.get("match") or SearchMode.substring
+        query = load_fields(select(User), User, filters.get("fields"))
+        query = load_relations(query, User, filters.get("include") or ())
         if username := filters.get("username"):
-            query = query.where(User.username.ilike(f"%{username}%"))
+            query = query.where(text_filter(self.session, User, "username", username, match))
         if email := filters.get("email"):
-            query = query.where(User.email.ilike(f"%{email}%"))
+            query = query.where(text_filter(self.session, User, "email", email, match))
+        if after := filters.get("after"):
+            query = query.where(User.id > after[0])
+        query = query.order_by(User.id)
+        if limit := filters.get("limit"):
+            query = query.limit(limit)
         return list(self.session.scalars(query).all())
 
+    def stream(self, batch_size: int = 1000) -> Iterator[List[User]]:
+        query = select(User).order_by(User.id).execution_options(yield_per=batch_size)
+        for partition in self.session.scalars(query).partitions():
+            yield list(partition)
+
     def update(self, identifier: int, data: UserUpdate) -> Optional[User]:
-        user = self.session.get(User, identifier)
+        user = update_returning(self.session, User, identifier, data.model_dump(exclude_none=True))
         if not user:
             return None
-        if data.username is not None:
-            user.username = data.username
-        if data.email is not None:
-            user.email = data.email
-        if data.password_hash is not None:
-            user.password_hash = data.password_hash
-        if data.is_active is not None:
-            user.is_active = data.is_active
-        self.session.commit()
-        self.session.refresh(user)
-        return user
+        record_change(
+            self.session, "users", "update", id=user.id, username=user.username, email=user.email
+        )
+        return commit_detached(self.session, user)
 
     def delete(self, identifier: int) -> bool:
         user = self.session.get(User, identifier)
         if not user:
             return False
+        self.effective_permissions.remove_user(user.id)
+        record_change(
+            self.session, "users", "delete", id=user.id, username=user.username, email=user.email
+        )
         self.session.delete(user)
         self.session.commit()
         return True
@@ -1,54 +1,81 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, delete, insert, select, tuple_
 from sqlalchemy.orm import Session
 
+from app.core.changes import record_change
 from app.domain.models import Role, User, user_roles_table
-from app.domain.schemas import UserRoleCreate, UserRoleUpdate
+from app.domain.schemas import LinkSetDiff, UserRoleCreate, UserRoleUpdate
 from app.domain.repositories import UserRoleRepository
+from app.infrastructure.repositories.bulk import find_existing
+from app.infrastructure.repositories.effective_permission_repository import (
+    SQLAlchemyEffectivePermissionRepository,
+)
+from app.infrastructure.repositories.locking import get_for_update
+from app.infrastructure.repositories.projection import select_columns
+from app.infrastructure.repositories.relations import related_page
 
 
 class SQLAlchemyUserRoleRepository(UserRoleRepository):
     def __init__(self, session: Session):
         self.session = session
+        self.effective_permissions = SQLAlchemyEffectivePermissionRepository(session)
 
     def create(self, data: UserRoleCreate) -> dict:
-        assigned_at = datetime.utcnow()
-        stmt = user_roles_table.insert().values(
-            user_id=data.user_id, role_id=data.role_id, assigned_at=assigned_at
+        stmt = (
+            user_roles_table.insert()
+            .values(user_id=data.user_id, role_id=data.role_id)
+            .returning(user_roles_table)
         )
-        self.session.execute(stmt)
+        created = dict(self.session.execute(stmt).one()._mapping)
+        self.effective_permissions.refresh_user_roles(data.user_id, [data.role_id])
+        record_change(self.session, "user_roles", "insert", user_id=data.user_id, role_id=data.role_id)
         self.session.commit()
-        return {"user_id": data.user_id, "role_id": data.role_id, "assigned_at": assigned_at}
+        return created
 
     def get_all(self, **filters) -> List[dict]:
-        query = select(user_roles_table)
+        query = select_columns(user_roles_table, filters.get("fields"))
         if user_id := filters.get("user_id"):
             query = query.where(user_roles_table.c.user_id == user_id)
         if role_id := filters.get("role_id"):
             query = query.where(user_roles_table.c.role_id == role_id)
+        key = (user_roles_table.c.user_id, user_roles_table.c.role_id)
+        if after := filters.get("after"):
+            query = query.where(tuple_(*key) > tuple_(*after))
+        query = query.order_by(*key)
+        if limit := filters.get("limit"):
+            query = query.limit(limit)
         result = self.session.execute(query)
         return [dict(row._mapping) for row in result.fetchall()]
 
+    def stream(self, batch_size: int = 1000) -> Iterator[List[dict]]:
+        query = (
+            select(user_roles_table)
+            .order_by(user_roles_table.c.user_id, user_roles_table.c.role_id)
+            .execution_options(yield_per=batch_size)
+        )
+        for partition in self.session.execute(query).partitions():
+            yield [dict(row._mapping) for row in partition]
+
     def update(self, identifier: tuple, data: UserRoleUpdate) -> Optional[dict]:
         user_id, role_id = identifier
-        query = select(user_roles_table).where(
-            and_(user_roles_table.c.user_id == user_id, user_roles_table.c.role_id == role_id)
-        )
-        current = self.session.execute(query).first()
-        if not current:
-            return None
-        assigned_at = current._mapping.get("assigned_at")
         new_user_id = data.user_id or user_id
         new_role_id = data.role_id or role_id
-        self.session.execute(
+        updated = self.session.execute(
             user_roles_table.update()
             .where(and_(user_roles_table.c.user_id == user_id, user_roles_table.c.role_id == role_id))
             .values(user_id=new_user_id, role_id=new_role_id)
-        )
+            .returning(user_roles_table)
+        ).first()
+        if not updated:
+            return None
+        self.effective_permissions.refresh_user_roles(user_id, [role_id])
+        self.effective_permissions.refresh_user_roles(new_user_id, [new_role_id])
+        record_change(self.session, "user_roles", "delete", user_id=user_id, role_id=role_id)
+        record_change(self.session, "user_roles", "insert", user_id=new_user_id, role_id=new_role_id)
         self.session.commit()
-        return {"user_id": new_user_id, "role_id": new_role_id, "assigned_at": assigned_at}
+        return dict(updated._mapping)
 
     def delete(self, identifier: tuple) -> bool:
         user_id, role_id = identifier
@@ -57,13 +84,73 @@ class SQLAlchemyUserRoleRepository(UserRoleRepository):
                 and_(user_roles_table.c.user_id == user_id, user_roles_table.c.role_id == role_id)
             )
         )
+        if result.rowcount:
+            self.effective_permissions.refresh_user_roles(user_id, [role_id])
+            record_change(self.session, "user_roles", "delete", user_id=user_id, role_id=role_id)
         self.session.commit()
         return result.rowcount > 0
 
-    def list_roles_for_user(self, user_id: int) -> List[Role]:
-        user = self.session.get(User, user_id)
-        return user.roles if user else []
+    def replace_for_user(self, user_id: int, role_ids: List[int]) -> Optional[LinkSetDiff]:
+        # Concurrent replacements of one set would both insert the same missing links.
+        if get_for_update(self.session, User, user_id) is None:
+            return None
+        desired = set(role_ids)
+        unknown = desired - find_existing(self.session, Role.id, desired)
+        if unknown:
+            return LinkSetDiff(unknown=sorted(unknown))
+        current = set(
+            self.session.scalars(
+                select(user_roles_table.c.role_id).where(user_roles_table.c.user_id == user_id)
+            )
+        )
+        added, removed = sorted(desired - current), sorted(current - desired)
+        if removed:
+            self.session.execute(
+                delete(user_roles_table).where(
+                    user_roles_table.c.user_id == user_id, user_roles_table.c.role_id.in_(removed)
+                )
+            )
+        if added:
+            assigned_at = datetime.utcnow()
+            self.session.execute(
+                insert(user_roles_table),
+                [{"user_id": user_id, "role_id": role_id, "assigned_at": assigned_at} for role_id in added],
+            )
+        if added or removed:
+            self.effective_permissions.refresh_user_roles(user_id, added + removed)
+        for role_id in removed:
+            record_change(self.session, "user_roles", "delete", user_id=user_id, role_id=role_id)
+        for role_id in added:
+            record_change(self.session, "user_roles", "insert", user_id=user_id, role_id=role_id)
+        self.session.commit()
+        return LinkSetDiff(added=added, removed=removed)
 
-    def list_users_for_role(self, role_id: int) -> List[User]:
-        role = self.session.get(Role, role_id)
-        return role.users if role else []
+    def list_roles_for_user(
+        self, user_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[Role]]:
+        return related_page(
+            self.session,
+            Role,
+            user_roles_table,
+            user_roles_table.c.role_id,
+            user_roles_table.c.user_id,
+            User,
+            user_id,
+            limit,
+            after,
+        )
+
+    def list_users_for_role(
+        self, role_id: int, limit: Optional[int] = None, after: Optional[tuple] = None
+    ) -> Optional[List[User]]:
+        return related_page(
+            self.session,
+            User,
+            user_roles_table,
+            user_roles_table.c.user_id,
+            user_roles_table.c.role_id,
+            Role,
+            role_id,
+            limit,
+            after,
+        )
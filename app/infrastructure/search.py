@@ -0,0 +1,58 @@
+from typing import List
+
+from sqlalchemy import and_, column, literal_column, select, table, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.domain.models import SEARCHABLE_COLUMNS, search_table_ddl, search_table_name
+from app.domain.schemas import SearchMode
+
+LIKE_ESCAPE = "\\"
+TRIGRAM_LENGTH = 3
+
+
+def escape_like(value: str) -> str:
+    for special in (LIKE_ESCAPE, "%", "_"):
+        value = value.replace(special, LIKE_ESCAPE + special)
+    return value
+
+
+def like_pattern(value: str, mode: SearchMode) -> str:
+    escaped = escape_like(value)
+    return f"{escaped}%" if mode == SearchMode.prefix else f"%{escaped}%"
+
+
+def text_filter(session: Session, model, field: str, value: str, mode: SearchMode) -> ColumnElement:
+    target = getattr(model, field)
+    if mode == SearchMode.exact:
+        return target == value
+    pattern = target.ilike(like_pattern(value, mode), escape=LIKE_ESCAPE)
+    table_name = model.__tablename__
+    if (
+        session.get_bind().dialect.name == "sqlite"
+        and field in SEARCHABLE_COLUMNS.get(table_name, ())
+        and len(value) >= TRIGRAM_LENGTH
+    ):
+        # A trigram phrase MATCH is a case-insensitive substring lookup answered from the
+        # FTS5 index (LIKE ... ESCAPE would bypass it); prefix mode re-checks the anchor.
+        fts = table(search_table_name(table_name), column("rowid"))
+        phrase = f'{field} : "' + value.replace('"', '""') + '"'
+        candidates = select(fts.c.rowid).where(literal_column(fts.name).op("MATCH")(phrase))
+        indexed = model.id.in_(candidates)
+        return indexed if mode == SearchMode.substring else and_(indexed, pattern)
+    # On PostgreSQL the pg_trgm GIN index serves both prefix and substring ILIKE.
+    return pattern
+
+
+def rebuild_search_tables(session: Session) -> List[str]:
+    if session.get_bind().dialect.name != "sqlite":
+        return []
+    rebuilt = []
+    for table_name, columns in SEARCHABLE_COLUMNS.items():
+        for statement in search_table_ddl(table_name, columns):
+            session.execute(text(statement))
+        fts = search_table_name(table_name)
+        session.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        rebuilt.append(fts)
+    session.commit()
+    return rebuilt
@@ -0,0 +1,193 @@
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+MAGIC = b"RBACSNAP"
+FORMAT_VERSION = 1
+MEDIA_TYPE = "application/vnd.rbac-snapshot"
+
+# Column kinds. Integers are packed int32 arrays; text is an int32 length array (-1 for
+# NULL) plus one UTF-8 blob; timestamps are dictionary-encoded, because link rows written
+# in bulk share a handful of distinct values.
+INT = 1
+TEXT = 2
+BOOL = 3
+TIME = 4
+
+_EPOCH = datetime(1970, 1, 1)
+_NULL_TIME = -(2**63)
+_NULL_BOOL = -1
+_HEADER = struct.Struct("<8sHH")
+_U16 = struct.Struct("<H")
+_U64 = struct.Struct("<Q")
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+class SnapshotColumn(NamedTuple):
+    name: str
+    kind: int
+    values: Sequence
+
+
+class SnapshotTable(NamedTuple):
+    name: str
+    rows: int
+    columns: List[SnapshotColumn]
+
+
+def encode_snapshot(tables: List[SnapshotTable]) -> bytes:
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(tables))]
+    for table in tables:
+        parts += [_text(table.name), _U64.pack(table.rows), _U16.pack(len(table.columns))]
+        for column in table.columns:
+            parts += [_text(column.name), bytes([column.kind])]
+            parts += [_U64.pack(len(block)) + block for block in _ENCODERS[column.kind](column.values)]
+    return b"".join(parts)
+
+
+def decode_snapshot(data: bytes) -> List[SnapshotTable]:
+    reader = _Reader(memoryview(data))
+    magic, version, table_count = reader.unpack(_HEADER)
+    if magic != MAGIC:
+        raise SnapshotFormatError("Not an RBAC snapshot")
+    if version != FORMAT_VERSION:
+        raise SnapshotFormatError(f"Unsupported snapshot version {version}")
+    tables = []
+    for _ in range(table_count):
+        name = reader.text()
+        (rows,) = reader.unpack(_U64)
+        (column_count,) = reader.unpack(_U16)
+        columns = []
+        for _ in range(column_count):
+            column_name = reader.text()
+            kind = reader.take(1)[0]
+            if kind not in _DECODERS:
+                raise SnapshotFormatError(f"Unknown column kind {kind} in {name}.{column_name}")
+            values = _DECODERS[kind](reader, rows)
+            if len(values) != rows:
+                raise SnapshotFormatError(f"Column {name}.{column_name} has {len(values)} of {rows} rows")
+            columns.append(SnapshotColumn(column_name, kind, values))
+        tables.append(SnapshotTable(name, rows, columns))
+    if reader.offset != len(data):
+        raise SnapshotFormatError("Trailing bytes after the last table")
+    return tables
+
+
+class _Reader:
+    def __init__(self, view: memoryview) -> None:
+        self.view = view
+        self.offset = 0
+
+    def take(self, size: int) -> memoryview:
+        end = self.offset + size
+        if end > len(self.view):
+            raise SnapshotFormatError("Snapshot is truncated")
+        chunk = self.view[self.offset : end]
+        self.offset = end
+        return chunk
+
+    def unpack(self, layout: struct.Struct) -> tuple:
+        return layout.unpack(self.take(layout.size))
+
+    def text(self) -> str:
+        (size,) = self.unpack(_U16)
+        return bytes(self.take(size)).decode()
+
+    def block(self) -> memoryview:
+        (size,) = self.unpack(_U64)
+        return self.take(size)
+
+
+def _text(value: str) -> bytes:
+    encoded = value.encode()
+    return _U16.pack(len(encoded)) + encoded
+
+
+def _pack(typecode: str, values) -> bytes:
+    packed = values if isinstance(values, array) and values.typecode == typecode else array(typecode, values)
+    if sys.byteorder == "big":
+        packed = array(typecode, packed)
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(typecode: str, block: memoryview) -> array:
+    values = array(typecode)
+    if len(block) % values.itemsize:
+        raise SnapshotFormatError("Misaligned column block")
+    values.frombytes(block)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _encode_ints(values) -> Tuple[bytes, ...]:
+    return (_pack("i", values),)
+
+
+def _decode_ints(reader: _Reader, rows: int) -> array:
+    return _unpack("i", reader.block())
+
+
+def _encode_text(values) -> Tuple[bytes, ...]:
+    encoded = [None if value is None else value.encode() for value in values]
+    lengths = _pack("i", (-1 if value is None else len(value) for value in encoded))
+    return lengths, b"".join(value for value in encoded if value is not None)
+
+
+def _decode_text(reader: _Reader, rows: int) -> List[Optional[str]]:
+    lengths = _unpack("i", reader.block())
+    blob = bytes(reader.block())
+    values: List[Optional[str]] = []
+    offset = 0
+    for length in lengths:
+        if length < 0:
+            values.append(None)
+        else:
+            values.append(blob[offset : offset + length].decode())
+            offset += length
+    if offset != len(blob):
+        raise SnapshotFormatError("Text lengths do not match the string table")
+    return values
+
+
+def _encode_bools(values) -> Tuple[bytes, ...]:
+    return (_pack("b", (_NULL_BOOL if value is None else int(value) for value in values)),)
+
+
+def _decode_bools(reader: _Reader, rows: int) -> List[Optional[bool]]:
+    return [None if value == _NULL_BOOL else bool(value) for value in _unpack("b", reader.block())]
+
+
+def _encode_times(values) -> Tuple[bytes, ...]:
+    codes: Dict[Optional[datetime], int] = {}
+    indices = _pack("i", (codes.setdefault(value, len(codes)) for value in values))
+    return _pack("q", (_micros(value) for value in codes)), indices
+
+
+def _decode_times(reader: _Reader, rows: int) -> List[Optional[datetime]]:
+    dictionary = [
+        None if value == _NULL_TIME else _EPOCH + timedelta(microseconds=value)
+        for value in _unpack("q", reader.block())
+    ]
+    codes = _unpack("i", reader.block())
+    if codes and (min(codes) < 0 or max(codes) >= len(dictionary)):
+        raise SnapshotFormatError("Timestamp code outside the dictionary")
+    return [dictionary[code] for code in codes]
+
+
+def _micros(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NULL_TIME
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+_ENCODERS = {INT: _encode_ints, TEXT: _encode_text, BOOL: _encode_bools, TIME: _encode_times}
+_DECODERS = {INT: _decode_ints, TEXT: _decode_text, BOOL: _decode_bools, TIME: _decode_times}
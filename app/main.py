@@ -1,13 +1,38 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from app.api.routes import permissions, role_permissions, roles, user_roles, users
+from app.api.deps import start_change_bus, stop_change_bus
+from app.api.middleware import MetricsMiddleware, QueryStatsMiddleware
+from app.api.routes import (
+    authz,
+    export,
+    internal,
+    metrics,
+    permissions,
+    role_permissions,
+    roles,
+    snapshot,
+    user_roles,
+    users,
+)
 from app.core.config import get_settings
 from app.core.database import engine
 from app.domain.models import Base
 
 settings = get_settings()
 
-app = FastAPI(title=settings.app_name, debug=settings.debug)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_change_bus()
+    yield
+    stop_change_bus()
+
+
+app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
+app.add_middleware(QueryStatsMiddleware, n_plus_one_threshold=settings.n_plus_one_threshold)
+app.add_middleware(MetricsMiddleware)
 
 Base.metadata.create_all(bind=engine)
 
@@ -16,6 +41,11 @@ app.include_router(permissions.router)
 app.include_router(users.router)
 app.include_router(role_permissions.router)
 app.include_router(user_roles.router)
+app.include_router(authz.router)
+app.include_router(export.router)
+app.include_router(snapshot.router)
+app.include_router(internal.router)
+app.include_router(metrics.router)
 
 
 @app.get("/health", tags=["health"])  # simple health endpoint
@@ -0,0 +1,150 @@
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.application.services.permission_index import PermissionIndex
+from app.core.changes import subscribe, unsubscribe
+from app.domain.repositories import PermissionGraph
+from app.infrastructure.change_log import ChangeLogPoller, current_sequence
+from app.infrastructure.repositories.authorization_repository import SQLAlchemyAuthorizationRepository
+from app.infrastructure.snapshot import SnapshotFormatError, decode_snapshot
+
+
+class PolicyEngine:
+    """Embeddable permission checks for services that cannot afford an HTTP hop.
+
+    Answers from the same ``PermissionIndex`` the API uses, built from the database or
+    from a binary snapshot file. A database-backed engine follows ``rbac_changes`` (the
+    change log every API write goes through) with a ``ChangeLogPoller``, so links changed
+    by any worker reach it within one poll interval. Needs only SQLAlchemy, not FastAPI.
+    The first check starts the poller if ``start`` was not called, and checks on a closed
+    engine raise, so a database-backed engine never serves grants it has stopped following.
+
+        with PolicyEngine.from_database("postgresql+psycopg://...") as engine:
+            engine.check(user_id, "billing:invoice:read")
+    """
+
+    def __init__(
+        self, loader: Callable[[], PermissionGraph], poller: Optional[ChangeLogPoller] = None
+    ) -> None:
+        self._loader = loader
+        self._index = PermissionIndex()
+        self._poller = poller
+        # Set when the engine created the connection pool and so must dispose of it.
+        self._engine: Optional[Engine] = None
+        self._start_lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        if poller is not None:
+            poller.dispatch = self._index.apply
+
+    @classmethod
+    def from_database(
+        cls, database_url: str, poll_interval: Optional[float] = 1.0, **engine_options
+    ) -> "PolicyEngine":
+        engine = create_engine(database_url, **engine_options)
+        policy = cls.from_session_factory(sessionmaker(bind=engine), poll_interval)
+        policy._engine = engine
+        return policy
+
+    @classmethod
+    def from_session_factory(
+        cls, session_factory: Callable[[], Session], poll_interval: Optional[float] = 1.0
+    ) -> "PolicyEngine":
+        def load_graph() -> PermissionGraph:
+            with session_factory() as session:
+                return SQLAlchemyAuthorizationRepository(session).load_graph()
+
+        poller = None
+        if poll_interval is not None:
+            # Pruning rbac_changes is left to the API workers that own the retention setting.
+            poller = ChangeLogPoller(session_factory, interval=poll_interval, retention=float("inf"))
+        return cls(load_graph, poller)
+
+    @classmethod
+    def from_snapshot(cls, path: str) -> "PolicyEngine":
+        with open(path, "rb") as handle:
+            graph = graph_from_snapshot(handle.read())
+        return cls(lambda: graph)
+
+    def start(self) -> "PolicyEngine":
+        with self._start_lock:
+            if self._closed:
+                raise RuntimeError("PolicyEngine is closed")
+            if self._started:
+                return self
+            if self._poller is not None:
+                # Taken before the graph is read; changes in between are replayed idempotently.
+                with self._poller.session_factory() as session:
+                    self._poller.last_seq = current_sequence(session)
+                    database = session.get_bind().engine.url
+                # Writes committed by this process are skipped by the poller and arrive here;
+                # the filter keeps out commits of sessions bound to other databases.
+                subscribe(self._index.apply, database)
+            self._index.refresh(self._loader)
+            if self._poller is not None:
+                self._poller.start()
+            self._started = True
+        return self
+
+    def close(self) -> None:
+        with self._start_lock:
+            self._closed = True
+        if self._poller is not None:
+            self._poller.stop()
+            unsubscribe(self._index.apply)
+        if self._engine is not None:
+            self._engine.dispose()
+
+    def __enter__(self) -> "PolicyEngine":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def poll(self) -> int:
+        """Applies pending changes now instead of waiting for the background poller."""
+        return 0 if self._poller is None else self._poller.poll_once()
+
+    def check(self, user_id: int, permission: str) -> bool:
+        return self._ensure_loaded().has_permission(user_id, permission)
+
+    def check_many(self, pairs: Iterable[Tuple[int, str]]) -> List[bool]:
+        return self._ensure_loaded().check_many(pairs)
+
+    def permissions_for(self, user_id: int) -> List[str]:
+        return self._ensure_loaded().permissions_for(user_id)
+
+    def users_with_permission(self, permission: str, user_ids: Optional[Iterable[int]] = None) -> List[int]:
+        return self._ensure_loaded().users_with_permission(permission, user_ids)
+
+    def _ensure_loaded(self) -> PermissionIndex:
+        if not self._started or self._closed:
+            self.start()
+        # Also covers a ``reload`` change (snapshot restore), which empties the index.
+        if not self._index.loaded:
+            self._index.refresh(self._loader)
+        return self._index
+
+
+def graph_from_snapshot(data: bytes) -> PermissionGraph:
+    tables = {
+        table.name: {column.name: column.values for column in table.columns}
+        for table in decode_snapshot(data)
+    }
+
+    def pairs(table: str, first: str, second: str) -> List[Tuple]:
+        columns = tables.get(table, {})
+        if first not in columns or second not in columns:
+            raise SnapshotFormatError(f"Snapshot lacks {table}.{first} or {table}.{second}")
+        return list(zip(columns[first], columns[second]))
+
+    return PermissionGraph(
+        user_roles=pairs("user_roles", "user_id", "role_id"),
+        role_permissions=pairs("role_permissions", "role_id", "permission_id"),
+        permissions=pairs("permissions", "id", "name"),
+        role_parents=pairs("role_parents", "role_id", "parent_id"),
+    )
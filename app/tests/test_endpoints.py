@@ -1,16 +1,73 @@
+import asyncio
+import json
 import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, insert, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 SQLALCHEMY_DATABASE_URL = "sqlite+pysqlite:///:memory:"
 os.environ.setdefault("DATABASE_URL", SQLALCHEMY_DATABASE_URL)
 
-from app.core.database import get_db
-from app.domain.models import Base
+from app import PolicyEngine
+from app.api.deps import (
+    build_role_service,
+    build_user_role_service,
+    list_cache,
+    permission_index,
+    table_versions,
+)
+from app.application.services.async_service import AsyncServiceAdapter
+from app.application.services.authorization_service import AuthorizationService
+from app.application.services.shared_permission_index import SharedPermissionIndex
+from app.core.changes import Change, record_change
+from app.core.config import Settings
+from app.core.metrics import service_call_duration_seconds, timed_service
+from app.core.database import engine_options, get_db, get_session_factory
+from app.core.pool import pool_status
+from app.core.query_stats import QueryCounter, track_queries
+from app.core.versions import TableVersions
+from app.domain.models import (
+    Base,
+    Permission,
+    Role,
+    User,
+    change_log_table,
+    role_parents_table,
+    role_permissions_table,
+    user_effective_permissions_table,
+    user_roles_table,
+)
+from app.domain.schemas import (
+    PermissionCheckBatch,
+    PermissionHoldersQuery,
+    RoleCreate,
+    UserRead,
+    UserRoleSet,
+)
+from app.infrastructure.repositories import bulk
+from app.infrastructure.repositories.authorization_repository import SQLAlchemyAuthorizationRepository
+from app.infrastructure.repositories.effective_permission_repository import (
+    SQLAlchemyEffectivePermissionRepository,
+)
+from app.infrastructure.repositories.role_permission_repository import SQLAlchemyRolePermissionRepository
+from app.infrastructure.repositories.role_repository import SQLAlchemyRoleRepository
+from app.infrastructure.repositories.snapshot_repository import SQLAlchemySnapshotRepository
+from app.infrastructure.cache import CacheEntry, MemoryCacheBackend
+from app.infrastructure.change_log import ChangeLogPoller, current_sequence, retained_changes
+from app.infrastructure.index_file import index_directory
+from app.infrastructure.snapshot import decode_snapshot
 from app.main import app
 
 engine = create_engine(
@@ -37,8 +94,11 @@ def setup_database():
     global overrides_set
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    permission_index.invalidate()
+    list_cache.clear()
     if not overrides_set:
         app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
         overrides_set = True
     yield
     Base.metadata.drop_all(bind=engine)
@@ -49,6 +109,19 @@ def client():
     return TestClient(app)
 
 
+@pytest.fixture()
+def assert_max_queries():
+    @contextmanager
+    def check(limit: int):
+        with QueryCounter(engine) as counter:
+            yield counter
+        assert counter.count <= limit, f"{counter.count} queries (limit {limit}):\n" + "\n".join(
+            counter.statements
+        )
+
+    return check
+
+
 def test_role_crud_flow(client: TestClient):
     create_resp = client.post("/roles/", json={"name": "admin", "description": "Administrator"})
     assert create_resp.status_code == 201
@@ -157,3 +230,1113 @@ def test_user_role_links(client: TestClient):
 
     delete_resp = client.delete(f"/user-roles/{user_id}/{new_role_id}")
     assert delete_resp.status_code == 204
+
+
+def test_effective_permissions(client: TestClient):
+    role_id = client.post("/roles/", json={"name": "publisher", "description": ""}).json()["id"]
+    other_role_id = client.post("/roles/", json={"name": "reader", "description": ""}).json()["id"]
+    write_id = client.post("/permissions/", json={"name": "write", "description": ""}).json()["id"]
+    read_id = client.post("/permissions/", json={"name": "read", "description": ""}).json()["id"]
+    user_id = client.post(
+        "/users/",
+        json={"username": "author", "email": "author@example.com", "password_hash": "secretpass"},
+    ).json()["id"]
+
+    assert client.get(f"/users/{user_id}/can/write").json()["allowed"] is False
+
+    client.post("/role-permissions/", json={"role_id": role_id, "permission_id": write_id})
+    client.post("/role-permissions/", json={"role_id": other_role_id, "permission_id": read_id})
+    client.post("/user-roles/", json={"user_id": user_id, "role_id": role_id})
+    client.post("/user-roles/", json={"user_id": user_id, "role_id": other_role_id})
+
+    check_resp = client.get(f"/users/{user_id}/can/write")
+    assert check_resp.status_code == 200
+    assert check_resp.json() == {"user_id": user_id, "permission": "write", "allowed": True}
+    assert client.get(f"/users/{user_id}/permissions").json()["permissions"] == ["read", "write"]
+
+    client.put(f"/permissions/{write_id}", json={"name": "author"})
+    assert client.get(f"/users/{user_id}/can/write").json()["allowed"] is False
+    assert client.get(f"/users/{user_id}/can/author").json()["allowed"] is True
+
+    client.delete(f"/user-roles/{user_id}/{role_id}")
+    assert client.get(f"/users/{user_id}/can/author").json()["allowed"] is False
+
+    client.delete(f"/roles/{other_role_id}")
+    assert client.get(f"/users/{user_id}/permissions").json()["permissions"] == []
+
+
+def test_effective_permissions_table_tracks_link_writes(client: TestClient):
+    admin_id = client.post("/roles/", json={"name": "admin", "description": ""}).json()["id"]
+    editor_id = client.post("/roles/", json={"name": "editor", "description": ""}).json()["id"]
+    edit_id = client.post("/permissions/", json={"name": "edit", "description": ""}).json()["id"]
+    purge_id = client.post("/permissions/", json={"name": "purge", "description": ""}).json()["id"]
+    user_id = client.post(
+        "/users/",
+        json={"username": "owner", "email": "owner@example.com", "password_hash": "secretpass"},
+    ).json()["id"]
+    for role_id in (admin_id, editor_id):
+        client.post("/role-permissions/", json={"role_id": role_id, "permission_id": edit_id})
+        client.post("/user-roles/", json={"user_id": user_id, "role_id": role_id})
+    client.post("/role-permissions/", json={"role_id": admin_id, "permission_id": purge_id})
+
+    with TestingSessionLocal() as session:
+        rows = session.execute(user_effective_permissions_table.select()).all()
+        counts = sorted((row.permission_id, row.via_role_count) for row in rows)
+        assert counts == [(edit_id, 2), (purge_id, 1)]
+        service = AuthorizationService(SQLAlchemyAuthorizationRepository(session))
+        assert service.check_permission(user_id, "purge").allowed is True
+        assert service.list_user_permissions(user_id).permissions == ["edit", "purge"]
+
+    client.delete(f"/roles/{admin_id}")
+    client.put(f"/user-roles/{user_id}/{editor_id}", json={"role_id": editor_id})
+
+    with TestingSessionLocal() as session:
+        service = AuthorizationService(SQLAlchemyAuthorizationRepository(session))
+        assert service.check_permission(user_id, "purge").allowed is False
+        assert service.check_permission(user_id, "edit").allowed is True
+        repository = SQLAlchemyEffectivePermissionRepository(session)
+        assert repository.find_drift() == []
+
+        session.execute(user_effective_permissions_table.delete())
+        session.commit()
+        assert [drift.permission_id for drift in repository.find_drift()] == [edit_id]
+        assert repository.rebuild() == 1
+        assert repository.find_drift() == []
+
+
+def test_permission_holders(client: TestClient):
+    role_id = client.post("/roles/", json={"name": "billing", "description": ""}).json()["id"]
+    perm_id = client.post("/permissions/", json={"name": "refund", "description": ""}).json()["id"]
+    user_ids = [
+        client.post(
+            "/users/",
+            json={"username": f"clerk{i}", "email": f"clerk{i}@example.com", "password_hash": "secretpass"},
+        ).json()["id"]
+        for i in range(3)
+    ]
+    client.post("/role-permissions/", json={"role_id": role_id, "permission_id": perm_id})
+    for user_id in user_ids[:2]:
+        client.post("/user-roles/", json={"user_id": user_id, "role_id": role_id})
+
+    resp = client.post("/authz/holders", json={"permission": "refund", "user_ids": list(reversed(user_ids))})
+    assert resp.status_code == 200
+    assert resp.json() == {"permission": "refund", "user_ids": [user_ids[1], user_ids[0]]}
+
+    assert client.post("/authz/holders", json={"permission": "refund"}).json()["user_ids"] == user_ids[:2]
+
+    client.delete(f"/role-permissions/{role_id}/{perm_id}")
+    assert client.post("/authz/holders", json={"permission": "refund"}).json()["user_ids"] == []
+
+    with TestingSessionLocal() as session:
+        repository = SQLAlchemyAuthorizationRepository(session)
+        assert repository.list_permission_holders("refund", user_ids) == []
+
+
+def test_keyset_pagination(client: TestClient):
+    role_ids = [
+        client.post("/roles/", json={"name": f"team{i}", "description": ""}).json()["id"] for i in range(5)
+    ]
+    user_id = client.post(
+        "/users/",
+        json={"username": "member", "email": "member@example.com", "password_hash": "secretpass"},
+    ).json()["id"]
+    for role_id in role_ids:
+        client.post("/user-roles/", json={"user_id": user_id, "role_id": role_id})
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        resp = client.get("/roles/", params=params)
+        assert resp.status_code == 200
+        assert len(resp.json()) <= 2
+        seen.extend(role["id"] for role in resp.json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == role_ids
+
+    first = client.get("/user-roles/", params={"limit": 3})
+    assert [link["role_id"] for link in first.json()] == role_ids[:3]
+    rest = client.get("/user-roles/", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    assert [link["role_id"] for link in rest.json()] == role_ids[3:]
+    assert "X-Next-Cursor" not in rest.headers
+
+    assert client.get("/user-roles/", params={"cursor": "bm90LWEta2V5"}).status_code == 400
+    assert client.get("/roles/", params={"limit": 0}).status_code == 422
+
+
+def test_ndjson_export(client: TestClient):
+    role_id = client.post("/roles/", json={"name": "exporter", "description": ""}).json()["id"]
+    user_ids = []
+    for i in range(5):
+        user_ids.append(
+            client.post(
+                "/users/",
+                json={"username": f"sync{i}", "email": f"sync{i}@example.com", "password_hash": "secretpass"},
+            ).json()["id"]
+        )
+        client.post("/user-roles/", json={"user_id": user_ids[-1], "role_id": role_id})
+
+    resp = client.get("/export/users", params={"batch_size": 2})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    users = [json.loads(line) for line in resp.text.splitlines()]
+    assert [user["id"] for user in users] == user_ids
+    assert all("password_hash" not in user for user in users)
+
+    links = [json.loads(line) for line in client.get("/export/user-roles").text.splitlines()]
+    assert [(link["user_id"], link["role_id"]) for link in links] == [(user_id, role_id) for user_id in user_ids]
+
+
+def test_bulk_create_reports_conflicts(client: TestClient, monkeypatch):
+    client.post("/roles/", json={"name": "existing", "description": ""})
+    resp = client.post(
+        "/roles/bulk",
+        json=[{"name": "alpha"}, {"name": "existing"}, {"name": "beta"}, {"name": "alpha"}],
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [role["name"] for role in body["created"]] == ["alpha", "beta"]
+    assert [error["index"] for error in body["errors"]] == [1, 3]
+    assert len(client.get("/roles/").json()) == 3
+
+    users = [
+        {"username": f"bulk{i}", "email": f"bulk{i}@example.com", "password_hash": "secretpass"}
+        for i in range(50)
+    ]
+    users.append({"username": "bulk0", "email": "other@example.com", "password_hash": "secretpass"})
+    users.append({"username": "fresh", "email": "bulk1@example.com", "password_hash": "secretpass"})
+    body = client.post("/users/bulk", json=users).json()
+    assert len(body["created"]) == 50
+    assert [error["index"] for error in body["errors"]] == [50, 51]
+    assert body["created"][0]["created_at"] is not None
+
+    permissions = client.post("/permissions/bulk", json=[{"name": "p1"}, {"name": "p2"}]).json()
+    assert [permission["name"] for permission in permissions["created"]] == ["p1", "p2"]
+    assert client.post("/permissions/bulk", json=[]).status_code == 422
+
+    # A row taken by a concurrent write after the lookup fails alone; the rest are created.
+    with monkeypatch.context() as patch:
+        patch.setattr(bulk, "find_existing", lambda session, column, values: set())
+        roles = [{"name": "gamma"}, {"name": "existing"}, {"name": "delta"}]
+        body = client.post("/roles/bulk", json=roles).json()
+    assert [role["name"] for role in body["created"]] == ["gamma", "delta"]
+    assert body["errors"] == [{"index": 1, "detail": "Conflicts with a concurrent write"}]
+
+    # A collision that escapes the per-row retry rolls the batch back with 409, not 500.
+    def colliding_insert(session, model, rows, unique_fields):
+        session.execute(insert(model).values(**rows[0]))
+        return [], []
+
+    with monkeypatch.context() as patch:
+        patch.setattr("app.infrastructure.repositories.role_repository.insert_many", colliding_insert)
+        resp = client.post("/roles/bulk", json=[{"name": "existing"}])
+    assert resp.status_code == 409
+    assert resp.json()["detail"].startswith("Conflicts with a concurrent write")
+    assert len(client.get("/roles/").json()) == 5
+
+
+def test_set_replace_links(client: TestClient):
+    role_id = client.post("/roles/", json={"name": "synced", "description": ""}).json()["id"]
+    perm_ids = [
+        client.post("/permissions/", json={"name": f"idp{i}", "description": ""}).json()["id"]
+        for i in range(4)
+    ]
+    user_id = client.post(
+        "/users/",
+        json={"username": "idp", "email": "idp@example.com", "password_hash": "secretpass"},
+    ).json()["id"]
+    client.post("/role-permissions/", json={"role_id": role_id, "permission_id": perm_ids[0]})
+
+    resp = client.put(f"/users/{user_id}/roles", json={"role_ids": [role_id]})
+    assert resp.status_code == 200
+    assert resp.json() == {"added": [role_id], "removed": [], "unknown": []}
+
+    resp = client.put(f"/roles/{role_id}/permissions", json={"permission_ids": perm_ids[1:]})
+    assert resp.json() == {"added": perm_ids[1:], "removed": [perm_ids[0]], "unknown": []}
+    links = client.get("/role-permissions/", params={"role_id": role_id}).json()
+    assert sorted(link["permission_id"] for link in links) == perm_ids[1:]
+    assert client.get(f"/users/{user_id}/permissions").json()["permissions"] == ["idp1", "idp2", "idp3"]
+
+    resp = client.put(f"/roles/{role_id}/permissions", json={"permission_ids": perm_ids[1:]})
+    assert resp.json() == {"added": [], "removed": [], "unknown": []}
+
+    assert client.put(f"/roles/{role_id}/permissions", json={"permission_ids": [999]}).status_code == 422
+    assert client.put("/roles/999/permissions", json={"permission_ids": []}).status_code == 404
+
+    assert client.put(f"/users/{user_id}/roles", json={"role_ids": []}).json()["removed"] == [role_id]
+    with TestingSessionLocal() as session:
+        assert SQLAlchemyEffectivePermissionRepository(session).find_drift() == []
+        rows = session.execute(user_effective_permissions_table.select()).all()
+        assert rows == []
+
+
+ASYNC_CONCURRENCY_PROBE = """
+import asyncio
+
+import httpx
+
+from app.core.database import engine
+from app.domain.models import Base
+from app.main import app
+
+Base.metadata.create_all(engine)
+
+
+async def main() -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        role_id = (await client.post("/roles/", json={"name": "reader"})).json()["id"]
+        permission_id = (await client.post("/permissions/", json={"name": "docs:read"})).json()["id"]
+        await client.put(f"/roles/{role_id}/permissions", json={"permission_ids": [permission_id]})
+        user = {"username": "async", "email": "async@example.com", "password_hash": "secretpass"}
+        user_id = (await client.post("/users/", json=user)).json()["id"]
+        await client.put(f"/users/{user_id}/roles", json={"role_ids": [role_id]})
+        checks = [client.get(f"/users/{user_id}/can/docs:read") for _ in range(20)]
+        responses = await asyncio.wait_for(asyncio.gather(*checks), timeout=30)
+        assert [response.json()["allowed"] for response in responses] == [True] * 20
+
+
+asyncio.run(main())"""
+
+
+def test_async_database_concurrent_permission_checks(tmp_path):
+    # ASYNC_DATABASE is read at import time, so the app runs in a fresh interpreter; a
+    # deadlock on the index refresh shows up as the subprocess timing out.
+    env = {
+        **os.environ,
+        "ASYNC_DATABASE": "true",
+        "DEBUG": "false",
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'async.db'}",
+    }
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, "-c", ASYNC_CONCURRENCY_PROBE],
+        cwd=root,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_async_service_adapter(tmp_path):
+    async def scenario():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+        async with async_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+        async with session_factory() as session:
+            roles = AsyncServiceAdapter(session, build_role_service)
+            created = await roles.create_role(RoleCreate(name="async-admin"))
+            listed = await roles.list_roles(name="async")
+            links = AsyncServiceAdapter(session, build_user_role_service)
+            missing_user = await links.replace_user_roles(1, UserRoleSet(role_ids=[created.id]))
+        await async_engine.dispose()
+        return created, listed, missing_user
+
+    created, listed, missing_user = asyncio.run(scenario())
+    assert created.name == "async-admin"
+    assert [role.id for role in listed] == [created.id]
+    assert missing_user is None
+
+
+def test_search_modes(client: TestClient):
+    for username in ("alice", "malice", "alicia", "bob_smith", "bobXsmith"):
+        client.post(
+            "/users/",
+            json={"username": username, "email": f"{username}@example.com", "password_hash": "secretpass"},
+        )
+
+    def usernames(**params):
+        return sorted(user["username"] for user in client.get("/users/", params=params).json())
+
+    assert usernames(username="alice", match="exact") == ["alice"]
+    assert usernames(username="ALI", match="prefix") == ["alice", "alicia"]
+    assert usernames(username="lic") == ["alice", "alicia", "malice"]
+    assert usernames(username="b_s", match="substring") == ["bob_smith"]
+    assert usernames(email="malice@", match="prefix") == ["malice"]
+
+    malice_id = client.get("/users/", params={"username": "malice", "match": "exact"}).json()[0]["id"]
+    client.put(f"/users/{malice_id}", json={"username": "eve"})
+    assert usernames(username="lic") == ["alice", "alicia"]
+
+    client.post("/roles/", json={"name": "billing-admin"})
+    client.post("/permissions/", json={"name": "billing:invoice:read"})
+    assert [role["name"] for role in client.get("/roles/", params={"name": "admin"}).json()] == ["billing-admin"]
+    permissions = client.get("/permissions/", params={"name": "billing:", "match": "prefix"}).json()
+    assert [permission["name"] for permission in permissions] == ["billing:invoice:read"]
+    assert client.get("/roles/", params={"name": "x", "match": "fuzzy"}).status_code == 422
+
+
+def test_pool_metrics(client: TestClient, tmp_path):
+    pool_settings = Settings(pool_size=1, max_overflow=0, pool_timeout=0.05, debug=False)
+    database_url = f"sqlite:///{tmp_path / 'pool.db'}"
+    pool_engine = create_engine(database_url, **engine_options(database_url, pool_settings))
+    with pool_engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            pool_engine.connect()
+        status = pool_status(pool_engine.pool)
+        assert status["pool_class"] == "InstrumentedQueuePool"
+        assert (status["size"], status["checked_out"], status["overflow"]) == (1, 1, 0)
+    pool_engine.dispose()
+    with pool_engine.connect():
+        pass
+    metrics = pool_status(pool_engine.pool)["metrics"]
+    assert (metrics["checkouts"], metrics["checkins"], metrics["checkout_timeouts"]) == (2, 2, 1)
+    assert metrics["wait_seconds_bucket"]["+Inf"] == 2
+
+    response = client.get("/internal/pool")
+    assert response.status_code == 200
+    assert response.json()["sync"]["pool_class"] == "StaticPool"
+
+
+def test_query_budget_and_server_timing(client: TestClient, assert_max_queries):
+    role_id = client.post("/roles/", json={"name": "auditor"}).json()["id"]
+    permission_id = client.post("/permissions/", json={"name": "audit:read"}).json()["id"]
+    client.post("/role-permissions/", json={"role_id": role_id, "permission_id": permission_id})
+
+    with assert_max_queries(1) as counter:
+        response = client.get("/roles/")
+    assert response.status_code == 200
+    assert f'desc="{counter.count} queries"' in response.headers["server-timing"]
+
+    # A role without descendants adds one closure lookup and the edge and closure deletes.
+    with assert_max_queries(11):
+        assert client.delete(f"/roles/{role_id}").status_code == 204
+
+    # A failing statement must not leave its start time behind for the next one.
+    with track_queries() as stats, engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+        assert connection.info.get("query_started") == []
+    assert stats.count == 1
+
+
+def test_prometheus_metrics(client: TestClient):
+    role_id = client.post("/roles/", json={"name": "metered"}).json()["id"]
+    client.put(f"/roles/{role_id}", json={"description": "metered role"})
+    client.put("/roles/999999", json={"description": "missing"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="PUT",route="/roles/{role_id}",status="200"}' in body
+    assert 'http_requests_total{method="PUT",route="/roles/{role_id}",status="404"}' in body
+    assert 'http_request_duration_seconds_bucket{method="PUT",route="/roles/{role_id}",le="+Inf"}' in body
+    assert 'service_call_duration_seconds_count{service="RoleService",method="create_role"}' in body
+    assert "db_pool_checkouts_total" in body
+
+    @timed_service("Probe")
+    class Probe:
+        def stream(self):
+            time.sleep(0.02)
+            yield 1
+
+    rows = Probe().stream()
+    histogram = service_call_duration_seconds.labels("Probe", "stream")
+    assert sum(histogram.counts) == 0
+    assert list(rows) == [1]
+    assert sum(histogram.counts) == 1 and histogram.sum >= 0.02
+
+
+def test_list_etag_and_conditional_get(client: TestClient, assert_max_queries):
+    role_id = client.post("/roles/", json={"name": "viewer"}).json()["id"]
+    user_id = client.post(
+        "/users/", json={"username": "polly", "email": "polly@example.com", "password_hash": "secretpass"}
+    ).json()["id"]
+    client.post("/user-roles/", json={"user_id": user_id, "role_id": role_id})
+
+    first = client.get("/roles/")
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and etag != client.get("/roles/?name=view").headers["etag"]
+
+    with assert_max_queries(0):
+        cached = client.get("/roles/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag and cached.content == b""
+
+    link_etag = client.get("/user-roles/").headers["etag"]
+    client.delete(f"/roles/{role_id}")
+    assert client.get("/roles/", headers={"If-None-Match": etag}).status_code == 200
+    refreshed = client.get("/user-roles/", headers={"If-None-Match": link_etag})
+    assert refreshed.status_code == 200 and refreshed.json() == []
+
+
+def test_list_cache_pages_are_keyed_by_table_version(client: TestClient, assert_max_queries):
+    admin_id = client.post("/roles/", json={"name": "admin"}).json()["id"]
+    permission_id = client.post("/permissions/", json={"name": "cache:read"}).json()["id"]
+    client.post("/role-permissions/", json={"role_id": admin_id, "permission_id": permission_id})
+    for path in ("/roles/?name=adm", "/roles/", "/role-permissions/"):
+        client.get(path)
+
+    with assert_max_queries(0):
+        assert [role["name"] for role in client.get("/roles/?name=adm").json()] == ["admin"]
+        assert len(client.get("/role-permissions/").json()) == 1
+
+    # A write to another table leaves the roles pages where they are.
+    client.post("/permissions/", json={"name": "cache:write"})
+    with assert_max_queries(0):
+        client.get("/roles/")
+    guest_id = client.post("/roles/", json={"name": "guest"}).json()["id"]
+    with assert_max_queries(1):
+        assert len(client.get("/roles/").json()) == 2
+    with assert_max_queries(0):
+        client.get("/roles/")
+
+    client.put(f"/roles/{guest_id}", json={"name": "sysadmin"})
+    assert [role["name"] for role in client.get("/roles/?name=adm").json()] == ["admin", "sysadmin"]
+
+    # A write by another worker reaches this one only through the change feed.
+    client.get("/roles/")
+    with TestingSessionLocal() as session:
+        session.execute(insert(Role).values(name="remote"))
+        session.commit()
+    assert len(client.get("/roles/").json()) == 2
+    table_versions.apply([Change("roles", "insert", {"name": "remote"})])
+    assert len(client.get("/roles/").json()) == 3
+
+    client.delete(f"/roles/{admin_id}")
+    assert client.get("/role-permissions/").json() == []
+
+
+def test_memory_cache_backend_lru_and_ttl():
+    backend = MemoryCacheBackend(max_entries=2)
+    evictions = []
+    backend.on_evict = lambda table, reason: evictions.append(reason)
+    for key in ("a", "b"):
+        backend.set(key, CacheEntry("roles"), ttl=60)
+    backend.get("a")
+    backend.set("c", CacheEntry("roles"), ttl=60)
+    assert backend.get("b") is None and backend.get("a") is not None
+    backend.set("d", CacheEntry("roles"), ttl=-1)
+    assert backend.get("d") is None
+    assert evictions == ["capacity", "capacity", "expired"]
+
+
+def test_change_log_poller_replays_other_workers_writes(client: TestClient):
+    poller = ChangeLogPoller(TestingSessionLocal)
+    assert poller.poll_once() == 0
+    client.post("/roles/", json={"name": "local"})
+    assert poller.poll_once() == 0
+    client.get("/roles/")
+
+    def write_from_other_worker(payload, seq=None):
+        with TestingSessionLocal() as db:
+            values = {"origin": "worker-b", "payload": json.dumps(payload), "created_at": datetime.utcnow()}
+            if seq is not None:
+                values["seq"] = seq
+            db.execute(insert(change_log_table).values(**values))
+            db.commit()
+
+    with TestingSessionLocal() as db:
+        remote_id = db.execute(insert(Role).values(name="remote").returning(Role.id)).scalar_one()
+        db.commit()
+    write_from_other_worker([["roles", "insert", {"id": remote_id, "name": "remote"}]])
+    assert [role["name"] for role in client.get("/roles/").json()] == ["local"]
+    assert poller.poll_once() == 1
+    assert [role["name"] for role in client.get("/roles/").json()] == ["local", "remote"]
+
+    received = []
+    gap_poller = ChangeLogPoller(TestingSessionLocal, dispatch=received.append)
+    gap_poller.poll_once()
+    start = gap_poller.last_seq
+    write_from_other_worker([["roles", "update", {"id": remote_id, "name": "late"}]], seq=start + 2)
+    gap_poller.poll_once()
+    write_from_other_worker([["roles", "update", {"id": remote_id, "name": "early"}]], seq=start + 1)
+    gap_poller.poll_once()
+    assert [(change.seq, change.row["name"]) for [change] in received] == [
+        (start + 2, "late"),
+        (start + 1, "early"),
+    ]
+
+    # A worker booted now derives the same tags as one that saw every change live, including
+    # for tables nobody has written to.
+    tables = ("roles", "permissions", "users")
+    with TestingSessionLocal() as db:
+        horizon, logged = retained_changes(db)
+    live, booted = TableVersions(), TableVersions()
+    live.use_sequence(0)
+    live.apply(logged)
+    booted.use_sequence(horizon, logged)
+    assert booted.token(tables) == live.token(tables)
+
+
+def test_list_response_serializes_page_in_one_pass(client: TestClient):
+    created = [
+        client.post(
+            "/users/",
+            json={"username": f"reader{i}", "email": f"reader{i}@example.com", "password_hash": "secretpass"},
+        ).json()
+        for i in range(3)
+    ]
+    resp = client.get("/users/", params={"limit": 2})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    assert int(resp.headers["content-length"]) == len(resp.content)
+    assert resp.headers["X-Next-Cursor"] and resp.headers["etag"]
+    assert resp.json() == created[:2]
+    assert resp.json() == [UserRead.model_validate(user).model_dump(mode="json") for user in created[:2]]
+
+    schema = client.get("/openapi.json").json()["components"]["schemas"]["UserRead"]
+    assert schema["properties"]["email"]["format"] == "email"
+
+
+def test_sparse_fieldsets_project_columns(client: TestClient):
+    role_id = client.post("/roles/", json={"name": "auditor", "description": "x" * 500}).json()["id"]
+    user_id = client.post(
+        "/users/",
+        json={"username": "sparse", "email": "sparse@example.com", "password_hash": "secretpass"},
+    ).json()["id"]
+    client.post("/user-roles/", json={"user_id": user_id, "role_id": role_id})
+
+    with QueryCounter(engine) as counter:
+        users = client.get("/users/", params={"fields": "username"})
+        links = client.get("/user-roles/", params={"fields": "user_id"})
+    assert users.json() == [{"id": user_id, "username": "sparse"}]
+    assert links.json() == [{"user_id": user_id, "role_id": role_id}]
+    selects = [statement for statement in counter.statements if statement.startswith("SELECT")]
+    assert not any("password_hash" in statement or "assigned_at" in statement for statement in selects)
+
+    assert client.get("/roles/", params={"fields": "name"}).json() == [{"id": role_id, "name": "auditor"}]
+    assert client.get("/roles/").json()[0]["description"] == "x" * 500
+    assert client.get("/roles/", params={"fields": "name,secret"}).status_code == 400
+
+
+def test_writes_return_rows_without_refresh(client: TestClient):
+    with QueryCounter(engine) as counter:
+        created = client.post("/roles/", json={"name": "writer", "description": "d"}).json()
+        updated = client.put(f"/roles/{created['id']}", json={"name": "editor"}).json()
+        permission = client.post("/permissions/", json={"name": "docs:write"}).json()
+        link = client.post(
+            "/role-permissions/", json={"role_id": created["id"], "permission_id": permission["id"]}
+        ).json()
+    assert updated["name"] == "editor" and updated["description"] == "d"
+    assert updated["created_at"] == created["created_at"] and updated["updated_at"] >= created["updated_at"]
+    assert link["granted_at"]
+    selects = [statement for statement in counter.statements if statement.startswith("SELECT")]
+    assert not any("FROM roles" in statement or "FROM permissions" in statement for statement in selects)
+
+    other = client.post("/permissions/", json={"name": "docs:read"}).json()
+    with QueryCounter(engine) as counter:
+        moved = client.put(
+            f"/role-permissions/{created['id']}/{permission['id']}", json={"permission_id": other["id"]}
+        )
+    assert moved.json() == {**link, "permission_id": other["id"]}
+    selects = [statement for statement in counter.statements if statement.startswith("SELECT")]
+    assert not any("FROM role_permissions" in statement for statement in selects)
+    assert client.put("/roles/999999", json={"name": "ghost"}).status_code == 404
+
+
+def test_relationship_endpoints_and_include(client: TestClient, assert_max_queries):
+    roles = [client.post("/roles/", json={"name": f"group{i}"}).json()["id"] for i in range(3)]
+    permission = client.post("/permissions/", json={"name": "reports:read"}).json()["id"]
+    client.put(f"/roles/{roles[0]}/permissions", json={"permission_ids": [permission]})
+    users = [
+        client.post(
+            "/users/",
+            json={"username": f"staff{i}", "email": f"staff{i}@example.com", "password_hash": "secretpass"},
+        ).json()["id"]
+        for i in range(20)
+    ]
+    for user_id in users:
+        client.put(f"/users/{user_id}/roles", json={"role_ids": roles[:2]})
+
+    with assert_max_queries(2):
+        expanded = client.get("/users/", params={"include": "roles", "fields": "username"})
+    assert len(expanded.json()) == 20
+    assert [role["id"] for role in expanded.json()[0]["roles"]] == roles[:2]
+    assert set(expanded.json()[0]) == {"id", "username", "roles"}
+    with assert_max_queries(2):
+        by_role = client.get("/roles/", params={"include": "permissions"}).json()
+    assert [[p["name"] for p in role["permissions"]] for role in by_role] == [["reports:read"], [], []]
+    assert client.get("/users/", params={"include": "secrets"}).status_code == 400
+
+    etag = expanded.headers["etag"]
+    client.put(f"/users/{users[0]}/roles", json={"role_ids": roles})
+    assert client.get(
+        "/users/", params={"include": "roles", "fields": "username"}, headers={"If-None-Match": etag}
+    ).status_code == 200
+
+    with assert_max_queries(1):
+        first = client.get(f"/roles/{roles[0]}/users", params={"limit": 15})
+    assert [user["id"] for user in first.json()] == users[:15]
+    rest = client.get(f"/roles/{roles[0]}/users", params={"cursor": first.headers["X-Next-Cursor"]})
+    assert [user["id"] for user in rest.json()] == users[15:]
+    assert [role["id"] for role in client.get(f"/users/{users[0]}/roles").json()] == roles
+    assert [p["id"] for p in client.get(f"/roles/{roles[0]}/permissions").json()] == [permission]
+    assert [r["id"] for r in client.get(f"/permissions/{permission}/roles").json()] == [roles[0]]
+    assert client.get(f"/roles/{roles[2]}/permissions").json() == []
+    assert client.get("/users/999999/roles").status_code == 404
+    assert client.get("/permissions/999999/roles").status_code == 404
+
+
+def test_role_hierarchy_inherits_permissions(client: TestClient):
+    viewer, editor, admin = (
+        client.post("/roles/", json={"name": name}).json()["id"] for name in ("viewer", "editor", "admin")
+    )
+    for role_id, name in ((viewer, "docs:read"), (editor, "docs:write"), (admin, "docs:purge")):
+        permission_id = client.post("/permissions/", json={"name": name}).json()["id"]
+        client.post("/role-permissions/", json={"role_id": role_id, "permission_id": permission_id})
+    user_id = client.post(
+        "/users/", json={"username": "chief", "email": "chief@example.com", "password_hash": "secretpass"}
+    ).json()["id"]
+    client.post("/user-roles/", json={"user_id": user_id, "role_id": admin})
+    assert client.get(f"/users/{user_id}/permissions").json()["permissions"] == ["docs:purge"]
+
+    linked = client.put(f"/roles/{editor}/parents", json={"parent_ids": [viewer]})
+    assert linked.json() == {"added": [viewer], "removed": [], "unknown": [], "cycles": []}
+    client.put(f"/roles/{admin}/parents", json={"parent_ids": [editor]})
+    assert [role["id"] for role in client.get(f"/roles/{admin}/parents").json()] == [editor]
+    everything = ["docs:purge", "docs:read", "docs:write"]
+    assert client.get(f"/users/{user_id}/permissions").json()["permissions"] == everything
+    assert client.post("/authz/holders", json={"permission": "docs:read"}).json()["user_ids"] == [user_id]
+
+    cycle = client.put(f"/roles/{viewer}/parents", json={"parent_ids": [admin]})
+    assert cycle.status_code == 409 and cycle.json()["detail"]["parent_ids"] == [admin]
+    assert client.put(f"/roles/{viewer}/parents", json={"parent_ids": [viewer]}).status_code == 409
+    assert client.put(f"/roles/{viewer}/parents", json={"parent_ids": [999]}).status_code == 422
+    assert client.put("/roles/999/parents", json={"parent_ids": []}).status_code == 404
+
+    client.put(f"/roles/{editor}/parents", json={"parent_ids": []})
+    assert client.get(f"/users/{user_id}/permissions").json()["permissions"] == ["docs:purge", "docs:write"]
+    client.put(f"/roles/{editor}/parents", json={"parent_ids": [viewer]})
+    assert client.delete(f"/roles/{editor}").status_code == 204
+    assert client.get(f"/users/{user_id}/permissions").json()["permissions"] == ["docs:purge"]
+    assert client.get(f"/roles/{admin}/parents").json() == []
+
+    client.put(f"/roles/{admin}/parents", json={"parent_ids": [viewer]})
+    with TestingSessionLocal() as session:
+        service = AuthorizationService(SQLAlchemyAuthorizationRepository(session))
+        assert service.list_user_permissions(user_id).permissions == ["docs:purge", "docs:read"]
+        assert SQLAlchemyEffectivePermissionRepository(session).find_drift() == []
+
+
+def test_concurrent_parent_changes_cannot_form_a_cycle(tmp_path):
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'hierarchy.db'}")
+    Base.metadata.create_all(file_engine)
+    sessions = sessionmaker(bind=file_engine)
+    with sessions() as session:
+        repository = SQLAlchemyRoleRepository(session)
+        first, second = (repository.create(RoleCreate(name=name)).id for name in ("first", "second"))
+
+    checked, release = threading.Event(), threading.Event()
+    results = {}
+
+    def replace(role_id: int, parent_id: int, pause: bool) -> None:
+        with sessions() as session:
+            repository = SQLAlchemyRoleRepository(session)
+            if pause:
+                check = repository.hierarchy.cycles
+
+                def paused_check(*args):
+                    found = check(*args)
+                    checked.set()
+                    release.wait(5)
+                    return found
+
+                repository.hierarchy.cycles = paused_check
+            results[role_id] = repository.replace_parents(role_id, [parent_id])
+
+    # The second writer starts while the first sits between its cycle check and its insert.
+    writers = [threading.Thread(target=replace, args=(first, second, True))]
+    writers[0].start()
+    checked.wait(5)
+    writers.append(threading.Thread(target=replace, args=(second, first, False)))
+    writers[1].start()
+    time.sleep(0.2)
+    release.set()
+    for writer in writers:
+        writer.join(10)
+    assert results[first].added == [second]
+    assert results[second].cycles == [first]
+    with sessions() as session:
+        assert session.execute(select(role_parents_table)).all() == [(first, second)]
+    file_engine.dispose()
+
+
+def test_concurrent_permission_set_replacements_do_not_conflict(tmp_path):
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'links.db'}")
+    Base.metadata.create_all(file_engine)
+    sessions = sessionmaker(bind=file_engine)
+    with sessions() as session:
+        role = Role(name="synced")
+        permissions = [Permission(name=f"sync:{index}") for index in range(3)]
+        session.add_all([role, *permissions])
+        session.commit()
+        role_id, permission_ids = role.id, [permission.id for permission in permissions]
+
+    read, release = threading.Event(), threading.Event()
+    results = {}
+
+    def replace(name: str, pause: bool) -> None:
+        with sessions() as session:
+            if pause:
+                scalars = session.scalars
+
+                def paused_scalars(statement, *args, **kwargs):
+                    found = list(scalars(statement, *args, **kwargs))
+                    if "FROM role_permissions" in str(statement):
+                        read.set()
+                        release.wait(5)
+                    return found
+
+                session.scalars = paused_scalars
+            repository = SQLAlchemyRolePermissionRepository(session)
+            results[name] = repository.replace_for_role(role_id, permission_ids)
+
+    # The second replacement starts while the first sits between reading the set and inserting.
+    writers = [threading.Thread(target=replace, args=("first", True))]
+    writers[0].start()
+    read.wait(5)
+    writers.append(threading.Thread(target=replace, args=("second", False)))
+    writers[1].start()
+    time.sleep(0.2)
+    release.set()
+    for writer in writers:
+        writer.join(10)
+    assert results["first"].added == permission_ids
+    assert results["second"].added == []
+    with sessions() as session:
+        assert len(session.execute(select(role_permissions_table)).all()) == 3
+    file_engine.dispose()
+
+
+def test_batch_permission_check(client: TestClient, assert_max_queries):
+    role_id = client.post("/roles/", json={"name": "support"}).json()["id"]
+    permission_id = client.post("/permissions/", json={"name": "tickets:read"}).json()["id"]
+    client.post("/permissions/", json={"name": "tickets:close"})
+    client.post("/role-permissions/", json={"role_id": role_id, "permission_id": permission_id})
+    agent, visitor = (
+        client.post(
+            "/users/", json={"username": name, "email": f"{name}@example.com", "password_hash": "secretpass"}
+        ).json()["id"]
+        for name in ("agent", "visitor")
+    )
+    client.post("/user-roles/", json={"user_id": agent, "role_id": role_id})
+    checks = [
+        {"user_id": agent, "permission": "tickets:read"},
+        {"user_id": agent, "permission": "tickets:close"},
+        {"user_id": visitor, "permission": "tickets:read"},
+        {"user_id": agent, "permission": "unknown"},
+        {"user_id": agent, "permission": "tickets:read"},
+    ]
+    expected = [True, False, False, False, True]
+
+    response = client.post("/authz/check-batch", json={"checks": checks})
+    assert response.status_code == 200
+    assert [result["allowed"] for result in response.json()["results"]] == expected
+    assert response.json()["results"][1] == {**checks[1], "allowed": False}
+    with assert_max_queries(0):
+        client.post("/authz/check-batch", json={"checks": checks})
+
+    with TestingSessionLocal() as session, assert_max_queries(1):
+        service = AuthorizationService(SQLAlchemyAuthorizationRepository(session))
+        batch = service.check_permissions(PermissionCheckBatch(checks=checks))
+    assert [result.allowed for result in batch.results] == expected
+    assert client.post("/authz/check-batch", json={"checks": []}).json() == {"results": []}
+
+    # Id lists past the drivers' bind-parameter limit are split into several IN queries.
+    many_ids = list(range(visitor + 1, visitor + 40_000)) + [agent, visitor]
+    many_checks = [{"user_id": agent, "permission": f"tickets:queue:{index}:read"} for index in range(10_000)]
+    with TestingSessionLocal() as session, QueryCounter(engine) as counter:
+        service = AuthorizationService(SQLAlchemyAuthorizationRepository(session))
+        holders = service.find_permission_holders(
+            PermissionHoldersQuery(permission="tickets:read", user_ids=many_ids)
+        )
+        assert holders.user_ids == [agent]
+        batch = service.check_permissions(PermissionCheckBatch(checks=many_checks))
+        assert not any(result.allowed for result in batch.results)
+    assert max(statement.count("?") for statement in counter.statements) < 32766
+
+
+def test_wildcard_permission_grants(client: TestClient):
+    role_id = client.post("/roles/", json={"name": "finance"}).json()["id"]
+    pattern_id = client.post("/permissions/", json={"name": "billing:invoice:*"}).json()["id"]
+    client.post("/permissions/", json={"name": "billing:refund"})
+    client.post("/role-permissions/", json={"role_id": role_id, "permission_id": pattern_id})
+    user_id = client.post(
+        "/users/",
+        json={"username": "accountant", "email": "accountant@example.com", "password_hash": "secretpass"},
+    ).json()["id"]
+    client.post("/user-roles/", json={"user_id": user_id, "role_id": role_id})
+    names = ["billing:invoice:read", "billing:invoice:line:edit", "billing:invoice", "billing:refund"]
+    checks = [{"user_id": user_id, "permission": name} for name in names]
+
+    def allowed() -> list:
+        results = client.post("/authz/check-batch", json={"checks": checks}).json()["results"]
+        return [result["allowed"] for result in results]
+
+    assert allowed() == [True, True, False, False]
+    assert client.get(f"/users/{user_id}/can/billing:invoice:void").json()["allowed"] is True
+    holders = client.post("/authz/holders", json={"permission": "billing:invoice:read"}).json()
+    assert holders["user_ids"] == [user_id]
+    with TestingSessionLocal() as session:
+        service = AuthorizationService(SQLAlchemyAuthorizationRepository(session))
+        batch = service.check_permissions(PermissionCheckBatch(checks=checks))
+        assert [result.allowed for result in batch.results] == [True, True, False, False]
+        assert service.check_permission(user_id, "billing:invoice:void").allowed is True
+
+    client.put(f"/permissions/{pattern_id}", json={"name": "billing:*"})
+    assert allowed() == [True, True, True, True]
+    client.delete(f"/role-permissions/{role_id}/{pattern_id}")
+    assert allowed() == [False, False, False, False]
+
+    assert client.post("/permissions/", json={"name": "billing:*:read"}).status_code == 422
+    assert client.post("/permissions/", json={"name": "billing*"}).status_code == 422
+    assert client.post("/permissions/", json={"name": "*"}).status_code == 201
+
+
+def test_binary_snapshot_round_trip(client: TestClient):
+    viewer = client.post("/roles/", json={"name": "viewer", "description": "Read only"}).json()["id"]
+    editor = client.post("/roles/", json={"name": "editor"}).json()["id"]
+    client.put(f"/roles/{editor}/parents", json={"parent_ids": [viewer]})
+    permission_id = client.post("/permissions/", json={"name": "wiki:*"}).json()["id"]
+    client.put(f"/roles/{viewer}/permissions", json={"permission_ids": [permission_id]})
+    kept, dropped = (
+        client.post(
+            "/users/",
+            json={"username": name, "email": f"{name}@example.com", "password_hash": f"hash-{name}"},
+        ).json()["id"]
+        for name in ("kept", "dropped")
+    )
+    for user_id in (kept, dropped):
+        client.put(f"/users/{user_id}/roles", json={"role_ids": [editor]})
+    roles_before = client.get("/roles/").json()
+
+    snapshot = client.get("/snapshot")
+    assert snapshot.status_code == 200
+    assert snapshot.headers["content-type"] == "application/vnd.rbac-snapshot"
+    assert snapshot.content.startswith(b"RBACSNAP")
+
+    client.delete(f"/users/{dropped}")
+    client.delete(f"/roles/{viewer}")
+    client.post("/roles/", json={"name": "temporary"})
+    assert client.get(f"/users/{kept}/can/wiki:page:edit").json()["allowed"] is False
+
+    restored = client.post("/snapshot", content=snapshot.content)
+    assert restored.status_code == 200
+    assert restored.json()["tables"] == {
+        "roles": 2,
+        "permissions": 1,
+        "users": 2,
+        "role_permissions": 1,
+        "user_roles": 2,
+        "role_parents": 1,
+    }
+    assert client.get("/roles/").json() == roles_before
+    assert client.get(f"/users/{kept}/can/wiki:page:edit").json()["allowed"] is True
+    assert client.get(f"/users/{dropped}/permissions").json()["permissions"] == ["wiki:*"]
+    with TestingSessionLocal() as session:
+        hashes = dict(session.execute(select(User.id, User.password_hash)).all())
+        assert hashes == {kept: "hash-kept", dropped: "!"}
+        assert SQLAlchemyEffectivePermissionRepository(session).find_drift() == []
+    assert client.post("/roles/", json={"name": "after-restore"}).json()["id"] > editor
+
+    assert client.post("/snapshot", content=b"not a snapshot").status_code == 400
+    assert client.post("/snapshot", content=snapshot.content[:-3]).status_code == 400
+
+
+
+def test_snapshot_export_reads_one_consistent_state(tmp_path):
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'snapshot.db'}")
+    Base.metadata.create_all(file_engine)
+    sessions = sessionmaker(bind=file_engine)
+    with sessions() as session:
+        owner = User(username="owner", email="owner@example.com", password_hash="secretpass")
+        session.add_all([Role(name="base"), owner])
+        session.commit()
+        owner_id = owner.id
+
+    roles_dumped, written = threading.Event(), threading.Event()
+
+    def write() -> None:
+        roles_dumped.wait(5)
+        with sessions() as session:
+            role = Role(name="late")
+            session.add(role)
+            session.flush()
+            session.execute(insert(user_roles_table).values(user_id=owner_id, role_id=role.id))
+            session.commit()
+        written.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    with sessions() as session:
+        repository = SQLAlchemySnapshotRepository(session)
+        dump = repository._dump
+
+        def paused_dump(table, columns):
+            dumped = dump(table, columns)
+            if table.name == "roles":
+                # The writer may commit between the roles and the user_roles dumps.
+                roles_dumped.set()
+                written.wait(0.5)
+            return dumped
+
+        repository._dump = paused_dump
+        data = repository.export()
+    writer.join(10)
+    assert written.is_set()
+
+    tables = {
+        table.name: {column.name: list(column.values) for column in table.columns}
+        for table in decode_snapshot(data)
+    }
+    assert tables["roles"]["name"] == ["base"]
+    assert tables["user_roles"]["role_id"] == []
+    with sessions() as session:
+        SQLAlchemySnapshotRepository(session).restore(data)
+        assert session.scalars(select(Role.name)).all() == ["base"]
+    file_engine.dispose()
+
+
+def test_shared_permission_index_generations(client: TestClient, tmp_path):
+    viewer = client.post("/roles/", json={"name": "viewer"}).json()["id"]
+    editor = client.post("/roles/", json={"name": "editor"}).json()["id"]
+    client.put(f"/roles/{editor}/parents", json={"parent_ids": [viewer]})
+    read_id = client.post("/permissions/", json={"name": "wiki:page:read"}).json()["id"]
+    edit_id = client.post("/permissions/", json={"name": "wiki:page:*"}).json()["id"]
+    client.put(f"/roles/{viewer}/permissions", json={"permission_ids": [read_id]})
+    client.put(f"/roles/{editor}/permissions", json={"permission_ids": [edit_id]})
+    reader, author = (
+        client.post(
+            "/users/",
+            json={"username": name, "email": f"{name}@example.com", "password_hash": "secretpass"},
+        ).json()["id"]
+        for name in ("reader", "author")
+    )
+    client.put(f"/users/{reader}/roles", json={"role_ids": [viewer]})
+    client.put(f"/users/{author}/roles", json={"role_ids": [editor]})
+
+    def no_loader():
+        raise AssertionError("the current generation should have been mapped, not rebuilt")
+
+    first, second = SharedPermissionIndex(str(tmp_path)), SharedPermissionIndex(str(tmp_path))
+    with TestingSessionLocal() as session:
+        service = AuthorizationService(SQLAlchemyAuthorizationRepository(session), first)
+        assert service.check_permission(author, "wiki:page:delete").allowed is True
+        assert service.check_permission(reader, "wiki:page:delete").allowed is False
+        assert service.list_user_permissions(author).permissions == ["wiki:page:*", "wiki:page:read"]
+        holders = service.find_permission_holders(PermissionHoldersQuery(permission="wiki:page:read"))
+        assert holders.user_ids == [reader, author]
+    second.refresh(no_loader)
+    assert second.generation == first.generation == 1
+    assert second.check_many([(reader, "wiki:page:read"), (reader, "wiki:page:edit")]) == [True, False]
+
+    assert client.delete(f"/user-roles/{reader}/{viewer}").status_code == 204
+    with TestingSessionLocal() as session:
+        seq = current_sequence(session)
+    change = Change("user_roles", "delete", {"user_id": reader, "role_id": viewer}, seq=seq)
+    for worker in (first, second):
+        worker.apply([change])
+        assert not worker.loaded
+    with TestingSessionLocal() as session:
+        first.refresh(SQLAlchemyAuthorizationRepository(session).load_graph)
+    second.refresh(no_loader)
+    assert second.generation == first.generation == 2
+    assert second.has_permission(reader, "wiki:page:read") is False
+    assert second.users_with_permission("wiki:page:read") == [author]
+
+    # seq + 1 is allocated by a transaction that commits only after the next generation
+    # was read at seq + 2, so that generation lacks it despite its higher stamp.
+    with TestingSessionLocal() as session:
+        session.execute(insert(change_log_table).values(seq=seq + 2, origin="elsewhere", payload="[]"))
+        session.commit()
+    first.invalidate()
+    with TestingSessionLocal() as session:
+        first.refresh(SQLAlchemyAuthorizationRepository(session).load_graph)
+    assert first.generation == 3
+    with TestingSessionLocal() as session:
+        session.execute(insert(user_roles_table).values(user_id=reader, role_id=viewer))
+        session.execute(insert(change_log_table).values(seq=seq + 1, origin="elsewhere", payload="[]"))
+        session.commit()
+    late = Change("user_roles", "insert", {"user_id": reader, "role_id": viewer}, seq=seq + 1)
+    first.apply([Change("user_roles", "delete", {"user_id": reader, "role_id": viewer}, seq=seq)])
+    assert first.loaded
+    for worker in (first, second):
+        worker.apply([late])
+        assert not worker.loaded
+    with pytest.raises(AssertionError):
+        second.refresh(no_loader)
+    with TestingSessionLocal() as session:
+        second.refresh(SQLAlchemyAuthorizationRepository(session).load_graph)
+    first.refresh(no_loader)
+    assert first.generation == second.generation == 4
+    assert first.has_permission(reader, "wiki:page:read") is True
+
+
+def test_shared_index_backend_requires_the_change_bus():
+    assert Settings(authorization_backend="shared", change_bus=True).authorization_backend == "shared"
+    with pytest.raises(ValueError, match="CHANGE_BUS"):
+        Settings(authorization_backend="shared", change_bus=False)
+
+
+def test_shared_index_directory_is_private_per_database(tmp_path):
+    first = index_directory(str(tmp_path), "postgresql://db-one/rbac")
+    assert index_directory(str(tmp_path), "postgresql://db-one/rbac") == first
+    assert index_directory(str(tmp_path), "postgresql://db-two/rbac") != first
+    assert os.stat(first).st_mode & 0o777 == 0o700
+
+    os.chmod(first, 0o777)
+    with pytest.raises(PermissionError):
+        index_directory(str(tmp_path), "postgresql://db-one/rbac")
+
+
+def test_policy_engine_checks_without_http(client: TestClient, tmp_path):
+    role_id = client.post("/roles/", json={"name": "reader"}).json()["id"]
+    read_id = client.post("/permissions/", json={"name": "docs:read"}).json()["id"]
+    client.put(f"/roles/{role_id}/permissions", json={"permission_ids": [read_id]})
+    user_id = client.post(
+        "/users/",
+        json={"username": "embedded", "email": "embedded@example.com", "password_hash": "secretpass"},
+    ).json()["id"]
+    client.put(f"/users/{user_id}/roles", json={"role_ids": [role_id]})
+
+    with PolicyEngine.from_session_factory(TestingSessionLocal, poll_interval=60) as policy:
+        assert policy.check(user_id, "docs:read") is True
+        assert policy.check(user_id, "docs:write") is False
+        write_id = client.post("/permissions/", json={"name": "docs:*"}).json()["id"]
+        client.put(f"/roles/{role_id}/permissions", json={"permission_ids": [read_id, write_id]})
+        assert policy.permissions_for(user_id) == ["docs:*", "docs:read"]
+
+        # A link removed by another process reaches the engine through rbac_changes.
+        with TestingSessionLocal() as session:
+            session.execute(delete(user_roles_table).where(user_roles_table.c.user_id == user_id))
+            payload = json.dumps([["user_roles", "delete", {"user_id": user_id, "role_id": role_id}]])
+            session.execute(insert(change_log_table).values(origin="elsewhere", payload=payload))
+            session.commit()
+        assert policy.poll() == 1
+        assert policy.check_many([(user_id, "docs:read"), (user_id, "docs:write")]) == [False, False]
+
+    # Used without start(), the engine starts following changes on its first check.
+    policy = PolicyEngine.from_session_factory(TestingSessionLocal, poll_interval=60)
+    assert policy.check(user_id, "docs:read") is False
+    client.put(f"/users/{user_id}/roles", json={"role_ids": [role_id]})
+    assert policy.check(user_id, "docs:read") is True
+    # Commits to another database in the same process do not reach it.
+    other = create_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    Base.metadata.create_all(bind=other)
+    with sessionmaker(bind=other)() as session:
+        record_change(session, "user_roles", "delete", user_id=user_id, role_id=role_id)
+        session.commit()
+    other.dispose()
+    assert policy.check(user_id, "docs:read") is True
+    policy.close()
+    with pytest.raises(RuntimeError):
+        policy.check(user_id, "docs:read")
+
+    path = tmp_path / "rbac.snap"
+    path.write_bytes(client.get("/snapshot").content)
+    policy = PolicyEngine.from_snapshot(str(path))
+    assert policy.check(user_id, "docs:edit") is True
+    assert policy.users_with_permission("docs:read") == [user_id]
+
+    probe = (
+        "import sys, app.core.config; assert 'app.policy_engine' not in sys.modules; "
+        "import app; assert app.PolicyEngine and 'fastapi' not in sys.modules"
+    )
+    assert subprocess.run([sys.executable, "-c", probe], cwd=os.getcwd()).returncode == 0
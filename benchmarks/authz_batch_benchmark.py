@@ -0,0 +1,149 @@
+"""Latency of authorizing a batch of (user, permission) pairs, one call per pair versus one batch.
+
+Covers both authorization backends: the ``user_effective_permissions`` table (one
+primary-key probe per pair versus a single ``(user_id, name) IN (...)`` query) and the
+in-process ``PermissionIndex`` (one locked check per pair versus one pass under a single
+lock). Uses a temporary SQLite database unless ``--database-url`` is given.
+
+    python -m benchmarks.authz_batch_benchmark --pairs 1000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.application.services.permission_index import PermissionIndex
+from app.domain.models import Base, Permission, Role, User, role_permissions_table, user_roles_table
+from app.infrastructure.repositories.authorization_repository import SQLAlchemyAuthorizationRepository
+from app.infrastructure.repositories.effective_permission_repository import (
+    SQLAlchemyEffectivePermissionRepository,
+)
+from app.infrastructure.repositories.role_hierarchy_repository import SQLAlchemyRoleHierarchyRepository
+
+
+def permission_name(index: int) -> str:
+    return f"resource{index // 4}:action{index % 4}"
+
+
+def populate(engine, users: int, roles: int, permissions: int, seed: int) -> None:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(insert(Role), [{"name": f"role{index}", "created_at": now} for index in range(roles)])
+        connection.execute(
+            insert(Permission),
+            [{"name": permission_name(index), "created_at": now} for index in range(permissions)],
+        )
+        connection.execute(
+            insert(User),
+            [
+                {
+                    "username": f"user{index}",
+                    "email": f"user{index}@example.com",
+                    "password_hash": "x" * 60,
+                    "created_at": now,
+                }
+                for index in range(users)
+            ],
+        )
+        connection.execute(
+            insert(role_permissions_table),
+            [
+                {"role_id": role_id, "permission_id": permission_id}
+                for role_id in range(1, roles + 1)
+                for permission_id in rng.sample(range(1, permissions + 1), k=max(1, permissions // 10))
+            ],
+        )
+        connection.execute(
+            insert(user_roles_table),
+            [
+                {"user_id": user_id, "role_id": role_id}
+                for user_id in range(1, users + 1)
+                for role_id in rng.sample(range(1, roles + 1), k=min(3, roles))
+            ],
+        )
+    with Session(engine) as session:
+        SQLAlchemyRoleHierarchyRepository(session).rebuild()
+        SQLAlchemyEffectivePermissionRepository(session).rebuild()
+
+
+def build_pairs(total: int, users: int, permissions: int, seed: int) -> List[Tuple[int, str]]:
+    rng = random.Random(seed)
+    return [(rng.randint(1, users), permission_name(rng.randrange(permissions))) for _ in range(total)]
+
+
+def timed(run, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--roles", type=int, default=50)
+    parser.add_argument("--permissions", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    workdir = None
+    url = args.database_url
+    if url is None:
+        workdir = tempfile.mkdtemp(prefix="rbac-authz-")
+        url = f"sqlite:///{os.path.join(workdir, 'authz.db')}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    populate(engine, args.users, args.roles, args.permissions, args.seed)
+    pairs = build_pairs(args.pairs, args.users, args.permissions, args.seed)
+
+    with Session(engine) as session:
+        repository = SQLAlchemyAuthorizationRepository(session)
+        index = PermissionIndex()
+        index.refresh(repository.load_graph)
+
+        granted = repository.granted_pairs(pairs)
+        assert [pair in granted for pair in pairs] == index.check_many(pairs)
+        assert index.check_many(pairs) == [repository.has_permission(*pair) for pair in pairs]
+
+        cases = [
+            (
+                "table",
+                lambda: [repository.has_permission(*pair) for pair in pairs],
+                lambda: repository.granted_pairs(pairs),
+            ),
+            (
+                "index",
+                lambda: [index.has_permission(*pair) for pair in pairs],
+                lambda: index.check_many(pairs),
+            ),
+        ]
+        print(f"{args.pairs} pairs, {sum(pair in granted for pair in pairs)} allowed ({engine.dialect.name})")
+        print(f"{'backend':<10}{'per pair ms':>14}{'batch ms':>12}{'speedup':>10}")
+        for label, per_pair, batch in cases:
+            single = timed(per_pair, args.repeat)
+            batched = timed(batch, args.repeat)
+            print(f"{label:<10}{single:>14.2f}{batched:>12.2f}{single / batched:>9.1f}x")
+
+    engine.dispose()
+    if workdir:
+        os.remove(os.path.join(workdir, "authz.db"))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Cost of turning a list page of ORM rows into a JSON response body.
+
+Compares the previous path (per-row ``model_validate`` in the service, then FastAPI
+validating the list again against ``response_model``, ``jsonable_encoder`` and
+``json.dumps``) with the cached ``TypeAdapter`` path used by ``list_response``, plus an
+orjson variant when orjson happens to be installed.
+
+    python -m benchmarks.serialization_benchmark --rows 10000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.domain.models import Permission, Role, User
+from app.domain.schemas import PermissionRead, RoleRead, UserRead, list_adapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional comparison only
+    orjson = None
+
+
+def build_rows(model, total: int) -> list:
+    now = datetime.utcnow()
+    if model is User:
+        return [
+            User(
+                id=index,
+                username=f"user{index:07d}",
+                email=f"user{index:07d}@example.com",
+                password_hash="x" * 60,
+                is_active=True,
+                created_at=now,
+                updated_at=now,
+            )
+            for index in range(total)
+        ]
+    return [
+        model(
+            id=index,
+            name=f"{model.__tablename__}-{index}",
+            description="d" * 40,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(total)
+    ]
+
+
+def previous_path(rows: list, schema: type) -> bytes:
+    items = [schema.model_validate(row) for row in rows]
+    field = create_model_field(name="Response", type_=List[schema], mode="serialization")
+    content = asyncio.run(serialize_response(field=field, response_content=items))
+    return JSONResponse(content).body
+
+
+def adapter_path(rows: list, schema: type) -> bytes:
+    adapter = list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def orjson_path(rows: list, schema: type) -> bytes:
+    adapter = list_adapter(schema)
+    return orjson.dumps(adapter.dump_python(adapter.validate_python(rows, from_attributes=True)))
+
+
+def timed(run, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    paths = [("previous", previous_path), ("adapter", adapter_path)]
+    if orjson is not None:
+        paths.append(("orjson", orjson_path))
+    print(f"{'schema':<16}" + "".join(f"{label + ' ms':>14}" for label, _ in paths) + f"{'speedup':>10}")
+    for model, schema in ((Role, RoleRead), (Permission, PermissionRead), (User, UserRead)):
+        rows = build_rows(model, args.rows)
+        timings = [timed(lambda: path(rows, schema), args.repeat) for _, path in paths]
+        columns = "".join(f"{value:>14.2f}" for value in timings)
+        print(f"{schema.__name__:<16}{columns}{timings[0] / timings[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
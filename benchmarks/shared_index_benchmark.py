@@ -0,0 +1,119 @@
+"""Per-worker memory and start time of the in-process index versus the shared mapped file.
+
+Builds a synthetic ``PermissionGraph`` and compares ``PermissionIndex.refresh`` (what
+every worker pays under the ``index`` backend) with publishing one ``IndexFile``
+generation and mapping it (what the first and every other worker pay under ``shared``).
+Memory is the Python heap retained after the build, measured with ``tracemalloc``; the
+mapped file's pages live in the shared page cache instead.
+
+    python -m benchmarks.shared_index_benchmark --users 200000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from app.application.services.permission_index import PermissionIndex
+from app.application.services.shared_permission_index import SharedPermissionIndex
+from app.domain.repositories import PermissionGraph
+from app.infrastructure.index_file import build_lock, publish_index
+
+
+def permission_name(index: int) -> str:
+    return f"resource{index // 4}:action{index % 4}"
+
+
+def build_graph(users: int, roles_per_user: int, roles: int, permissions: int, seed: int) -> PermissionGraph:
+    rng = random.Random(seed)
+    return PermissionGraph(
+        user_roles=[
+            (user_id, role_id)
+            for user_id in range(1, users + 1)
+            for role_id in rng.sample(range(1, roles + 1), roles_per_user)
+        ],
+        role_permissions=[
+            (role_id, permission_id)
+            for role_id in range(1, roles + 1)
+            for permission_id in rng.sample(range(1, permissions + 1), permissions // 10)
+        ],
+        permissions=[(index, permission_name(index)) for index in range(1, permissions + 1)],
+        role_parents=[(role_id, role_id - 1) for role_id in range(2, roles + 1, 5)],
+    )
+
+
+def measure(build):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained
+
+
+def check_latency(index, pairs) -> float:
+    timings = []
+    for user_id, name in pairs:
+        started = time.perf_counter()
+        index.has_permission(user_id, name)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--roles-per-user", type=int, default=3)
+    parser.add_argument("--roles", type=int, default=200)
+    parser.add_argument("--permissions", type=int, default=2_000)
+    parser.add_argument("--checks", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    graph = build_graph(args.users, args.roles_per_user, args.roles, args.permissions, args.seed)
+    rng = random.Random(args.seed)
+    pairs = [
+        (rng.randint(1, args.users), permission_name(rng.randint(1, args.permissions)))
+        for _ in range(args.checks)
+    ]
+    print(f"graph: {len(graph.user_roles):,} user_roles, {len(graph.role_permissions):,} role_permissions")
+
+    memory_index = PermissionIndex()
+    _, built, memory = measure(lambda: memory_index.refresh(lambda: graph))
+
+    directory = tempfile.mkdtemp(prefix="rbac-shared-index-")
+    try:
+        started = time.perf_counter()
+        with build_lock(directory):
+            published = publish_index(directory, graph)
+        compiled = time.perf_counter() - started
+        worker = SharedPermissionIndex(directory)
+        _, mapped, mapped_memory = measure(lambda: worker.refresh(lambda: graph))
+        size = os.path.getsize(published.path)
+
+        mismatches = sum(memory_index.has_permission(*pair) != worker.has_permission(*pair) for pair in pairs)
+        assert mismatches == 0, f"{mismatches} checks differ between the two indexes"
+        print(f"{'':<22}{'start s':>10}{'heap MB':>10}{'check us':>10}")
+        print(
+            f"{'in-process, per worker':<22}{built:>10.3f}{memory / 1e6:>10.1f}"
+            f"{check_latency(memory_index, pairs):>10.1f}"
+        )
+        print(f"{'shared, first worker':<22}{compiled:>10.3f}{'-':>10}{'-':>10}")
+        print(
+            f"{'shared, other workers':<22}{mapped:>10.4f}{mapped_memory / 1e6:>10.2f}"
+            f"{check_latency(worker, pairs):>10.1f}"
+        )
+        print(f"index file: {size / 1e6:.1f} MB, mapped once per node")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
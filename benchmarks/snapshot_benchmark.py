@@ -0,0 +1,131 @@
+"""Round-trip time and size of a binary RBAC snapshot for a large link graph.
+
+Populates users, roles and ``user_roles``/``role_permissions`` links, then times
+``export`` (read + encode), decoding alone, and ``restore`` (decode + bulk load in one
+transaction + closure and effective-permission rebuild). Uses a temporary SQLite database
+unless ``--database-url`` is given.
+
+    python -m benchmarks.snapshot_benchmark --links 10000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.domain.models import (
+    Base,
+    Permission,
+    Role,
+    User,
+    role_permissions_table,
+    user_effective_permissions_table,
+    user_roles_table,
+)
+from app.infrastructure.repositories.snapshot_repository import SQLAlchemySnapshotRepository
+from app.infrastructure.snapshot import decode_snapshot
+
+BATCH_SIZE = 50_000
+
+
+def populate(engine, links: int, roles_per_user: int, roles: int, permissions: int) -> None:
+    users = max(1, links // roles_per_user)
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Role), [{"name": f"role{index}", "created_at": now} for index in range(roles)]
+        )
+        connection.execute(
+            insert(Permission),
+            [{"name": f"svc:res{index}:read", "created_at": now} for index in range(permissions)],
+        )
+        connection.execute(
+            insert(role_permissions_table),
+            [
+                {"role_id": role_id, "permission_id": permission_id, "granted_at": now}
+                for role_id in range(1, roles + 1)
+                for permission_id in range(role_id % 10 + 1, permissions + 1, 10)
+            ],
+        )
+        for start in range(0, users, BATCH_SIZE):
+            block = range(start + 1, min(start + BATCH_SIZE, users) + 1)
+            connection.execute(
+                insert(User),
+                [
+                    {
+                        "id": user_id,
+                        "username": f"user{user_id}",
+                        "email": f"user{user_id}@example.com",
+                        "password_hash": "x" * 60,
+                        "created_at": now,
+                    }
+                    for user_id in block
+                ],
+            )
+            connection.execute(
+                insert(user_roles_table),
+                [
+                    {"user_id": user_id, "role_id": (user_id + offset) % roles + 1, "assigned_at": now}
+                    for user_id in block
+                    for offset in range(roles_per_user)
+                ],
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=1_000_000)
+    parser.add_argument("--roles-per-user", type=int, default=5)
+    parser.add_argument("--roles", type=int, default=100)
+    parser.add_argument("--permissions", type=int, default=200)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    workdir = None
+    url = args.database_url
+    if url is None:
+        workdir = tempfile.mkdtemp(prefix="rbac-snapshot-")
+        url = f"sqlite:///{os.path.join(workdir, 'snapshot.db')}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    populate(engine, args.links, args.roles_per_user, args.roles, args.permissions)
+    elapsed = time.perf_counter() - started
+    print(f"populated {args.links:,} user_roles links in {elapsed:.1f}s ({engine.dialect.name})")
+
+    with Session(engine) as session:
+        repository = SQLAlchemySnapshotRepository(session)
+        started = time.perf_counter()
+        data = repository.export()
+        exported = time.perf_counter() - started
+
+        started = time.perf_counter()
+        tables = decode_snapshot(data)
+        decoded = time.perf_counter() - started
+
+        started = time.perf_counter()
+        counts = repository.restore(data)
+        restored = time.perf_counter() - started
+        derived = session.scalar(select(func.count()).select_from(user_effective_permissions_table))
+
+    rows = sum(table.rows for table in tables)
+    print(f"snapshot: {len(data) / 1_000_000:.1f} MB, {rows:,} rows")
+    print("  " + ", ".join(f"{table}={count:,}" for table, count in counts.items()))
+    # Restore also recomputes user_effective_permissions, whose size follows users x grants.
+    print(f"  user_effective_permissions rebuilt with {derived:,} rows")
+    print(f"{'export s':>10}{'decode s':>10}{'restore s':>11}{'round trip s':>14}")
+    print(f"{exported:>10.2f}{decoded:>10.2f}{restored:>11.2f}{exported + restored:>14.2f}")
+
+    engine.dispose()
+    if workdir:
+        os.remove(os.path.join(workdir, "snapshot.db"))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Statements and latency per single-row write: commit-then-refresh versus RETURNING.
+
+The previous write path flushed an ORM object, committed and then ran ``refresh()`` (one
+more SELECT) for entities, and ran SELECT + UPDATE for link rows. The repositories now
+fetch defaults and timestamps with ``INSERT/UPDATE ... RETURNING`` in the same statement.
+Uses a temporary SQLite database unless ``--database-url`` is given.
+
+    python -m benchmarks.write_benchmark --writes 2000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import and_, create_engine, select
+from sqlalchemy.orm import Session
+
+from app.core.query_stats import QueryCounter
+from app.domain.models import Base, Permission, Role, User, role_permissions_table, user_roles_table
+from app.infrastructure.repositories.returning import commit_detached, insert_returning, update_returning
+
+
+def entity_values(model: type, index: int) -> Dict[str, object]:
+    if model is User:
+        return {"username": f"user{index}", "email": f"user{index}@example.com", "password_hash": "x" * 60}
+    return {"name": f"{model.__tablename__}-{index}", "description": "d" * 40}
+
+
+def entity_changes(model: type, index: int) -> Dict[str, object]:
+    return {"username": f"renamed{index}"} if model is User else {"name": f"renamed-{index}"}
+
+
+def previous_create(session: Session, model: type, index: int) -> None:
+    entity = model(**entity_values(model, index))
+    session.add(entity)
+    session.flush()
+    session.commit()
+    session.refresh(entity)
+
+
+def returning_create(session: Session, model: type, index: int) -> None:
+    commit_detached(session, insert_returning(session, model, entity_values(model, index)))
+
+
+def previous_update(session: Session, model: type, identifier: int, index: int) -> None:
+    entity = session.get(model, identifier)
+    for name, value in entity_changes(model, index).items():
+        setattr(entity, name, value)
+    session.commit()
+    session.refresh(entity)
+
+
+def returning_update(session: Session, model: type, identifier: int, index: int) -> None:
+    commit_detached(session, update_returning(session, model, identifier, entity_changes(model, index)))
+
+
+def link_where(table, key: Tuple[int, int]):
+    first, second = table.primary_key.columns
+    return and_(first == key[0], second == key[1])
+
+
+def previous_link_update(session: Session, table, key: Tuple[int, int], new_key: Tuple[int, int]) -> None:
+    first, second = (column.name for column in table.primary_key.columns)
+    session.execute(select(table).where(link_where(table, key))).first()
+    values = {first: new_key[0], second: new_key[1]}
+    session.execute(table.update().where(link_where(table, key)).values(values))
+    session.commit()
+
+
+def returning_link_update(session: Session, table, key: Tuple[int, int], new_key: Tuple[int, int]) -> None:
+    first, second = (column.name for column in table.primary_key.columns)
+    statement = (
+        table.update()
+        .where(link_where(table, key))
+        .values({first: new_key[0], second: new_key[1]})
+        .returning(table)
+    )
+    session.execute(statement).first()
+    session.commit()
+
+
+def measure(engine, writes: int, run: Callable[[Session, int], None]) -> Tuple[float, float]:
+    with Session(engine) as session, QueryCounter(engine) as counter:
+        started = time.perf_counter()
+        for index in range(writes):
+            run(session, index)
+        elapsed = time.perf_counter() - started
+    # Transaction control (BEGIN/COMMIT) is not a cursor statement and is not counted.
+    return counter.count / writes, elapsed / writes * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    workdir = None
+    url = args.database_url
+    if url is None:
+        workdir = tempfile.mkdtemp(prefix="rbac-writes-")
+        url = f"sqlite:///{os.path.join(workdir, 'writes.db')}"
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rows: List[Tuple[str, Tuple[float, float], Tuple[float, float]]] = []
+    offset = args.writes
+    for model in (Role, Permission, User):
+        name = model.__tablename__
+        rows.append(
+            (
+                f"{name} create",
+                measure(engine, args.writes, lambda session, i: previous_create(session, model, i)),
+                measure(engine, args.writes, lambda session, i: returning_create(session, model, i + offset)),
+            )
+        )
+        rows.append(
+            (
+                f"{name} update",
+                measure(engine, args.writes, lambda session, i: previous_update(session, model, i + 1, i)),
+                measure(engine, args.writes, lambda session, i: returning_update(session, model, i + 1, i)),
+            )
+        )
+
+    # Link updates move each row to a fresh key, so both paths touch distinct rows.
+    for table in (role_permissions_table, user_roles_table):
+        with engine.begin() as connection:
+            first, second = (column.name for column in table.primary_key.columns)
+            connection.execute(table.insert(), [{first: 1, second: i + 1} for i in range(args.writes * 2)])
+        shift = args.writes * 2
+
+        def previous(session: Session, i: int, table=table) -> None:
+            previous_link_update(session, table, (1, i + 1), (2, i + 1 + shift))
+
+        def current(session: Session, i: int, table=table) -> None:
+            returning_link_update(session, table, (1, i + 1 + args.writes), (2, i + 1 + args.writes + shift))
+
+        rows.append(
+            (f"{table.name} update", measure(engine, args.writes, previous), measure(engine, args.writes, current))
+        )
+
+    print(f"{'write':<26}{'stmts before':>14}{'stmts after':>13}{'µs before':>12}{'µs after':>11}")
+    for label, (before_count, before_us), (after_count, after_us) in rows:
+        print(f"{label:<26}{before_count:>14.2f}{after_count:>13.2f}{before_us:>12.0f}{after_us:>11.0f}")
+
+    engine.dispose()
+    if workdir:
+        os.remove(os.path.join(workdir, "writes.db"))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 -- RBAC baseline schema for PostgreSQL
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS roles (
     id SERIAL PRIMARY KEY,
     name VARCHAR(100) UNIQUE NOT NULL,
@@ -39,7 +41,51 @@ CREATE TABLE IF NOT EXISTS user_roles (
     PRIMARY KEY (user_id, role_id)
 );
 
+-- Role inheritance: a role holds every permission of its parents, transitively
+CREATE TABLE IF NOT EXISTS role_parents (
+    role_id INTEGER NOT NULL REFERENCES roles(id) ON DELETE CASCADE,
+    parent_id INTEGER NOT NULL REFERENCES roles(id) ON DELETE CASCADE,
+    PRIMARY KEY (role_id, parent_id),
+    CHECK (role_id <> parent_id)
+);
+
+-- Transitive closure of role_parents plus one depth-0 row per role, maintained by the role repository
+CREATE TABLE IF NOT EXISTS role_closure (
+    ancestor_id INTEGER NOT NULL REFERENCES roles(id) ON DELETE CASCADE,
+    descendant_id INTEGER NOT NULL REFERENCES roles(id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+
+-- Denormalized user -> permission grants, maintained by the link repositories
+CREATE TABLE IF NOT EXISTS user_effective_permissions (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    permission_id INTEGER NOT NULL REFERENCES permissions(id) ON DELETE CASCADE,
+    via_role_count INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (user_id, permission_id)
+);
+
+-- Committed changes, polled by every API worker to keep in-process caches coherent
+CREATE TABLE IF NOT EXISTS rbac_changes (
+    seq BIGSERIAL PRIMARY KEY,
+    origin VARCHAR(32) NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
 -- Helpful indexes
 CREATE INDEX IF NOT EXISTS idx_permissions_name ON permissions(name);
 CREATE INDEX IF NOT EXISTS idx_roles_name ON roles(name);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+CREATE INDEX IF NOT EXISTS idx_role_permissions_permission_id ON role_permissions(permission_id);
+CREATE INDEX IF NOT EXISTS idx_user_roles_role_id ON user_roles(role_id);
+CREATE INDEX IF NOT EXISTS idx_role_parents_parent_id ON role_parents(parent_id);
+CREATE INDEX IF NOT EXISTS idx_role_closure_descendant_id ON role_closure(descendant_id);
+CREATE INDEX IF NOT EXISTS idx_user_effective_permissions_permission_id ON user_effective_permissions(permission_id);
+CREATE INDEX IF NOT EXISTS idx_rbac_changes_created_at ON rbac_changes(created_at);
+
+-- Trigram indexes serving prefix and substring (ILIKE) search
+CREATE INDEX IF NOT EXISTS ix_roles_name_trgm ON roles USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_permissions_name_trgm ON permissions USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops);